@@ -2,7 +2,7 @@ from typing import *
 
 from ..model import ModelInterface
 from pokemon_ai.classes import Player, Move, Item, Party
-from pokemon_ai.utils import calculate_damage_deterministic
+from pokemon_ai.utils import RNG, calculate_damage_deterministic, get_rng
 
 from .random_model import RandomModel
 
@@ -12,6 +12,13 @@ class DamageModel(ModelInterface):
     A model that picks random moves.
     """
 
+    def __init__(self, rng: RNG = None):
+        """
+        Initializes a DamageModel.
+        :param rng: The RNG to pick moves with when no move is left. Defaults to the process-wide RNG.
+        """
+        self._rng = rng or get_rng()
+
     # use the most effective move, otherwise use the highest base power move
     def take_turn(self, player: Player, other_player: Player, attack: Callable[[Move], None],
                   use_item: Callable[[Item], None],
@@ -26,9 +33,13 @@ class DamageModel(ModelInterface):
                 damage = calculate_damage_deterministic(move, pokemon, enemy)[0]
                 damage_list.append((move, damage))
 
+        if len(damage_list) == 0:
+            # Nothing left to attack with, so switch like a RandomModel would
+            return RandomModel(self._rng).take_turn(player, other_player, attack, use_item, switch_pokemon_at_idx)
+
         damage_list.sort(reverse=True, key=lambda x: x[1])
 
         attack(damage_list[0][0])
 
     def force_switch_pokemon(self, party: Party):
-        return RandomModel().force_switch_pokemon(party)
+        return RandomModel(self._rng).force_switch_pokemon(party)
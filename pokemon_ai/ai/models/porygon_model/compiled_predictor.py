@@ -0,0 +1,93 @@
+from typing import *
+
+import numpy as np
+
+# The dtype of the weights and activations
+DTYPE = np.float32
+
+
+class CompiledPredictor:
+    """
+    A frozen snapshot of the Predictor network for inference only: float32 copies of its weights and a forward pass in
+    plain NumPy. Single states are evaluated into preallocated scratch buffers, so a call allocates nothing but its
+    result. It needs no sklearn, and saves to and loads from a single .npz file.
+
+    The scratch buffers make predict unsafe to call from several threads at once.
+    """
+
+    def __init__(self, coefs: Sequence[np.ndarray], intercepts: Sequence[np.ndarray]):
+        """
+        Initializes a CompiledPredictor. Hidden layers use ReLU activations, and the output layer none.
+        :param coefs: The weight matrix of each layer, of shape (inputs, outputs), like MLPRegressor.coefs_.
+        :param intercepts: The bias vector of each layer, like MLPRegressor.intercepts_.
+        """
+        assert len(coefs) == len(intercepts) > 0
+        self._coefs = [np.ascontiguousarray(coef, dtype=DTYPE) for coef in coefs]
+        self._intercepts = [np.ascontiguousarray(intercept, dtype=DTYPE) for intercept in intercepts]
+        self._input = np.empty(self._coefs[0].shape[0], dtype=DTYPE)
+        self._scratch = [np.empty(coef.shape[1], dtype=DTYPE) for coef in self._coefs]
+
+    def get_input_size(self) -> int:
+        return len(self._input)
+
+    def get_output_size(self) -> int:
+        return len(self._scratch[-1])
+
+    def predict(self, input_vector: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the network on a single input vector.
+        :param input_vector: The input vector.
+        :return: The output vector, as a new array.
+        """
+        self._input[:] = input_vector
+        activations = self._input
+        for i, (coef, intercept, out) in enumerate(zip(self._coefs, self._intercepts, self._scratch)):
+            np.dot(activations, coef, out=out)
+            out += intercept
+            if i < len(self._coefs) - 1:
+                np.maximum(out, 0, out=out)
+            activations = out
+        return activations.copy()
+
+    def predict_batch(self, inputs: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the network on many input vectors at once.
+        :param inputs: An (N, input size) array.
+        :return: An (N, output size) array.
+        """
+        activations = np.asarray(inputs, dtype=DTYPE)
+        for i, (coef, intercept) in enumerate(zip(self._coefs, self._intercepts)):
+            activations = activations @ coef
+            activations += intercept
+            if i < len(self._coefs) - 1:
+                np.maximum(activations, 0, out=activations)
+        return activations
+
+    def save(self, path: str) -> None:
+        """
+        Saves the weights to a .npz file.
+        :param path: The path of the file. NumPy appends .npz if it is missing.
+        """
+        arrays = {}
+        for i, (coef, intercept) in enumerate(zip(self._coefs, self._intercepts)):
+            arrays['coef_%d' % i] = coef
+            arrays['intercept_%d' % i] = intercept
+        np.savez(path, **arrays)
+
+    @staticmethod
+    def load(path: str) -> 'CompiledPredictor':
+        """
+        Loads the weights saved by save.
+        :param path: The path of the .npz file.
+        :return: The CompiledPredictor.
+        """
+        with np.load(path) as arrays:
+            num_layers = len([name for name in arrays.files if name.startswith('coef_')])
+            return CompiledPredictor([arrays['coef_%d' % i] for i in range(num_layers)],
+                                     [arrays['intercept_%d' % i] for i in range(num_layers)])
+
+    def get_weights(self) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        :return: The weight matrices and the bias vectors of every layer.
+        """
+        return self._coefs, self._intercepts
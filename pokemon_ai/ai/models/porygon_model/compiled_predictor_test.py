@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from .compiled_predictor import CompiledPredictor
+
+
+class CompiledPredictorTestSuite(unittest.TestCase):
+
+    def test_predict(self):
+        generator = np.random.default_rng(0)
+        coefs = [generator.normal(size=(6, 5)), generator.normal(size=(5, 3))]
+        intercepts = [generator.normal(size=5), generator.normal(size=3)]
+        model = CompiledPredictor(coefs, intercepts)
+        self.assertEqual((model.get_input_size(), model.get_output_size()), (6, 3))
+
+        # ReLU on the hidden layer only, and single rows agree with batches
+        inputs = generator.normal(size=(4, 6))
+        expected = np.maximum(inputs @ coefs[0] + intercepts[0], 0) @ coefs[1] + intercepts[1]
+        np.testing.assert_allclose(model.predict_batch(inputs), expected, rtol=1e-5, atol=1e-5)
+        for row, output in zip(inputs, model.predict_batch(inputs)):
+            np.testing.assert_allclose(model.predict(row), output, rtol=1e-5, atol=1e-6)
+
+        # Results are not overwritten by the scratch buffers of later calls
+        first = model.predict(inputs[0])
+        model.predict(inputs[1])
+        np.testing.assert_allclose(first, expected[0], rtol=1e-5, atol=1e-5)
+
+    def test_save_load(self):
+        generator = np.random.default_rng(1)
+        model = CompiledPredictor([generator.normal(size=(4, 3))], [generator.normal(size=3)])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.npz')
+            model.save(path)
+            loaded = CompiledPredictor.load(path)
+        row = generator.normal(size=4)
+        np.testing.assert_array_equal(loaded.predict(row), model.predict(row))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+from typing import *
+
+import numpy as np
+
+from pokemon_ai.battle import BattleBatch
+from pokemon_ai.classes import Player
+from pokemon_ai.utils import POKEMON_MOVE_LIMIT, POKEMON_PARTY_LIMIT
+
+from .models import MonteCarloActionType
+
+# Very small value used in place of zero to avoid neural net training issues
+EPSILON = 1e-16
+
+# Input and output sizes of the network
+INPUT_SIZE = 60  # (1 HP, 4 Moves) x 6 Pokemon x 2 Players
+OUTPUT_SIZE = 31  # 6 switches + 4 Moves x 6 Pokemon + 1 outcome value
+POLICY_SIZE = OUTPUT_SIZE - 1  # The switches and moves, without the outcome value
+
+# The number of features of a Pokemon in the input vector
+POKEMON_SIZE = 1 + POKEMON_MOVE_LIMIT
+
+
+##
+# Inputs
+##
+
+def encode_state(player: Player, other_player: Player, out: np.ndarray = None) -> np.ndarray:
+    """
+    Encodes the state of a battle into an input vector for the network.
+    :param player: The focused player.
+    :param other_player: The other player.
+    :param out: A contiguous array of INPUT_SIZE floats to write into, or None for a new one.
+    :return: The input vector: [HP ratio, Move 1 PP ratio, ... Move 4 PP ratio] for each Pokemon of the player, then
+    of the other player, sorted by ID. Missing Pokemon and moves are EPSILON.
+    """
+    if out is None:
+        out = np.empty(INPUT_SIZE)
+    values = [EPSILON] * INPUT_SIZE
+    for side, side_player in enumerate((player, other_player)):
+        start = side * POKEMON_PARTY_LIMIT * POKEMON_SIZE
+        for row, pokemon in enumerate(side_player.get_party().get_sorted_list()):
+            pos = start + row * POKEMON_SIZE
+            values[pos] = pokemon.get_hp() / pokemon.get_base_hp()
+            for move in pokemon.get_move_bank().get_as_list():
+                pos += 1
+                values[pos] = move.get_pp() / move.get_base_pp()
+    out[:] = values
+    return out
+
+
+def encode_batch(batch: BattleBatch, side: int = 0, out: np.ndarray = None) -> np.ndarray:
+    """
+    Encodes the states of every battle of a batch at once, straight from its arrays, see encode_state. This is how many
+    states are encoded together, as players can only be read one at a time. A batch keeps the Pokemon of each side by
+    slot, which is their order by ID.
+    :param batch: The BattleBatch.
+    :param side: The focused side.
+    :param out: A contiguous (N, INPUT_SIZE) array to write into, or None for a new one.
+    :return: The (N, INPUT_SIZE) array of input vectors.
+    """
+    if out is None:
+        out = np.empty((len(batch), INPUT_SIZE))
+    rows = out.reshape(len(batch), 2, POKEMON_PARTY_LIMIT, POKEMON_SIZE)
+    for i, s in enumerate((side, 1 - side)):
+        rows[:, i, :, 0] = batch.get_hp_ratios(s)
+        rows[:, i, :, 1:] = batch.get_pp_ratios(s)
+    out[np.isnan(out)] = EPSILON
+    return out
+
+
+##
+# Targets
+##
+
+def encode_policy(player: Player, node: Any, out: np.ndarray = None, visits=False) -> np.ndarray:
+    """
+    Encodes the result of searching a node into a target vector for the network.
+    :param player: The player that owns the actions of the node's children.
+    :param node: A MonteCarloNode.
+    :param out: A contiguous array of OUTPUT_SIZE floats to write into, or None for a new one.
+    :param visits: Use each action's share of the visits of all the actions, the search policy, instead of its share
+    of the node's outcome.
+    :return: The target vector: the share of the node's outcome of switching to each of the player's Pokemon, then
+    of each move of each of them, sorted by ID, then the node's mean outcome. Actions that were not searched are
+    EPSILON.
+    """
+    if out is None:
+        out = np.empty(OUTPUT_SIZE)
+    out.fill(EPSILON)
+    out[-1] = node.outcome / max(node.visits, 1)
+    children = node.children
+    total = sum([child.visits for child in children]) if visits else node.outcome
+    if total <= 0:
+        return out
+    rows = {pokemon.get_id(): row for row, pokemon in enumerate(player.get_party().get_sorted_list())}
+    for child in children:
+        pokemon_id, action_type, target = child.get_action()
+        if action_type == MonteCarloActionType.SWITCH:
+            pos = rows.get(target)
+        else:
+            pos = rows.get(pokemon_id)
+            if pos is not None:
+                pos = POKEMON_PARTY_LIMIT + pos * POKEMON_MOVE_LIMIT + target
+        if pos is not None:
+            out[pos] = max((child.visits if visits else child.outcome) / total, EPSILON)
+    return out
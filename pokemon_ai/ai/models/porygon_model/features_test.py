@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+from pokemon_ai.battle import Battle, BattleBatch, BattleState
+from pokemon_ai.classes import Player
+from pokemon_ai.data import get_party, get_random_party
+from pokemon_ai.ai.models import RandomModel
+from pokemon_ai.utils import RNG
+
+from .features import EPSILON, INPUT_SIZE, OUTPUT_SIZE, encode_state, encode_batch, encode_policy
+from .mcts import make_tree
+from .models import MonteCarloActionType
+
+
+class FeaturesTestSuite(unittest.TestCase):
+
+    def test_encode_state(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+        Battle(player1, player2, 0).play_turn()
+
+        # Rows follow the Pokemon IDs, whatever the party order, and missing Pokemon are EPSILON
+        player1.get_party().make_starting(1)
+        pokemon = player1.get_party().get_sorted_list()[0]
+        vector = encode_state(player1, player2)
+        self.assertAlmostEqual(vector[0], pokemon.get_hp() / pokemon.get_base_hp())
+        self.assertAlmostEqual(vector[1], pokemon.get_move_bank().get_move(0).get_pp() / pokemon.get_move_bank().get_move(0).get_base_pp())
+        self.assertTrue(np.all(vector[10:30] == EPSILON))
+
+        # Vectors are written into the caller's buffer
+        out = np.zeros((2, INPUT_SIZE))
+        encode_state(player2, player1, out[1])
+        self.assertTrue(np.all(out[0] == 0))
+        np.testing.assert_array_equal(out[1, :30], vector[30:])
+
+    def test_encode_batch(self):
+        # Battles of parties of any size, part way through, encode like their players
+        rng = RNG(0)
+        states = []
+        for size in range(1, 7):
+            player1 = Player('test', get_random_party(size, rng), model=RandomModel(rng))
+            player2 = Player('test2', get_random_party(7 - size, rng), model=RandomModel(rng))
+            Battle(player1, player2, 0, rng=rng).play_turns(3)
+            states.append(BattleState.from_players(player1, player2))
+        batch = BattleBatch.from_states(states)
+        for side in [0, 1]:
+            vectors = encode_batch(batch, side)
+            for state, vector in zip(states, vectors):
+                players = state.to_players()
+                np.testing.assert_allclose(vector, encode_state(players[side], players[1 - side]))
+
+    def test_encode_policy(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+        tree = make_tree(player1, player2, 100, rng=RNG(0))
+        root = tree.root
+
+        # Each searched action gets its share of the root's outcome
+        target = encode_policy(player1, root)
+        self.assertAlmostEqual(target[-1], root.outcome / root.visits)
+        ids = [pokemon.get_id() for pokemon in player1.get_party().get_sorted_list()]
+        for child in root.children:
+            pokemon_id, action_type, idx = child.get_action()
+            pos = ids.index(idx) if action_type == MonteCarloActionType.SWITCH else 6 + ids.index(pokemon_id) * 4 + idx
+            self.assertAlmostEqual(target[pos], max(child.outcome / root.outcome, EPSILON))
+        self.assertEqual(len([value for value in target[:-1] if value != EPSILON]),
+                         len([child for child in root.children if child.outcome > 0]))
+
+        out = np.zeros((1, OUTPUT_SIZE))
+        encode_policy(player1, root, out[0])
+        np.testing.assert_array_equal(out[0], target)
+
+
+if __name__ == '__main__':
+    unittest.main()
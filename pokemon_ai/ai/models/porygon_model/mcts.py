@@ -1,44 +1,117 @@
+import time
+from statistics import NormalDist
 from typing import *
 
+import numpy as np
 from pptree import print_tree
 
-from pokemon_ai.battle import Battle
+from pokemon_ai.battle import Battle, BattleBatch, BattleState, player_hash
+from pokemon_ai.battle.battle_state import NO_ACTION, SWITCH_OFFSET
 from pokemon_ai.classes import Item, Move, Player, Pokemon
-from pokemon_ai.utils import calculations
+from pokemon_ai.utils import calculations, RNG, get_rng, POKEMON_MOVE_LIMIT, POKEMON_PARTY_LIMIT
+from .features import encode_batch, encode_state
 from .models import MonteCarloActionType
 from .predictor import Predictor
 from ..damage_model import DamageModel
 from ..random_model import RandomModel
 
+# The index of the root's parent and of missing children and siblings
+NO_NODE = -1
+
+# The state of the opponent's responses whose turn has not been simulated yet
+NO_STATE = -1
+
+# The number of nodes, statistics and states a new tree has room for. Every array doubles when it fills up.
+_INITIAL_CAPACITY = 1024
+
+# The number of visits every root child needs before the search can stop on a confidence bound
+MIN_STOPPING_VISITS = 8
+
+
+class SearchStatistics(NamedTuple):
+    """
+    What a call to make_tree did.
+    """
+    simulations: int
+    nodes: int
+    elapsed: float
+    stopped_early: bool
+
+
+def _pack_action(slot: int, action_type: MonteCarloActionType, target: int) -> int:
+    """
+    Packs an action into an integer code.
+    :param slot: The slot of the acting Pokemon, which is its index in its party sorted by ID.
+    :param action_type: The type of the action.
+    :param target: The index of the move used, or the slot of the Pokemon switched in.
+    :return: The action code.
+    """
+    return (slot * 2 + action_type.value) * 8 + target
+
+
+def _unpack_action(code: int) -> Tuple[int, MonteCarloActionType, int]:
+    """
+    Unpacks an action code.
+    :param code: A code returned by _pack_action.
+    :return: A tuple of the acting slot, action type and target.
+    """
+    return code // 16, MonteCarloActionType(code // 8 % 2), code % 8
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    """
+    Returns the array if it holds at least size rows, or a copy with room for twice as many rows otherwise.
+    """
+    if size <= len(array):
+        return array
+    grown = np.empty((max(size, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
 class MonteCarloNode:
+    """
+    A node of a MonteCarloTree. Nodes are rows of the tree's arrays, so this is only a view of one of them, created on
+    demand. A view keeps pointing at its node when the tree is re-rooted.
+    """
+
+    __slots__ = ('_tree', '_idx')
+
+    def __init__(self, tree: 'MonteCarloTree', idx: int):
+        """
+        Initializes a MonteCarloNode. Use MonteCarloTree.get_node to get one.
+        :param tree: The tree.
+        :param idx: The index of the node in the tree.
+        """
+        self._tree = tree
+        self._idx = idx
+
+    def get_index(self) -> int:
+        return self._idx
+
+    @property
+    def depth(self) -> int:
+        return self._tree.get_depth(self._idx)
+
+    @property
+    def outcome(self) -> float:
+        return self._tree.get_outcome(self._idx)
+
+    @outcome.setter
+    def outcome(self, outcome: float):
+        self._tree.set_statistics(self._idx, self.visits, outcome)
+
+    @property
+    def visits(self) -> int:
+        return self._tree.get_visits(self._idx)
+
+    @property
+    def variance(self) -> float:
+        return self._tree.get_variance(self._idx)
 
-    def __init__(self, player: Player, other_player: Player, player_id: int = 0, action_type: MonteCarloActionType = -1,
-                 action_descriptor: Union[int, str] = 1, model: RandomModel = None, outcome=0, description="", visits=0, depth=0):
-        """
-        Initializes a MonteCarloNode.
-        :param player_id: The ID of the player performing this action.
-        :param player: Node player.
-        :param other_player: Node other player.
-        :param action_type: The type of action taken by this node.
-        :param action_descriptor: The index of the action taken by this node.
-        :param model: The model to use.
-        :param outcome: The total outcome of all children of this node.
-        :param description: The description of the action at the node.
-        """
-        self.player_id = player_id
-        self.player = player
-        self.other_player = other_player
-        self.action_type = action_type
-        self.action_descriptor = action_descriptor
-        self.model = model
-        self.outcome = outcome
-        self.parent = None
-        self.children: List[MonteCarloNode] = []
-        self.childrenMap = {}
-        self.description = description
-        self.depth = depth
-        self.visits = visits
-        self.token = ''
+    @visits.setter
+    def visits(self, visits: int):
+        self._tree.set_statistics(self._idx, visits, self.outcome)
 
     def visit(self):
         """
@@ -46,56 +119,78 @@ class MonteCarloNode:
         """
         self.visits += 1
 
-    def get_child(self, pokemon: Pokemon, action_type: MonteCarloActionType, action_descriptor: int):
+    @property
+    def parent(self) -> Optional['MonteCarloNode']:
+        parent = self._tree.get_parent(self._idx)
+        return self._tree.get_node(parent) if parent != NO_NODE else None
+
+    @property
+    def children(self) -> List['MonteCarloNode']:
+        return [self._tree.get_node(child) for child in self._tree.get_children(self._idx)]
+
+    @property
+    def player(self) -> Player:
+        return self._tree.get_players(self._idx)[0]
+
+    @property
+    def other_player(self) -> Player:
+        return self._tree.get_players(self._idx)[1]
+
+    @property
+    def state(self) -> Tuple[tuple, tuple]:
         """
-        Is this node a child of the current node?
-        :param pokemon: The pokemon the node concerns.
-        :param action_type: The type of the action of the child.
-        :param action_descriptor: The index of the action of the child.
-        :return: Returns the child with the specified action_type and action_descriptor.
+        Snapshots of the node's players in the node's state. Restores the state into the tree's players.
         """
-        token = self._tokenize_child(pokemon, action_type)
-        if self.has_child(pokemon, action_type, action_descriptor):
-            node_index = self.childrenMap[token][action_descriptor]
-            return self.children[node_index]
-        return None
+        self.restore()
+        return self.player.snapshot(), self.other_player.snapshot()
 
-    def has_child(self, pokemon: Pokemon, action_type: MonteCarloActionType, action_descriptor: int):
+    @property
+    def hashes(self) -> Tuple[int, int]:
         """
-        Is this node a child of the current node?
-        :param pokemon: The pokemon the node concerns.
-        :param action_type: The type of the action of the child.
-        :param action_descriptor: The index of the action of the child.
-        :return: Returns true if the provided node is a child of the current node.
+        The Zobrist hashes of the node's players in the node's state.
         """
-        token = self._tokenize_child(pokemon, action_type)
-        return token in self.childrenMap and action_descriptor in self.childrenMap[token]
+        hashes = self._tree.get_hashes(self._idx)
+        return hashes if self.player is self._tree.get_players()[0] else hashes[::-1]
+
+    @property
+    def action_type(self) -> MonteCarloActionType:
+        return _unpack_action(self._tree.get_action(self._idx))[1]
 
-    def add_child(self, node, pokemon: Pokemon):
+    @property
+    def action_descriptor(self) -> int:
         """
-        Add a child to the node.
-        :param pokemon: The pokemon the node concerns.
-        :param node: The node to add.
+        The index of the move used, or the ID of the Pokemon switched in.
         """
-        node.depth = self.depth + 1
-        node.parent = self
-        token = self._tokenize_child(pokemon, node.action_type)
-        node.token = token
-        self.children.append(node)
-        node_index = len(self.children) - 1
-        if token not in self.childrenMap:
-            self.childrenMap[token] = {}
-        self.childrenMap[token][node.action_descriptor] = node_index
+        _, action_type, target = _unpack_action(self._tree.get_action(self._idx))
+        if action_type == MonteCarloActionType.ATTACK:
+            return target
+        return self._tree.get_pokemon(self._tree.get_acting_side(self._idx), target).get_id()
 
-    @staticmethod
-    def _tokenize_child(pokemon: Pokemon, action_type: MonteCarloActionType) -> str:
+    @property
+    def token(self) -> str:
+        if self._idx == self._tree.get_root_index():
+            return ''
+        slot, action_type, _ = _unpack_action(self._tree.get_action(self._idx))
+        return "%d-%s" % (self._tree.get_pokemon(self._tree.get_acting_side(self._idx), slot).get_id(), action_type.name)
+
+    @property
+    def description(self) -> str:
+        return self._tree.describe(self._idx)
+
+    @property
+    def model(self) -> Optional[RandomModel]:
+        return self._tree.get_model(self._idx)
+
+    def get_action(self) -> Tuple[int, MonteCarloActionType, int]:
         """
-        Tokenizes a pokemon and action type for keeping track of nodes.
-        :param pokemon: A Pokemon.
-        :param action_type: A MonteCarloActionType.
-        :return: A tokenized string.
+        :return: A tuple of the ID of the Pokemon taking the action, the action type, and the index of the move used or
+        the ID of the Pokemon switched in.
         """
-        return "%d-%s" % (pokemon.get_id(), action_type.name)
+        slot, action_type, target = _unpack_action(self._tree.get_action(self._idx))
+        side = self._tree.get_acting_side(self._idx)
+        if action_type == MonteCarloActionType.SWITCH:
+            target = self._tree.get_pokemon(side, target).get_id()
+        return self._tree.get_pokemon(side, slot).get_id(), action_type, target
 
     def detokenize_child(self) -> int:
         """
@@ -104,21 +199,87 @@ class MonteCarloNode:
         """
         return int(self.token.split('-')[0])
 
+    def restore(self):
+        """
+        Restores the node's state into its players, which are shared by every node in the tree.
+        """
+        self._tree.restore(self._idx)
+
     def __str__(self):
         """
         Converts the node to a string.
         :return: The string version of the node.
         """
+        if self._tree.is_pending(self._idx):
+            return str((self.description, self.outcome, self.visits))
+        self.restore()
         return str((self.description, self.outcome, self.visits, self.player.get_party().get_starting().get_name(), self.player.get_party().get_starting().get_hp(), self.other_player.get_party().get_starting().get_name(), self.other_player.get_party().get_starting().get_hp()))
 
 
 class MonteCarloTree:
+    """
+    A search tree stored as parallel arrays. Each node has a parent, first child and next sibling index, a depth, a
+    packed action code, a prior probability for PUCT searches, and the indices of its statistics and state.
+
+    - Statistics (visits, total outcome and total squared outcome) are shared by all nodes that reach the same state, through a
+      transposition table keyed by the Zobrist hashes of both players.
+    - States are BattleState buffers with the player as side 0. Even depth nodes (the player's actions) share their
+      parent's state, and odd depth nodes hold the state after the turn they complete. The turn of an odd depth node
+      is only simulated once a search selects it, so until then the node is pending and has no state.
 
-    def __init__(self, player, other_player):
+    The root is at depth 1. The tree keeps both players and restores node states into them when needed.
+
+    An open loop tree stores no state but the root's. Its nodes are action sequences with their own statistics, and
+    each search iteration replays the sequence from the root state, sampling the outcome of every turn afresh.
+    """
+
+    def __init__(self, player: Player, other_player: Player, rng: RNG = None, open_loop=False):
         """
-        Initializes a MonteCarloTree.
+        Initializes a MonteCarloTree with a root holding the players' current state.
+        :param player: The player to find actions for. The tree changes it, so pass a copy.
+        :param other_player: The opposing player, also a copy.
+        :param rng: The RNG the models of the nodes draw from. Defaults to the process-wide RNG.
+        :param open_loop: Store only the root state. Every node then refers to the root state and has no
+        transpositions, which brings a node down to 40 bytes.
         """
-        self.root = MonteCarloNode(player, other_player)
+        self._open_loop = open_loop
+        self._players = (player, other_player)
+        self._by_slot = [p.get_party().get_sorted_list() for p in self._players]
+        self._slots = [{pokemon.get_id(): slot for slot, pokemon in enumerate(by_slot)} for by_slot in self._by_slot]
+        self._template = BattleState.from_players(player, other_player, started=True)
+        self._scratch = self._template.copy()
+        self._loaded = NO_NODE
+        self._rng = rng or get_rng()
+
+        # Nodes
+        self._num_nodes = 0
+        self._parent = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self._first_child = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self._next_sibling = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self._depth = np.empty(_INITIAL_CAPACITY, dtype=np.int16)
+        self._action = np.empty(_INITIAL_CAPACITY, dtype=np.int16)
+        self._prior = np.empty(_INITIAL_CAPACITY, dtype=np.float32)
+        self._stat = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self._state = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+
+        # Statistics
+        self._num_stats = 0
+        self._visits = np.empty(_INITIAL_CAPACITY, dtype=np.int64)
+        self._outcomes = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._squares = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._table: Dict[tuple, int] = {}
+
+        # States
+        capacity = _INITIAL_CAPACITY if not open_loop else 1
+        self._num_states = 0
+        self._states = np.empty((capacity, len(self._template.get_buffer())), dtype=np.int16)
+        self._hashes = np.empty((capacity, 2), dtype=np.uint64)
+
+        self._views: Dict[int, MonteCarloNode] = {}
+        self._chosen: Optional[MonteCarloNode] = None
+        self._last_search: Optional[SearchStatistics] = None
+        self._root = self._add_node(NO_NODE, NO_NODE, self.add_state(player_hash(player), player_hash(other_player)),
+                                    None)
 
     def print(self):
         """
@@ -126,6 +287,404 @@ class MonteCarloTree:
         """
         print_tree(self.root, "children")
 
+    ##
+    #   Getter Functions
+    ##
+
+    @property
+    def root(self) -> MonteCarloNode:
+        return self.get_node(self._root)
+
+    def get_root_index(self) -> int:
+        return self._root
+
+    def is_open_loop(self) -> bool:
+        return self._open_loop
+
+    def get_node(self, idx: int) -> MonteCarloNode:
+        """
+        Gets a view of a node. Views are cached, so a node always has the same view.
+        :param idx: The index of the node.
+        :return: A MonteCarloNode.
+        """
+        view = self._views.get(idx)
+        if view is None:
+            view = self._views[idx] = MonteCarloNode(self, idx)
+        return view
+
+    def get_num_nodes(self) -> int:
+        return self._num_nodes
+
+    def get_nbytes(self) -> int:
+        """
+        :return: The number of bytes allocated for nodes, statistics and states.
+        """
+        return sum([array.nbytes for array in [self._parent, self._first_child, self._next_sibling, self._depth,
+                                               self._action, self._prior, self._stat, self._state, self._visits, self._outcomes,
+                                               self._squares, self._states, self._hashes]])
+
+    def get_players(self, idx: int = None) -> Tuple[Player, Player]:
+        """
+        Gets the players of the tree.
+        :param idx: A node. If given, the players are ordered the way the node sees them: odd depth nodes below the
+        root belong to the opposing player.
+        :return: A tuple of the player and the opposing player.
+        """
+        if idx is None or self._depth[idx] % 2 == 0 or idx == self._root:
+            return self._players
+        return self._players[1], self._players[0]
+
+    def get_pokemon(self, side: int, slot: int) -> Pokemon:
+        return self._by_slot[side][slot]
+
+    def get_slot(self, side: int, pokemon: Pokemon) -> int:
+        return self._slots[side][pokemon.get_id()]
+
+    def get_depth(self, idx: int) -> int:
+        return int(self._depth[idx])
+
+    def get_parent(self, idx: int) -> int:
+        return int(self._parent[idx])
+
+    def get_children(self, idx: int) -> List[int]:
+        children = []
+        child = int(self._first_child[idx])
+        while child != NO_NODE:
+            children.append(child)
+            child = int(self._next_sibling[child])
+        return children
+
+    def get_action(self, idx: int) -> int:
+        return int(self._action[idx])
+
+    def get_acting_side(self, idx: int) -> int:
+        """
+        :return: 0 if the node's action is the player's, or 1 if it is the opposing player's.
+        """
+        return 0 if self._depth[idx] % 2 == 0 else 1
+
+    def get_prior(self, idx: int) -> float:
+        """
+        :return: The prior probability of the node's action, or NaN if none was set.
+        """
+        return float(self._prior[idx])
+
+    def set_priors(self, idx: int, priors: Sequence[float]) -> None:
+        """
+        Sets the prior probabilities of the actions of a node's children, for PUCT searches.
+        :param idx: The index of the node.
+        :param priors: The prior probability of each child, in the order of get_children.
+        """
+        self._prior[self.get_children(idx)] = priors
+
+    def get_visits(self, idx: int) -> int:
+        return int(self._visits[self._stat[idx]])
+
+    def get_outcome(self, idx: int) -> float:
+        return float(self._outcomes[self._stat[idx]])
+
+    def get_squares(self, idx: int) -> float:
+        """
+        :return: The sum of the squared outcomes of the node's simulations.
+        """
+        return float(self._squares[self._stat[idx]])
+
+    def get_variance(self, idx: int) -> float:
+        """
+        :return: The sample variance of the outcomes of the node's simulations, or 0 with fewer than two.
+        """
+        stat = self._stat[idx]
+        visits = int(self._visits[stat])
+        if visits < 2:
+            return 0.0
+        outcome = float(self._outcomes[stat])
+        return max(0.0, (float(self._squares[stat]) - outcome * outcome / visits) / (visits - 1))
+
+    def set_statistics(self, idx: int, visits: int, outcome: float, squares: float = None) -> None:
+        """
+        Overwrites the statistics of a node.
+        :param idx: The index of the node.
+        :param visits: The number of visits.
+        :param outcome: The total outcome.
+        :param squares: The total squared outcome. Left as it is if None.
+        """
+        self._visits[self._stat[idx]] = visits
+        self._outcomes[self._stat[idx]] = outcome
+        if squares is not None:
+            self._squares[self._stat[idx]] = squares
+
+    def get_hashes(self, idx: int) -> Tuple[int, int]:
+        """
+        :return: The Zobrist hashes of the player and the opposing player in the node's state.
+        """
+        assert self._state[idx] != NO_STATE
+        h, other_h = self._hashes[self._state[idx]].tolist()
+        return h, other_h
+
+    def get_battle_state(self, idx: int = None) -> BattleState:
+        """
+        Copies the node's state into a BattleState, with the player as side 0.
+        :param idx: The index of the node. If None, the current state of the players is copied instead.
+        :return: A new BattleState.
+        """
+        if idx is None:
+            return BattleState.from_players(*self._players, started=True, rng=self._rng, like=self._template)
+        assert self._state[idx] != NO_STATE
+        return BattleState(self._template._tables, self._states[self._state[idx]].astype(np.int32), self._rng)
+
+    def get_model(self, idx: int) -> Optional[RandomModel]:
+        """
+        Creates a model that takes the node's action.
+        :param idx: The index of the node.
+        :return: A RandomModel whose take_turn is replaced, or None for the root.
+        """
+        return self.make_model(self.get_acting_side(idx), self.get_action(idx)) if idx != self._root else None
+
+    def make_model(self, side: int, action: int) -> RandomModel:
+        """
+        Creates a model that takes an action.
+        :param side: 0 if the action is the player's, or 1 if it is the opposing player's.
+        :param action: The action code.
+        :return: A RandomModel whose take_turn is replaced.
+        """
+        slot, action_type, target = _unpack_action(action)
+        if action_type == MonteCarloActionType.ATTACK:
+            attack = self._by_slot[side][slot].get_move_bank().get_move(target)
+
+            def take_turn(_: Player, __: Player, do_move: Callable[[Move], None], ___: Callable[[Item], None],
+                          ____: Callable[[int], None]):
+                do_move(attack)
+        else:
+            switch_pokemon = self._by_slot[side][target]
+
+            def take_turn(player: Player, __: Player, ___: Callable[[Move], None], ____: Callable[[Item], None],
+                          switch_pokemon_at_idx: Callable[[int], None]):
+                switch_pokemon_at_idx(player.get_party().get_index_of(switch_pokemon))
+
+        model = RandomModel(self._rng)
+        model.take_turn = take_turn
+        return model
+
+    def describe(self, idx: int) -> str:
+        """
+        Describes the node's action.
+        :param idx: The index of the node.
+        :return: A description such as "Pikachu used Thunderbolt."
+        """
+        if idx == self._root:
+            return 'Battle Start'
+        side = self.get_acting_side(idx)
+        slot, action_type, target = _unpack_action(self.get_action(idx))
+        pokemon = self._by_slot[side][slot]
+        if action_type == MonteCarloActionType.ATTACK:
+            return "%s used %s." % (pokemon.get_name(), pokemon.get_move_bank().get_move(target).get_name())
+        return "%s switched out with %s." % (pokemon.get_name(), self._by_slot[side][target].get_name())
+
+    def set_rng(self, rng: RNG) -> None:
+        self._rng = rng
+
+    def get_last_search(self) -> Optional[SearchStatistics]:
+        """
+        :return: The statistics of the last make_tree call that searched this tree, or None if there was none.
+        """
+        return self._last_search
+
+    def set_last_search(self, statistics: SearchStatistics) -> None:
+        self._last_search = statistics
+
+    ##
+    #   States
+    ##
+
+    def restore(self, idx: int) -> None:
+        """
+        Restores a node's state into the players, unless they already hold it.
+        :param idx: The index of the node.
+        """
+        state = int(self._state[idx])
+        assert state != NO_STATE
+        if state != self._loaded:
+            self._scratch.get_buffer()[:] = self._states[state]
+            self._scratch.apply_to(*self._players)
+            self._loaded = state
+
+    def invalidate(self) -> None:
+        """
+        Must be called after changing the players outside of an undoable battle, so that the next restore happens.
+        """
+        self._loaded = NO_NODE
+
+    def add_state(self, h: int, other_h: int) -> int:
+        """
+        Stores the current state of the players.
+        :param h: The Zobrist hash of the player.
+        :param other_h: The Zobrist hash of the opposing player.
+        :return: The index of the state.
+        """
+        idx = self._num_states
+        self._states = _grow(self._states, idx + 1)
+        self._hashes = _grow(self._hashes, idx + 1)
+        self._states[idx] = BattleState.from_players(*self._players, started=True, like=self._template).get_buffer()
+        self._hashes[idx] = (h, other_h)
+        self._num_states += 1
+        return idx
+
+    ##
+    #   Structure
+    ##
+
+    def add_child(self, parent: int, action: int, state: int = None) -> int:
+        """
+        Adds a child after the parent's other children. Its statistics are shared with any node already in the tree
+        that reached the same state (with the same action, for even depths).
+        :param parent: The index of the parent.
+        :param action: The child's action code.
+        :param state: The index of the state after the child's turn, for odd depth children, or None to leave the turn
+        to be simulated later and its state to be set with set_state. Even depth children share their parent's state.
+        Ignored by open loop trees, whose nodes all refer to the root state.
+        :return: The index of the child.
+        """
+        if self._open_loop:
+            return self._add_node(parent, action, int(self._state[self._root]), None)
+        if self._depth[parent] % 2 == 1:
+            state = int(self._state[parent])
+        elif state is None:
+            return self._add_node(parent, action, NO_STATE, None)
+        return self._add_node(parent, action, state, self._get_key(self._depth[parent] + 1, action, state))
+
+    def is_pending(self, idx: int) -> bool:
+        """
+        :return: True if the node is an opponent's response whose turn has not been simulated yet.
+        """
+        return self._state[idx] == NO_STATE
+
+    def set_state(self, idx: int, state: int) -> None:
+        """
+        Sets the state of a pending node, once its turn is simulated. Its statistics are then shared with any node
+        already in the tree that reached the same state.
+        :param idx: The index of the pending node, which has no visits yet.
+        :param state: The index of the state after the node's turn.
+        """
+        assert self.is_pending(idx) and self.get_visits(idx) == 0
+        self._state[idx] = state
+        key = self._get_key(self._depth[idx], int(self._action[idx]), state)
+        stat = self._table.get(key)
+        if stat is None:
+            self._table[key] = int(self._stat[idx])
+        else:
+            self._stat[idx] = stat
+
+    def _get_key(self, depth: int, action: int, state: int) -> tuple:
+        # Odd depth nodes are keyed by the state their turn led to, and even depth nodes by their state and action
+        if depth % 2 == 1:
+            return (1,) + tuple(self._hashes[state].tolist())
+        return (0,) + tuple(self._hashes[state].tolist()) + (action,)
+
+    def _add_node(self, parent: int, action: int, state: int, key: Optional[tuple]) -> int:
+        idx = self._num_nodes
+        if idx == len(self._parent):
+            for name in ['_parent', '_first_child', '_next_sibling', '_depth', '_action', '_prior', '_stat', '_state']:
+                setattr(self, name, _grow(getattr(self, name), idx + 1))
+
+        stat = self._table.get(key) if key is not None else None
+        if stat is None:
+            stat = self._add_stat()
+            if key is not None:
+                self._table[key] = stat
+
+        self._parent[idx] = parent
+        self._first_child[idx] = NO_NODE
+        self._next_sibling[idx] = NO_NODE
+        self._depth[idx] = self._depth[parent] + 1 if parent != NO_NODE else 1
+        self._action[idx] = action
+        self._prior[idx] = np.nan
+        self._stat[idx] = stat
+        self._state[idx] = state
+        self._num_nodes += 1
+
+        if parent != NO_NODE:
+            sibling = int(self._first_child[parent])
+            if sibling == NO_NODE:
+                self._first_child[parent] = idx
+            else:
+                while self._next_sibling[sibling] != NO_NODE:
+                    sibling = int(self._next_sibling[sibling])
+                self._next_sibling[sibling] = idx
+        return idx
+
+    def _add_stat(self) -> int:
+        idx = self._num_stats
+        self._visits = _grow(self._visits, idx + 1)
+        self._outcomes = _grow(self._outcomes, idx + 1)
+        self._squares = _grow(self._squares, idx + 1)
+        self._visits[idx] = 0
+        self._outcomes[idx] = 0
+        self._squares[idx] = 0
+        self._num_stats += 1
+        return idx
+
+    ##
+    #   Search
+    ##
+
+    def best_child(self, idx: int, children: List[int] = None, c_puct: float = None) -> int:
+        """
+        Picks the child with the greatest UCT value.
+        :param idx: The index of a node with children.
+        :param children: The children to pick from, if not all of them are available.
+        :param c_puct: Use the PUCT value with this exploration parameter and the children's priors instead, see
+        calculations.predictor_upper_confidence_bounds. Children without a prior get a uniform one, and unvisited
+        children can be picked.
+        :return: The index of the child.
+        """
+        # Children sharing statistics with transpositions can have more visits than the node itself
+        parent_visits = max(self.get_visits(idx), 1)
+        children = children if children is not None else self.get_children(idx)
+        if c_puct is not None:
+            uniform = 1 / len(children)
+            uct_values = [calculations.predictor_upper_confidence_bounds(
+                self.get_outcome(child), self.get_visits(child), parent_visits,
+                uniform if np.isnan(self._prior[child]) else float(self._prior[child]), c_puct)
+                for child in children]
+        else:
+            uct_values = [calculations.upper_confidence_bounds(self.get_outcome(child), self.get_visits(child),
+                                                               parent_visits)
+                          for child in children]
+        return children[uct_values.index(max(uct_values))]
+
+    def backpropagate(self, idx: int, outcome: float) -> None:
+        """
+        Adds an outcome to a node and its ancestors. The player's outcome is added at even depths and at the root, and
+        the opposing player's outcome (1 - outcome) at odd depths.
+        :param idx: The index of the leaf that was simulated.
+        :param outcome: The outcome of the simulation for the player.
+        """
+        # Statistics shared by several nodes on the path, when a state repeats, are only updated once
+        updated = set()
+        while idx != NO_NODE:
+            stat = int(self._stat[idx])
+            if stat not in updated:
+                updated.add(stat)
+                value = outcome if self._depth[idx] % 2 == 0 or idx == self._root else 1 - outcome
+                self._outcomes[stat] += value
+                self._squares[stat] += value * value
+                self._visits[stat] += 1
+            idx = int(self._parent[idx])
+
+    def add_visits(self, idx: int, visits: int) -> None:
+        """
+        Adds visits without any outcome to a node and its ancestors.
+        :param idx: The index of the node.
+        :param visits: The number of visits, which may be negative.
+        """
+        while idx != NO_NODE:
+            self._visits[self._stat[idx]] += visits
+            idx = int(self._parent[idx])
+
+    ##
+    #   Decisions
+    ##
+
     def get_next_action(self):
         """
         Decides the next action to take from the root.
@@ -133,11 +692,136 @@ class MonteCarloTree:
         """
         max_outcome = -1
         max_child = None
-        for child in self.root.children:
-            if child.outcome > max_outcome:
-                max_outcome = child.outcome
+        for child in self.get_children(self._root):
+            if self.get_outcome(child) > max_outcome:
+                max_outcome = self.get_outcome(child)
                 max_child = child
-        return max_child.model
+        if max_child is None:
+            # The player has nothing left to do, so it passes like a RandomModel would
+            self._chosen = None
+            return RandomModel(self._rng)
+        self._chosen = self.get_node(max_child)
+        return self._chosen.model
+
+    def is_decided(self, confidence: float = None, remaining_plays: int = None) -> bool:
+        """
+        Checks whether the search can stop before its budget runs out. Outcomes are assumed to lie between 0 and 1, as
+        those of outcome_func_v1 do.
+        :param confidence: A confidence level, such as 0.95. The search is decided once the action get_next_action
+        picks has a mean outcome whose lower confidence bound lies above the upper bound of every other action, and
+        every action has at least MIN_STOPPING_VISITS visits. None to skip this test.
+        :param remaining_plays: The number of simulations left. The search is decided once they could not change the
+        action get_next_action picks even if they all went to the runner-up. None if unknown.
+        :return: True if the search is decided, which it always is with a single action.
+        """
+        children = self.get_children(self._root)
+        if len(children) < 2:
+            return len(children) == 1
+        outcomes = [self.get_outcome(child) for child in children]
+        best = outcomes.index(max(outcomes))
+        if remaining_plays is not None and outcomes[best] - max(outcomes[:best] + outcomes[best + 1:]) > remaining_plays:
+            return True
+        if confidence is None:
+            return False
+
+        visits = [self.get_visits(child) for child in children]
+        if min(visits) < MIN_STOPPING_VISITS:
+            return False
+        z = NormalDist().inv_cdf(confidence)
+        means = [outcome / v for outcome, v in zip(outcomes, visits)]
+        bounds = [z * (self.get_variance(child) / v) ** 0.5 for child, v in zip(children, visits)]
+        lower = means[best] - bounds[best]
+        return all([means[i] + bounds[i] < lower for i in range(len(children)) if i != best])
+
+    def advance(self, player_real: Player, other_player_real: Player) -> bool:
+        """
+        Re-roots the tree on the state reached after the last action returned by get_next_action, so that its search
+        can be continued by make_tree. The grandchild under that action whose state matches the real players becomes
+        the root, its subtree is packed into new arrays and every other node is dropped.
+        :param player_real: The player the tree finds actions for, in its current state.
+        :param other_player_real: The opposing player, in its current state.
+        :return: True if the tree was re-rooted, or False if no simulated outcome matched and a new tree is needed. Open
+        loop trees are never re-rooted, since their nodes do not know which state they lead to.
+        """
+        chosen, self._chosen = self._chosen, None
+        if self._open_loop or chosen is None or chosen.get_index() == NO_NODE or self._parent[chosen.get_index()] != self._root:
+            return False
+
+        # The grandchildren hold the state after the turn
+        hashes = (player_hash(player_real), player_hash(other_player_real))
+        match = None
+        for child in self.get_children(chosen.get_index()):
+            if not self.is_pending(child) and self.get_hashes(child) == hashes:
+                match = child
+                break
+        if match is None:
+            return False
+
+        # List the match's subtree with parents before children, and map the old indices to the new ones. The extra
+        # last entry maps NO_NODE to itself.
+        keep = []
+        nodes = [match]
+        while nodes:
+            node = nodes.pop()
+            keep.append(node)
+            nodes.extend(reversed(self.get_children(node)))
+        keep = np.array(keep, dtype=np.int32)
+        new_index = np.full(self._num_nodes + 1, NO_NODE, dtype=np.int32)
+        new_index[keep] = np.arange(len(keep))
+
+        def remap(indices: np.ndarray) -> np.ndarray:
+            return new_index[np.where(indices == NO_NODE, self._num_nodes, indices)]
+
+        # Pack the statistics and states in use after those of the new root, which sees the match from the player's
+        # point of view and takes its state from the real players
+        stat_ids, stats = np.unique(self._stat[keep[1:]], return_inverse=True)
+        pending = self._state[keep[1:]] == NO_STATE
+        state_ids, states = np.unique(self._state[keep[1:]][~pending], return_inverse=True)
+        visits, outcome, squares = self.get_visits(match), self.get_outcome(match), self.get_squares(match)
+        self._visits = np.concatenate([[visits], self._visits[stat_ids]]).astype(np.int64)
+        self._outcomes = np.concatenate([[visits - outcome], self._outcomes[stat_ids]])
+        self._squares = np.concatenate([[visits - 2 * outcome + squares], self._squares[stat_ids]])
+        self._num_stats = len(self._visits)
+        self._states = np.concatenate([self._states[:1], self._states[state_ids]])
+        self._hashes = np.concatenate([self._hashes[:1], self._hashes[state_ids]])
+        self._num_states = len(self._states)
+
+        self._parent = remap(self._parent[keep])
+        self._first_child = remap(self._first_child[keep])
+        self._next_sibling = remap(self._next_sibling[keep])
+        self._next_sibling[0] = NO_NODE
+        self._depth = self._depth[keep] - 2
+        self._action = self._action[keep]
+        self._action[0] = NO_NODE
+        self._prior = self._prior[keep]
+        self._stat = np.concatenate([[0], stats.reshape(-1) + 1]).astype(np.int32)
+        self._state = np.full(len(keep), NO_STATE, dtype=np.int32)
+        self._state[0] = 0
+        self._state[1:][~pending] = states.reshape(-1) + 1
+        self._num_nodes = len(keep)
+        self._root = 0
+
+        self._players[0].restore(player_real.snapshot())
+        self._players[1].restore(other_player_real.snapshot())
+        self._states[0] = BattleState.from_players(*self._players, started=True, like=self._template).get_buffer()
+        self._hashes[0] = hashes
+        self._loaded = 0
+
+        self._table = {}
+        for idx in range(1, self._num_nodes):
+            if self.is_pending(idx):
+                continue
+            key = self._get_key(self._depth[idx], int(self._action[idx]), int(self._state[idx]))
+            self._table.setdefault(key, int(self._stat[idx]))
+
+        # Views of dropped nodes point nowhere
+        views = {}
+        for idx, view in self._views.items():
+            view._idx = int(new_index[idx])
+            if view._idx != NO_NODE:
+                views[view._idx] = view
+        self._views = views
+        return True
 
     def get_action_probabilities(self):
         """
@@ -146,222 +830,498 @@ class MonteCarloTree:
         """
         outcome_sum = 0
         max_outcome = 0
-        for child in self.root.children:
+        children = self.root.children
+        for child in children:
             outcome_sum += child.outcome
             max_outcome = max(max_outcome, abs(child.outcome))
         outcome_probs = []
-        for child in self.root.children:
-            denom = outcome_sum + max_outcome * len(self.root.children)
-            prob = (max_outcome + child.outcome) / denom if denom != 0 else 1 / len(self.root.children)
+        for child in children:
+            denom = outcome_sum + max_outcome * len(children)
+            prob = (max_outcome + child.outcome) / denom if denom != 0 else 1 / len(children)
             outcome_probs.append((child.outcome, prob, child.visits, child.description))
         return sorted(outcome_probs, key=lambda o: o[1])
 
 
-def make_tree(player_real: Player, other_player_real: Player, num_plays=1, predictor: Predictor = None, learning_turns: int = 10, use_damage_model=False, verbose=False):
+##
+# Root Parallelization
+##
+
+def get_root_statistics(tree: MonteCarloTree) -> Dict[int, Tuple[int, float, float]]:
+    """
+    Gets the statistics of the root's children, keyed by action code so that they can be matched across trees searched
+    from the same root state.
+    :param tree: The tree.
+    :return: A dictionary from action code to (visits, outcome, squared outcome).
     """
-    Creates a MonteCarloTree of actions for the given battle.
+    return {tree.get_action(child): (tree.get_visits(child), tree.get_outcome(child), tree.get_squares(child))
+            for child in tree.get_children(tree.get_root_index())}
+
+
+def merge_root_statistics(tree: MonteCarloTree, statistics: Dict[int, Tuple[int, float, float]]) -> int:
+    """
+    Adds the root statistics of another search from the same root state into the tree, so that get_next_action
+    decides using both searches. Only the root and its children are updated, and the root actions the tree has not
+    expanded yet get a child.
+    :param tree: The tree to merge into.
+    :param statistics: Statistics returned by get_root_statistics.
+    :return: The number of visits merged.
+    """
+    root = tree.get_root_index()
+    children = {tree.get_action(child): child for child in tree.get_children(root)}
+    merged = 0
+    for action, (visits, outcome, squares) in statistics.items():
+        child = children[action] if action in children else tree.add_child(root, action)
+        tree.set_statistics(child, tree.get_visits(child) + visits, tree.get_outcome(child) + outcome,
+                            tree.get_squares(child) + squares)
+        tree.set_statistics(root, tree.get_visits(root) + visits, tree.get_outcome(root) + outcome,
+                            tree.get_squares(root) + squares)
+        merged += visits
+    return merged
+
+
+def search_root(player: Player, other_player: Player, num_plays: Optional[int], learning_turns: int = 10,
+                use_damage_model=False, rng: RNG = None, batch_size: int = 1, open_loop=False,
+                time_budget: float = None, node_budget: int = None, rollout_depth: int = None,
+                evaluator: Callable[[Player, Player], float] = None,
+                adjudicate=False, confidence: float = None, puct: float = None) -> Dict[int, Tuple[int, float, float]]:
+    """
+    Runs an independent search without a predictor and returns its root statistics. Meant to run in a worker process,
+    so only the players, settings and RNG are sent over and only the statistics come back.
+    :param player: The player to find actions for.
+    :param other_player: The opposing player.
+    :param num_plays: The number of Monte Carlo simulations to perform.
+    :param learning_turns: Number of turns the model will learn before making decisions.
+    :param use_damage_model: Use the DamageModel?
+    :param rng: The RNG of the search. Give every worker its own, see RNG.spawn.
+    :param batch_size: The number of leaves selected per iteration, see make_tree.
+    :param open_loop: Search an open loop tree, see make_tree.
+    :param time_budget: The number of seconds to search for at most, see make_tree.
+    :param node_budget: The number of nodes to grow the tree to at most, see make_tree.
+    :param rollout_depth: The number of turns simulated past a leaf, see make_tree.
+    :param evaluator: Scores the end of a simulation, see make_tree. It must be picklable, such as a module level function.
+    :param adjudicate: End simulations as soon as their result is decided, see make_tree.
+    :param confidence: Stop early once the best action stands out at this confidence level, see make_tree.
+    :param puct: Only used with a predictor, which this search has none of, see make_tree.
+    :return: Statistics to pass to merge_root_statistics. The number of simulations run is the sum of their visits.
+    """
+    tree = make_tree(player, other_player, num_plays, None, learning_turns, use_damage_model, False, rng,
+                     batch_size=batch_size, open_loop=open_loop, time_budget=time_budget, node_budget=node_budget,
+                     rollout_depth=rollout_depth, evaluator=evaluator, adjudicate=adjudicate, confidence=confidence,
+                     puct=puct)
+    return get_root_statistics(tree)
+
+
+def make_tree(player_real: Player, other_player_real: Player, num_plays: Optional[int] = 1, predictor: Predictor = None, learning_turns: int = 10, use_damage_model=False, verbose=False, rng: RNG = None, tree: MonteCarloTree = None, batch_size: int = 1, open_loop=False, time_budget: float = None, node_budget: int = None, rollout_depth: int = None, evaluator: Callable[[Player, Player], float] = None, adjudicate=False, confidence: float = None, puct: float = None):
+    """
+    Creates a MonteCarloTree of actions for the given battle, or continues searching an existing one. The search stops
+    after num_plays simulations or when a budget runs out, whichever comes first, and its statistics are stored in the
+    tree (see MonteCarloTree.get_last_search).
     :param player_real: The player to find actions for.
     :param other_player_real: The opposing player.
-    :param num_plays: The number of Monte Carlo simulations to perform.
+    :param num_plays: The number of Monte Carlo simulations to perform at most, or None to search until the time
+    budget runs out.
     :param predictor: An optional neural network to weigh he training.
-    :param learning_turns: Number of turns the model will learn before making decisions.
+    :param learning_turns: Number of turns the model will learn before making decisions. A predictor that no longer
+    learns, such as one loaded from a checkpoint, makes decisions from the start.
     :param use_damage_model: Use the DamageModel?
     :param verbose: Should the algorithm announce its current actions?
+    :param rng: The RNG simulated battles and random models draw from. Defaults to the process-wide RNG.
+    :param tree: A tree re-rooted on the current state with MonteCarloTree.advance, to keep searching instead of
+    starting over.
+    :param batch_size: The number of leaves selected per iteration. If greater than 1, the simulations of all selected
+    leaves are played together in a BattleBatch, and the player's rollout actions of all of them are predicted at once.
+    :param open_loop: Create an open loop tree, which stores no state in its nodes. Each simulation replays the actions
+    of the selected nodes from the root, so chance events are sampled afresh every time. Ignored when a tree is given.
+    :param time_budget: The number of seconds to search for at most. The budget is checked between simulations (or
+    batches of simulations), so the last one can overrun it.
+    :param node_budget: The number of nodes to grow the tree to at most, counting those of a reused tree.
+    :param rollout_depth: The number of turns simulated past a leaf (and past the leaf's own turn for the player's
+    actions) before the battle is cut off and scored, or None to simulate until a side is wiped out.
+    :param evaluator: Scores the end of a simulation for the player, given the player and the opposing player.
+    Defaults to outcome_func_v1. Batched simulations only convert their battles back to players for custom evaluators.
+    :param adjudicate: End simulations as soon as their result is decided, because only one side can still damage the
+    other (see calculations.can_damage). The other side's Pokemon all faint. A simulation where neither side can is
+    scored as it stands.
+    :param confidence: Stop early once the best action at the root stands out from the others at this confidence
+    level, such as 0.95, or once the simulations left cannot change the decision (see MonteCarloTree.is_decided).
+    None to run every simulation the budgets allow.
+    :param puct: Search AlphaZero style with this exploration parameter, such as 1.5, once the predictor is trained.
+    Children are selected by PUCT with the predictor's move and switch probabilities as priors, so they no longer all
+    have to be tried first, and every leaf is scored by the predictor's outcome value after its own turn instead of a
+    rollout (rollout_depth and evaluator are ignored). Not supported for open loop trees.
     :return: A MonteCarloTree.
     """
+    assert num_plays is not None or time_budget is not None
+    start = time.perf_counter()
+    rng = rng or get_rng()
 
-    # Create tree
-    tree = MonteCarloTree(player_real.copy(), other_player_real.copy())
-    root = tree.root
-    root.player.set_model(RandomModel())
-    root.other_player.set_model(RandomModel() if not use_damage_model else DamageModel())
-    root.depth = 1
-    root.description = 'Battle Start'
-
-    # Use workaround to pass this to children
-    current_learning_turn = [0]
-
-    # Play num_plays amount of times
-    for current_num_plays in range(num_plays):
-        def backprop(node: MonteCarloNode, outcome: float) -> None:
-            """
-            Backpropogates and updates all nodes from the top node using the sums of the leaf nodes.
-            Included logic to add wins for respective player
-            :param node: The leaf node to start backpropgating from
-            :param outcome: The calculated outcome
-            """
-            if node.depth % 2 == 0 or node.depth == 1:
-                node.outcome += outcome
-            else:
-                node.outcome += (1 - outcome)
-            node.visit()
-            if node.parent is not None:
-                backprop(node.parent, outcome)
-
-        def create_node(node_player: Player, node_other_player: Player, action_type: MonteCarloActionType, index: int) -> MonteCarloNode:
-            """
-            Creates an attack or switch node.
-            :param node_player: The current player object for the node.
-            :param action_type: Either MonteCarloActionType.ATTACK or MonteCarloActionType.SWITCH.
-            :param index: The index of the attack or Pokemon to switch to.
-            """
-            # The currently battling pokemon
-            pokemon = node_player.get_party().get_starting()
-
-            # Create action descriptor
-            if action_type == MonteCarloActionType.ATTACK:
-                attack = pokemon.get_move_bank().get_move(index)
-                action_descriptor = index
-                description = "%s used %s." % (pokemon.get_name(), attack.get_name())
-            else:
-                switch_pokemon = node_player.get_party().get_at_index(index)
-                action_descriptor = switch_pokemon.get_id()
-                description = "%s switched out with %s." % (pokemon.get_name(), switch_pokemon.get_name())
-
-            # Create the "turn" to be taken when this node is visited
-            if action_type == MonteCarloActionType.ATTACK:
-                def take_turn(_: Player, __: Player, do_move: Callable[[Move], None], ___: Callable[[Item], None],
-                              ____: Callable[[int], None]):
-                    do_move(attack)
-            else:
-                def take_turn(_: Player, __: Player, ___: Callable[[Move], None], ____: Callable[[Item], None],
-                              switch_pokemon_at_idx: Callable[[int], None]):
-                    switch_pokemon_at_idx(index)
-
-            model = RandomModel()
-            model.take_turn = take_turn
-
-            # Return the move node
-            return MonteCarloNode(node_player.copy(), node_other_player.copy(), node_player.get_id(), action_type, action_descriptor, model, 0, description)
-
-        def insert_node(node: MonteCarloNode, parent: MonteCarloNode) -> MonteCarloNode:
-            """
-            Adds an attack or switch move node to a tree.
-            :param node: The current node.
-            :param parent: The parent node..
-            """
-            pokemon = node.player.get_party().get_starting()
-            child_exists = parent.has_child(pokemon, node.action_type, node.action_descriptor)
-
-            if not child_exists:
-                child = node
-                parent.add_child(child, pokemon)
+    # Create tree. Node states are restored into the tree's two players when needed.
+    if tree is None:
+        tree = MonteCarloTree(player_real.copy(), other_player_real.copy(), rng, open_loop)
+    tree.set_rng(rng)
+    player, other_player = tree.get_players()
+    root = tree.get_root_index()
+    tree.restore(root)
+
+    # Use workaround to pass this to children. A predictor that no longer learns is trusted from the start
+    current_learning_turn = [learning_turns if isinstance(predictor, Predictor) and not predictor.is_learning() else 0]
+
+    def opponent_model():
+        return RandomModel(rng) if not use_damage_model else DamageModel(rng)
+
+    def predict_value(value_player: Player, value_other_player: Player) -> float:
+        """
+        Scores a simulation with the predictor's outcome value, or with outcome_func_v1 once a side is wiped out. The
+        output is not cached, since hashing the state would cost more than the forward pass.
+        """
+        for p in [value_player, value_other_player]:
+            if all([pokemon.is_fainted() for pokemon in p.get_party().get_as_list()]):
+                return calculations.outcome_func_v1(value_player, value_other_player)
+        output = predictor.predict_batch(encode_state(value_player, value_other_player)[np.newaxis])[0]
+        return min(max(float(output[-1]), 0.0), 1.0)
+
+    def set_priors(node: int) -> None:
+        """
+        Sets the priors of the children of a node from the predictor's output in the node's state. Each child's prior
+        is its share of the outputs of all the children (see to_probs).
+        """
+        tree.restore(node)
+        # The player acts below the root and odd depths, and the opponent below even depths
+        side = 1 if tree.get_depth(node) % 2 == 0 else 0
+        players = tree.get_players()
+        hashes = tree.get_hashes(node)
+        output = predictor.predict_outputs([(players[side], players[1 - side])], [(hashes[side], hashes[1 - side])])[0]
+        ids = [pokemon.get_id() for pokemon in players[side].get_party().get_sorted_list()]
+        values = []
+        for child in tree.get_children(node):
+            slot, action_type, target = _unpack_action(tree.get_action(child))
+            if action_type == MonteCarloActionType.SWITCH:
+                values.append(output[ids.index(tree.get_pokemon(side, target).get_id())])
             else:
-                child = parent.get_child(pokemon, node.action_type, node.action_descriptor)
-
-            if node.depth % 2 == 1:
-                # If on an odd depth, simulate a turn and update the node's state (players).
-                node.player.set_model(node.model)
-                node.other_player.set_model(parent.model)
-
-                battle = Battle(node.player, node.other_player, 1 if verbose else 0)
-                winner = battle.play_turn()
-
-                # Get turn outcome
-                if winner is not None and predictor is not None:
-                    # Train the predictor
-                    predictor.train_model(root, player, other_player)
-                    current_learning_turn[0] += 1
-
-            return child
-
-        def traverse(node: MonteCarloNode) -> MonteCarloNode:
-            """
-            If the node is not fully expanded, pick one of the unvisited children.
-            Else, pick the child node with greatest UCT value. If this child node is also
-            fully expanded, repeat process.
-            """
-
-            def fully_expanded(node: MonteCarloNode):
-                if node.depth == 1:
-                    c_player = node.player.copy()
-                    c_other_player = node.other_player.copy()
-                else:
-                    c_player = node.other_player.copy()
-                    c_other_player = node.player.copy()
-
-                pokemon = c_player.get_party().get_starting()
-
-                # Creates all children for node if they do not already exist, and checks visit (0 is unvisited)
-                attacks = list(filter(lambda m: m[0].is_available(),
-                                      [(move, i) for i, move in enumerate(pokemon.get_move_bank().get_as_list())]))
-                for _, attack_idx in attacks:
-                    child = create_node(c_player, c_other_player, MonteCarloActionType.ATTACK, attack_idx)
-                    insert_node(child, node)
-
-                switches = list(filter(lambda p: not p[0].is_fainted(),
-                                       [(pkmn, i) for i, pkmn in enumerate(node.player.get_party().get_as_list())]))[1:]
-                for _, switch_idx in switches:
-                    child = create_node(c_player, c_other_player, MonteCarloActionType.SWITCH, switch_idx)
-                    insert_node(child, node)
-
-                return all([child.visits > 0 for child in node.children])
-
-            def best_uct_node(node: MonteCarloNode) -> MonteCarloNode:
-                uct_values = []
-                for child in node.children:
-                    uct_values.append(calculations.upper_confidence_bounds(child.outcome, child.visits, node.visits))
-                index_of_best_move = uct_values.index(max(uct_values))
-                return node.children[index_of_best_move]
-
-            def pick_unvisited(node: MonteCarloNode) -> MonteCarloNode:
-                for child in node.children:
-                    if child.visits == 0:
-                        return child
-                return None
-
-            # Adds the opponents moves as child nodes to player's moves (MCT will calculate best move for both sides)
-            while fully_expanded(node):
-                node = best_uct_node(node)
-
-            return pick_unvisited(node) or node
+                values.append(output[POKEMON_PARTY_LIMIT + ids.index(tree.get_pokemon(side, slot).get_id())
+                                     * POKEMON_MOVE_LIMIT + target])
+        tree.set_priors(node, calculations.to_probs(values))
+
+    def play_response(node: int) -> None:
+        """
+        Simulates the turn of a pending opponent's response, which the selection just reached, and saves the resulting
+        state. The node's state is restored into the players when this returns.
+        :param node: The index of the pending node.
+        """
+        # Simulate the turn from the parent's state, save the resulting state and undo the turn
+        parent = tree.get_parent(node)
+        tree.restore(parent)
+        other_player.set_model(tree.get_model(node))
+        player.set_model(tree.get_model(parent))
+        h, other_h = tree.get_hashes(parent)
+        battle = Battle(other_player, player, 1 if verbose else 0, undoable=True, rng=rng, hashes=(other_h, h))
+        winner = battle.play_turn()
+        other_h, h = battle.get_hashes()
+        tree.set_state(node, tree.add_state(h, other_h))
+        battle.undo_all()
+
+        # Get turn outcome
+        if winner is not None and predictor is not None:
+            train_at_root()
+        tree.restore(node)
+
+    def train_at_root() -> None:
+        """
+        Trains the predictor on the state at the root, once a simulated turn has ended the battle. The players hold the
+        root state when this returns.
+        """
+        tree.restore(root)
+        predictor.train_model(tree.root, player, other_player)
+        current_learning_turn[0] += 1
+
+    def get_actions(node: int) -> List[int]:
+        """
+        Lists the action codes available below a node, in the state the players currently hold.
+        """
+        # The player acts below the root and odd depths, and the opponent below even depths
+        side = 1 if tree.get_depth(node) % 2 == 0 else 0
+        c_player = tree.get_players()[side]
+        pokemon = c_player.get_party().get_starting()
+        slot = tree.get_slot(side, pokemon)
+        actions = [_pack_action(slot, MonteCarloActionType.ATTACK, i)
+                   for i, move in enumerate(pokemon.get_move_bank().get_as_list()) if move.is_available()]
+        actions += [_pack_action(slot, MonteCarloActionType.SWITCH, tree.get_slot(side, pkmn))
+                    for pkmn in c_player.get_party().get_as_list()[1:] if not pkmn.is_fainted()]
+        return actions
+
+    def traverse(node: int) -> int:
+        """
+        If the node is not fully expanded, pick one of the unvisited children.
+        Else, pick the child node with greatest UCT value. If this child node is also
+        fully expanded, repeat process.
+        """
+
+        def fully_expanded(node: int):
+            # Creates all children for node the first time it is reached, and checks visit (0 is unvisited). A node's
+            # state never changes, so neither do its actions. The turns of the opponent's responses are only simulated
+            # once they are selected
+            children = tree.get_children(node)
+            if len(children) == 0:
+                tree.restore(node)
+                for action in get_actions(node):
+                    tree.add_child(node, action)
+                children = tree.get_children(node)
 
+            # A node without any action left is a leaf
+            return len(children) > 0 and all([tree.get_visits(child) > 0 for child in children])
+
+        def pick_unvisited(node: int) -> int:
+            for child in tree.get_children(node):
+                if tree.get_visits(child) == 0:
+                    return child
+            return node
+
+        if use_puct:
+            # PUCT picks among all the children, and the first unvisited one it picks is the leaf
+            while True:
+                fully_expanded(node)
+                children = tree.get_children(node)
+                if len(children) == 0:
+                    break
+                if np.isnan(tree.get_prior(children[0])):
+                    set_priors(node)
+                node = tree.best_child(node, c_puct=puct)
+                if tree.is_pending(node):
+                    play_response(node)
+                if tree.get_visits(node) == 0:
+                    break
+            tree.restore(node)
+            return node
+
+        # Adds the opponents moves as child nodes to player's moves (MCT will calculate best move for both sides)
+        while fully_expanded(node):
+            node = tree.best_child(node)
+
+        leaf = pick_unvisited(node)
+        if tree.is_pending(leaf):
+            play_response(leaf)
+        tree.restore(leaf)
+        return leaf
+
+    def traverse_open_loop(node: int) -> int:
+        """
+        Selects a leaf like traverse, but replays the selected actions from the node's state instead of restoring the
+        states of the nodes, and only considers the actions available in the state the replay reached. The players
+        are left in the state reached at the leaf.
+        """
+        tree.restore(node)
+        # The players leave the node's state, so it must be restored again next time
+        tree.invalidate()
+
+        winner = None
+        while winner is None:
+            existing = {tree.get_action(child): child for child in tree.get_children(node)}
+            children = [existing[action] if action in existing else tree.add_child(node, action)
+                        for action in get_actions(node)]
+            if len(children) == 0:
+                break
+            unvisited = [child for child in children if tree.get_visits(child) == 0]
+            child = unvisited[0] if len(unvisited) > 0 else tree.best_child(node, children)
+
+            # The opponent's responses complete a turn, which is played with fresh chance events
+            if tree.get_depth(child) % 2 == 1:
+                player.set_model(tree.get_model(node))
+                other_player.set_model(tree.get_model(child))
+                winner = Battle(player, other_player, 1 if verbose else 0, rng=rng).play_turn()
+                if winner is not None and predictor is not None and len(unvisited) > 0:
+                    state = tree.get_battle_state()
+                    train_at_root()
+                    state.apply_to(player, other_player)
+                    tree.invalidate()
+
+            node = child
+            if len(unvisited) > 0:
+                break
+        return node
+
+    # Search AlphaZero style once the predictor can guide the search
+    use_puct = puct is not None and predictor is not None and predictor.is_trained()
+    if use_puct:
+        assert not tree.is_open_loop()
+        rollout_depth = 0
+        evaluator = predict_value
+
+    select = traverse_open_loop if tree.is_open_loop() else traverse
+
+    def set_rollout_model(rollout_player: Player, rollout_other_player: Player) -> None:
+        """
+        Sets the model the player uses for the rest of the simulated battle.
+        """
+        if predictor is None or current_learning_turn[0] < learning_turns:
+            rollout_player.set_model(RandomModel(rng))
+        else:
+            model, _, _, _, _ = predictor.predict_move(rollout_player, rollout_other_player)
+            rollout_player.set_model(model)
+
+    def leaf_action(leaf: int, state: BattleState) -> int:
+        """
+        Converts the action of an even depth leaf into a BattleState action.
+        """
+        _, action_type, target = _unpack_action(tree.get_action(leaf))
+        if action_type == MonteCarloActionType.ATTACK:
+            return target
+        order = [state.get_slot_at_index(0, idx) for idx in range(state.get_party_size(0))]
+        return SWITCH_OFFSET + order.index(target)
+
+    def rollout_actions(batch: BattleBatch) -> Optional[np.ndarray]:
+        """
+        Samples the player's rollout action in every battle of a batch from the predictor, with a single forward pass,
+        as set_rollout_model does for a single battle.
+        :return: An (N,) array of actions, or None while the rollouts are random.
+        """
+        if predictor is None or current_learning_turn[0] < learning_turns or not predictor.is_trained():
+            return None
+        outputs = predictor.predict_batch(encode_batch(batch))
+        slots = batch.get_starting_slots(0)
+        num_moves = np.take_along_axis(batch.get_num_moves(0), slots[:, np.newaxis], 1)[:, 0]
+        attack, idx = predictor.sample_actions(outputs, slots, num_moves, batch.get_switch_targets(0))
+        # Switches are sampled among the Pokemon sorted by ID, and played by their index in the party
+        return np.where(attack, idx, SWITCH_OFFSET + batch.get_party_indices(0, idx))
+
+    def play_batch(n: int) -> None:
+        """
+        Selects n leaves, with virtual losses so that they spread out over the tree, and simulates a battle from each
+        of them at once in a BattleBatch. The battles mirror the single leaf simulations below.
+        :param n: The number of leaves.
+        """
+        leaves = []
+        states = []
+        for _ in range(n):
+            leaf = select(root)
+            # Count a visit without any outcome on the path, which looks like a loss to whoever chose each node
+            tree.add_visits(leaf, 1)
+            leaves.append(leaf)
+            states.append(tree.get_battle_state(leaf if not tree.is_open_loop() else None))
+
+        # The player is side 0 of every state, and even depth leaves still have to take their own action
+        has_action = np.array([tree.get_depth(leaf) % 2 == 0 for leaf in leaves])
+        actions = np.array([leaf_action(leaf, state) if leaf_has_action else NO_ACTION
+                            for leaf, state, leaf_has_action in zip(leaves, states, has_action)])
+
+        batch = BattleBatch.from_states(states, seed=rng)
+        other_policy = BattleBatch.damage_actions if use_damage_model else BattleBatch.random_actions
+        # Odd depth leaves already hold the state after their turn, so only even depth leaves play one
+        if has_action.any():
+            batch.play_turn(actions, other_policy(batch, 1), has_action)
+        # The player keeps taking its predicted action while it can, like the model set_rollout_model gives it
+        predicted = rollout_actions(batch) if rollout_depth != 0 else None
+        turns = 0
+        while not batch.is_done() and (rollout_depth is None or turns < rollout_depth):
+            if adjudicate and (batch.adjudicate() | (batch.get_winners() >= 0)).all():
+                break
+            actions = batch.random_actions(0)
+            if predicted is not None:
+                actions = np.where(batch.is_legal(0, predicted), predicted, actions)
+            batch.play_turn(actions, other_policy(batch, 1))
+            turns += 1
+
+        if evaluator is None:
+            outcomes = batch.outcomes(0).tolist()
+        else:
+            outcomes = []
+            for idx in range(len(batch)):
+                batch.get_state(idx).apply_to(player, other_player)
+                outcomes.append(evaluator(player, other_player))
+            tree.invalidate()
+
+        for leaf, outcome in zip(leaves, outcomes):
+            tree.add_visits(leaf, -1)
+            tree.backpropagate(leaf, outcome)
+
+    def is_decided() -> bool:
+        """
+        Checks whether the simulated battle is decided, and if only one side can still damage the other, faints the
+        other side's Pokemon.
+        """
+        can_damage = calculations.can_damage(player, other_player)
+        other_can_damage = calculations.can_damage(other_player, player)
+        if can_damage and other_can_damage:
+            return False
+        if can_damage != other_can_damage:
+            loser = other_player if can_damage else player
+            for pokemon in loser.get_party().get_as_list():
+                pokemon.take_damage(pokemon.get_hp())
+        return True
+
+    def play_out(battle: Battle) -> None:
+        """
+        Plays the rest of a simulated battle, until a side is wiped out, the rollout depth is reached or the result is
+        decided.
+        """
+        turns = 0
+        winner = None
+        while winner is None and (rollout_depth is None or turns < rollout_depth):
+            if adjudicate and is_decided():
+                break
+            winner = battle.play_turn()
+            turns += 1
+
+    stopped_early = [False]
+
+    def has_budget(plays: int) -> bool:
+        """
+        Checks whether another simulation may start after the given number of simulations.
+        """
+        if num_plays is not None and plays >= num_plays:
+            return False
+        if confidence is not None and tree.is_decided(confidence, num_plays - plays if num_plays is not None else None):
+            stopped_early[0] = True
+            return False
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            return False
+        return node_budget is None or tree.get_num_nodes() < node_budget
+
+    current_num_plays = 0
+    if batch_size > 1:
+        while has_budget(current_num_plays):
+            n = batch_size if num_plays is None else min(batch_size, num_plays - current_num_plays)
+            play_batch(n)
+            current_num_plays += n
+        tree.set_last_search(SearchStatistics(current_num_plays, tree.get_num_nodes(), time.perf_counter() - start,
+                                              stopped_early[0]))
+        return tree
+
+    # Play num_plays amount of times, or as many as the budgets allow
+    while has_budget(current_num_plays):
         # -------------------------
         # START OF ACTUAL ALGORITHM
         # -------------------------
-        # Traverse and find the leaf to recur from
-        leaf = traverse(root)
+        # Traverse and find the leaf to recur from. The players are left in the leaf's state.
+        leaf = select(root)
 
         # If the leaf has an even depth, the opponent has yet to chose a move. Thus, set the opp's model to random and
         # take a turn. Then continue to randomly simulate the rest of the battle.
-        if leaf.depth % 2 == 0:
-            # Even depth also indicates the player is player 1.
-            player = leaf.player.copy()
-            other_player = leaf.other_player.copy()
-
+        if tree.get_depth(leaf) % 2 == 0:
             # Adding a move for opponent and taking a turn.
-            player.set_model(leaf.model)
-            other_player.set_model(RandomModel() if not use_damage_model else DamageModel())
+            player.set_model(tree.get_model(leaf))
+            other_player.set_model(opponent_model())
 
-            battle = Battle(player, other_player, 1 if verbose else 0)
+            battle = Battle(player, other_player, 1 if verbose else 0, rng=rng)
             winner = battle.play_turn()
 
-            if winner is None:
-                if predictor is not None and current_learning_turn[0] < learning_turns:
-                    player.set_model(RandomModel())
-                else:
-                    model, _, _, _, _ = predictor.predict_move(player, other_player)
-                    player.set_model(model)
-                battle.play()
-        else:
-            # Odd depth indicates player is player 2.
-            player = leaf.other_player.copy()
-            other_player = leaf.player.copy()
-
-            if predictor is not None and current_learning_turn[0] < learning_turns:
-                player.set_model(RandomModel())
-            else:
-                model, _, _, _, _ = predictor.predict_move(player, other_player)
-                player.set_model(model)
-
-            other_player.set_model(RandomModel() if not use_damage_model else DamageModel())
+            # PUCT searches score the leaf as it stands, without any rollout
+            if winner is None and not use_puct:
+                set_rollout_model(player, other_player)
+                play_out(battle)
+        elif not use_puct:
+            set_rollout_model(player, other_player)
+            other_player.set_model(opponent_model())
 
-            battle = Battle(player, other_player, 1 if verbose else 0)
-            battle.play()
+            battle = Battle(player, other_player, 1 if verbose else 0, rng=rng)
+            play_out(battle)
 
-        outcome = calculations.outcome_func_v1(player, other_player)
+        outcome = (evaluator or calculations.outcome_func_v1)(player, other_player)
+        tree.invalidate()
 
         # On each run, calculate the outcomes via backpropagation
-        backprop(leaf, outcome)
+        tree.backpropagate(leaf, outcome)
+        current_num_plays += 1
 
+    tree.set_last_search(SearchStatistics(current_num_plays, tree.get_num_nodes(), time.perf_counter() - start,
+                                          stopped_early[0]))
     return tree
@@ -0,0 +1,292 @@
+import math
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pokemon_ai.battle import player_hash
+from pokemon_ai.classes import Player
+from pokemon_ai.data import get_party
+from pokemon_ai.ai.models import RandomModel
+from pokemon_ai.utils import RNG
+
+from .compiled_predictor import CompiledPredictor
+from .mcts import make_tree, search_root, merge_root_statistics
+from .predictor import Predictor
+
+
+class MonteCarloTreeTestSuite(unittest.TestCase):
+
+    def test_advance(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+        tree = make_tree(player1, player2, 100, rng=RNG(0))
+        tree.get_next_action()
+        chosen = tree._chosen
+        self.assertTrue(len(chosen.children) > 0)
+
+        # Play out one of the simulated outcomes of the chosen action on the real players
+        outcome = chosen.children[-1]
+        player1.restore(outcome.state[1])
+        player2.restore(outcome.state[0])
+        visits = outcome.visits
+        self.assertTrue(tree.advance(player1, player2))
+        self.assertIs(tree.root, outcome)
+        self.assertEqual(tree.root.depth, 1)
+        self.assertEqual(tree.root.player.get_name(), 'test')
+        self.assertTrue(all([child.depth == 2 for child in tree.root.children]))
+
+        # The search continues from the reused statistics
+        tree = make_tree(player1, player2, 10, tree=tree, rng=RNG(0))
+        self.assertEqual(tree.root.visits, visits + 10)
+
+        # Nothing matches a state the tree never simulated
+        tree.get_next_action()
+        player1.get_party().get_starting().take_damage(1)
+        self.assertFalse(tree.advance(player1, player2))
+
+    def test_merge_root_statistics(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+
+        # The same seed gives the same search, so merging doubles every statistic
+        tree = make_tree(player1, player2, 20, rng=RNG(1))
+        visits = [(child.visits, child.outcome) for child in tree.root.children]
+        self.assertEqual(merge_root_statistics(tree, search_root(player1, player2, 20, rng=RNG(1))), 20)
+        self.assertEqual([(child.visits, child.outcome) for child in tree.root.children],
+                         [(2 * v, 2 * outcome) for v, outcome in visits])
+        self.assertEqual(tree.root.visits, 40)
+
+        # Root actions the tree never expanded get a child with the other search's statistics
+        tree = make_tree(player1, player2, 0, rng=RNG(1))
+        self.assertEqual(len(tree.root.children), 0)
+        self.assertEqual(merge_root_statistics(tree, search_root(player1, player2, 20, rng=RNG(1))), 20)
+        self.assertEqual([(child.visits, child.outcome) for child in tree.root.children], visits)
+        self.assertEqual(tree.root.visits, 20)
+
+    def test_store(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+        tree = make_tree(player1, player2, 30, rng=RNG(2))
+
+        # Children link back to their parent, and every node's state is restored exactly. Only the opponent's
+        # responses that were never selected have no state yet
+        for idx in range(tree.get_num_nodes()):
+            for child in tree.get_children(idx):
+                self.assertEqual(tree.get_parent(child), idx)
+                self.assertEqual(tree.get_depth(child), tree.get_depth(idx) + 1)
+            if tree.is_pending(idx):
+                self.assertEqual(tree.get_depth(idx) % 2, 1)
+                self.assertEqual(tree.get_visits(idx), 0)
+                continue
+            tree.restore(idx)
+            self.assertEqual(tree.get_hashes(idx), tuple([player_hash(player) for player in tree.get_players()]))
+        self.assertIs(tree.get_node(1), tree.root.children[0])
+
+    def test_batched(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+
+        # Virtual losses are taken back, so only the real simulations are counted
+        tree = make_tree(player1, player2, 50, rng=RNG(0), batch_size=16)
+        self.assertEqual(tree.root.visits, 50)
+        self.assertEqual(sum([child.visits for child in tree.root.children]), 50)
+        self.assertTrue(all([0 <= child.outcome <= child.visits for child in tree.root.children]))
+        self.assertIsNotNone(tree.get_next_action())
+
+    def test_open_loop(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+        hashes = (player_hash(player1), player_hash(player2))
+
+        # Nodes keep only statistics, so the one state stored is the root's
+        tree = make_tree(player1, player2, 200, rng=RNG(3), open_loop=True)
+        self.assertTrue(tree.get_num_nodes() > 20)
+        self.assertEqual(tree._num_states, 1)
+        self.assertEqual(tree.root.visits, 200)
+        self.assertTrue(all([tree.get_depth(child) == 2 for child in tree.get_children(0)]))
+        self.assertEqual(sum([child.visits for child in tree.root.children]), 200)
+        self.assertEqual((player_hash(player1), player_hash(player2)), hashes)
+
+        tree = make_tree(player1, player2, 50, rng=RNG(3), batch_size=16, open_loop=True)
+        self.assertEqual(tree.root.visits, 50)
+        self.assertIsNotNone(tree.get_next_action())
+        self.assertFalse(tree.advance(player1, player2))
+
+    def test_budgets(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+
+        # Whichever of the simulations and the budgets runs out first stops the search
+        tree = make_tree(player1, player2, 1000, rng=RNG(0), node_budget=40)
+        search = tree.get_last_search()
+        self.assertTrue(search.simulations < 1000)
+        self.assertEqual(search.simulations, tree.root.visits)
+        self.assertTrue(40 <= search.nodes == tree.get_num_nodes() < 60)
+
+        tree = make_tree(player1, player2, None, rng=RNG(0), time_budget=0.2)
+        self.assertTrue(0 < tree.get_last_search().simulations == tree.root.visits)
+        self.assertTrue(0.2 <= tree.get_last_search().elapsed < 5)
+
+        tree = make_tree(player1, player2, 10, rng=RNG(0), time_budget=0, batch_size=4)
+        self.assertEqual(tree.get_last_search().simulations, 0)
+
+    def test_rollouts(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+
+        # Every simulation ends with the evaluator, whoever it favours
+        for batch_size in [1, 8]:
+            tree = make_tree(player1, player2, 40, rng=RNG(0), batch_size=batch_size, rollout_depth=2,
+                             evaluator=lambda player, other_player: 0.5)
+            self.assertEqual(tree.root.visits, 40)
+            self.assertTrue(all([child.outcome == child.visits / 2 for child in tree.root.children]))
+
+        # Decided simulations are cut short, but still counted
+        for batch_size in [1, 8]:
+            tree = make_tree(player1, player2, 40, rng=RNG(0), batch_size=batch_size, rollout_depth=0, adjudicate=True)
+            self.assertEqual(tree.root.visits, 40)
+            self.assertTrue(all([0 <= child.outcome <= child.visits for child in tree.root.children]))
+
+    def test_leaf_depth(self):
+        player1 = Player('test', get_party('venusaur'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander'), model=RandomModel())
+
+        def pp(player):
+            return sum([move.get_pp() for move in player.get_party().get_starting().get_move_bank().get_as_list()])
+
+        # The first 20 leaves are the root's 4 actions and their 16 responses, which are both one turn deep. Neither
+        # side can switch, so a side uses a PP every turn it can attack
+        for batch_size in [1, 4]:
+            turns = []
+
+            def evaluator(player, other_player):
+                turns.append(max(pp(player1) - pp(player), pp(player2) - pp(other_player)))
+                return 0.5
+
+            make_tree(player1, player2, 20, rng=RNG(0), batch_size=batch_size, rollout_depth=0, evaluator=evaluator)
+            self.assertEqual(turns, [1] * 20, batch_size)
+
+    def test_predicted_rollouts(self):
+        player1 = Player('test', get_party('venusaur'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander'), model=RandomModel())
+
+        # A frozen predictor that always picks the first move
+        bias = np.zeros(31)
+        bias[6] = 10
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'predictor.npz')
+            CompiledPredictor([np.zeros((60, 31))], [bias]).save(path)
+            predictor = Predictor.load(path, verbose=False, rng=RNG(0))
+
+        def pp(player):
+            return [move.get_pp() for move in player.get_party().get_starting().get_move_bank().get_as_list()]
+
+        # The first 20 leaves are one turn deep, and serial and batched rollouts both keep playing the first move after
+        # them, so the other moves are used once at most. Random rollouts use them more
+        for batch_size, predicted in [(1, predictor), (4, predictor), (4, None)]:
+            used = []
+
+            def evaluator(player, other_player):
+                used.append(sum(pp(player1)[1:]) - sum(pp(player)[1:]))
+                return 0.5
+
+            make_tree(player1, player2, 20, predictor=predicted, rng=RNG(0), batch_size=batch_size, rollout_depth=3,
+                      evaluator=evaluator)
+            self.assertEqual(len(used), 20)
+            self.assertEqual(max(used) <= 1, predicted is not None, batch_size)
+
+    def test_predicted_switches(self):
+        # After switching to Bulbasaur, Venusaur is last in the party but still second by ID, so the predictor's second
+        # switch output is about it
+        player1 = Player('test', get_party('squirtle', 'venusaur', 'bulbasaur'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander'), model=RandomModel())
+        player1.get_party().make_starting(2)
+        bias = np.zeros(31)
+        bias[1] = 10
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'predictor.npz')
+            CompiledPredictor([np.zeros((60, 31))], [bias]).save(path)
+            predictor = Predictor.load(path, verbose=False, rng=RNG(0))
+
+        # A rollout turn after the leaf switches to Venusaur, unless it has fainted, in serial and batched searches
+        for batch_size in [1, 4]:
+            starters = []
+
+            def evaluator(player, other_player):
+                starters.append(player.get_party().get_starting().get_name())
+                return 0.5
+
+            make_tree(player1, player2, 20, predictor=predictor, rng=RNG(0), batch_size=batch_size, rollout_depth=1,
+                      evaluator=evaluator)
+            self.assertEqual(len(starters), 20)
+            self.assertTrue(starters.count('Venusaur') >= 15, (batch_size, starters))
+
+    def test_early_stopping(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+
+        # The simulations left cannot change a close decision near the end of the search
+        tree = make_tree(player1, player2, 2000, rng=RNG(0), confidence=0.9)
+        search = tree.get_last_search()
+        self.assertTrue(search.stopped_early)
+        self.assertTrue(search.simulations < 2000)
+        self.assertFalse(tree.is_decided(0.9))
+        for child in tree.root.children:
+            self.assertTrue(0 < child.variance <= 0.25)
+
+        # A clear winner separates from the others: every simulation of the first child gave 0.9, and the others
+        # alternated between 0.2 and 0.8
+        children = tree.get_children(tree.get_root_index())
+        tree.set_statistics(children[0], 20, 18, 16.2)
+        for child in children[1:]:
+            tree.set_statistics(child, 20, 10, 6.8)
+        self.assertAlmostEqual(tree.root.children[0].variance, 0)
+        self.assertAlmostEqual(tree.root.children[1].variance, 0.09 * 20 / 19)
+        self.assertTrue(tree.is_decided(0.99))
+        self.assertFalse(tree.is_decided(remaining_plays=8))
+        self.assertTrue(tree.is_decided(remaining_plays=7))
+        tree.set_statistics(children[1], 20, 17, 14.9)
+        self.assertFalse(tree.is_decided(0.99))
+
+        # A single action needs no search at all
+        for move in player1.get_party().get_starting().get_move_bank().get_as_list()[1:]:
+            move.restore((0, False))
+        player1.get_party().get_at_index(1).take_damage(1000)
+        tree = make_tree(player1, player2, 2000, rng=RNG(0), confidence=0.9)
+        self.assertEqual(tree.get_last_search().simulations, 1)
+
+
+    def test_puct(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+
+        def evaluator(player, other_player):
+            raise AssertionError('PUCT searches score leaves with the predictor')
+
+        # An untrained predictor cannot guide the search yet, so it plays rollouts
+        predictor = Predictor(verbose=False, rng=RNG(0))
+        tree = make_tree(player1, player2, 20, predictor=predictor, rng=RNG(0), puct=1.5)
+        self.assertTrue(all([math.isnan(tree.get_prior(child)) for child in tree.get_children(0)]))
+        predictor.train_model(tree.root, player1, player2)
+
+        # The root's children get the predictor's probabilities as priors, and leaves are never rolled out
+        for batch_size in [1, 8]:
+            tree = make_tree(player1, player2, 40, predictor=predictor, rng=RNG(0), batch_size=batch_size,
+                             evaluator=evaluator, puct=1.5)
+            priors = [tree.get_prior(child) for child in tree.get_children(0)]
+            self.assertAlmostEqual(sum(priors), 1, places=5)
+            self.assertEqual(tree.root.visits, 40)
+            self.assertEqual(sum([child.visits for child in tree.root.children]), 40)
+            self.assertTrue(all([0 <= child.outcome <= child.visits for child in tree.root.children]))
+
+            # Only the opponent's responses that were selected had their turn simulated, one per simulation at most
+            responses = [idx for idx in range(tree.get_num_nodes()) if tree.get_depth(idx) % 2 == 1 and idx != 0]
+            simulated = [idx for idx in responses if not tree.is_pending(idx)]
+            self.assertTrue(0 < len(simulated) <= 40)
+            self.assertTrue(len(simulated) < len(responses))
+
+
+if __name__ == '__main__':
+    unittest.main()
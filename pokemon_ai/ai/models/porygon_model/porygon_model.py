@@ -1,8 +1,11 @@
+import time
 from typing import *
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
 from pokemon_ai.classes import Player, Party, Move, Item
-from .mcts import make_tree
+from pokemon_ai.utils import RNG, get_rng
+from .mcts import make_tree, MonteCarloTree, search_root, merge_root_statistics
+from ..damage_model import DamageModel
 from ..random_model import RandomModel
 from .predictor import Predictor
 
@@ -11,27 +14,188 @@ from pokemon_ai.ai import ModelInterface
 NUM_SIMULATIONS = 50
 
 
+class DecisionStatistics(NamedTuple):
+    """
+    What a PorygonModel did to decide on one turn.
+    """
+    simulations: int
+    nodes: int
+    elapsed: float
+    fallback: bool
+
+
 class PorygonModel(ModelInterface):
     """
     A sample model used to show how to create classes.
     """
-    def __init__(self, use_damage_model=False, verbose=False):
+    def __init__(self, use_damage_model=False, verbose=False, rng: RNG = None, reuse_tree=True, workers: int = 0,
+                 batch_size: int = 1, open_loop=False, num_simulations: Optional[int] = NUM_SIMULATIONS,
+                 time_budget: float = None, node_budget: int = None, min_simulations: int = 0,
+                 rollout_depth: int = None, evaluator: Callable[[Player, Player], float] = None, adjudicate=False,
+                 confidence: float = None, checkpoint: str = None, learn=True, puct: float = None):
+        """
+        Initializes a PorygonModel.
+        :param use_damage_model: Simulate the opponent with a DamageModel instead of a RandomModel.
+        :param verbose: Announce when the model is searching.
+        :param rng: The RNG to search with. Defaults to the process-wide RNG.
+        :param reuse_tree: Keep the search tree between turns, continuing from the branch the battle took.
+        :param workers: The number of worker processes that each search the same state while the model searches, with
+        the same simulation count as this process: num_simulations plus any simulations banked by an early stop, and
+        the same time and node budgets. Their root statistics are merged into the model's tree before deciding. The
+        processes are kept alive across turns until close is called. Trees are not reused when workers are used.
+        :param batch_size: The number of simulations played together in a BattleBatch, see make_tree.
+        :param open_loop: Search open loop trees, which store no battle state in their nodes, see make_tree. Open loop
+        trees are not reused between turns.
+        :param num_simulations: The number of simulations to run per turn at most, in this process and in each worker.
+        None to search until the time budget runs out.
+        :param time_budget: The number of seconds a turn may take at most, measured from the start of take_turn. The
+        search stops when it runs out, and so do the workers'. The last simulation can overrun it.
+        :param node_budget: The number of nodes the search tree may grow to at most.
+        :param min_simulations: The number of simulations needed to trust the search. If fewer were run in total, the
+        model falls back to a DamageModel for the turn.
+        :param rollout_depth: The number of turns simulated past a leaf of the search before scoring the battle, or None
+        to simulate until a side is wiped out.
+        :param evaluator: Scores the end of a simulation for the player, given the player and the opposing player.
+        Defaults to outcome_func_v1. It must be picklable to be used with workers.
+        :param adjudicate: End simulations as soon as only one side can still damage the other.
+        :param confidence: Stop searching once the best action stands out from the others at this confidence level, such
+        as 0.95, see make_tree. The simulations an easy turn saves are banked, and a later turn may run up to twice
+        num_simulations with them.
+        :param checkpoint: The path of a predictor checkpoint saved by save_checkpoint to start from. Loading one does not
+        import sklearn unless the predictor learns.
+        :param learn: Keep training the checkpoint's network during the searches, instead of freezing it.
+        :param puct: Search AlphaZero style with this exploration parameter once the predictor is trained, scoring leaves
+        with the predictor instead of rollouts, see make_tree. Workers have no predictor and keep playing rollouts.
+        """
         super()
         self._verbose = verbose
         self._use_damage_model = use_damage_model
-        self._predictor = Predictor(verbose=verbose)
+        self._rng = rng or get_rng()
+        if checkpoint is not None:
+            self._predictor = Predictor.load(checkpoint, learn=learn, verbose=verbose, rng=self._rng)
+        else:
+            self._predictor = Predictor(verbose=verbose, rng=self._rng)
+        self._reuse_tree = reuse_tree and workers == 0 and not open_loop
+        self._tree: Optional[MonteCarloTree] = None
+        self._last_tree: Optional[MonteCarloTree] = None
+        self._workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._batch_size = batch_size
+        self._open_loop = open_loop
+        self._num_simulations = num_simulations
+        self._time_budget = time_budget
+        self._node_budget = node_budget
+        self._min_simulations = min_simulations
+        self._search_options = {'rollout_depth': rollout_depth, 'evaluator': evaluator, 'adjudicate': adjudicate,
+                                'confidence': confidence, 'puct': puct}
+        self._banked_simulations = 0
+        self._decisions: List[DecisionStatistics] = []
+
+    def get_decision_statistics(self) -> List[DecisionStatistics]:
+        """
+        :return: The statistics of every turn taken so far, in order.
+        """
+        return self._decisions
 
     def take_turn(self, player: Player, other_player: Player, attack: Callable[[Move], None], use_item: Callable[[Item], None], switch_pokemon_at_idx: Callable[[int], None]) -> None:
-        with ThreadPoolExecutor() as executor:
-            self._predictor.predict_move(player, other_player)
-            make_tree_thread = executor.submit(make_tree, player, other_player, NUM_SIMULATIONS, predictor=self._predictor, use_damage_model=self._use_damage_model, verbose=False)
-            if self._verbose:
-                print("%s is formulating a move..." % player.get_name())
-            tree = make_tree_thread.result()
-            model = tree.get_next_action()
-            if self._verbose:
-                print("Done")
-            model.take_turn(player, other_player, attack, use_item, switch_pokemon_at_idx)
+        start = time.perf_counter()
+        num_simulations = self._num_simulations
+        if num_simulations is not None:
+            num_simulations += self._banked_simulations
+
+        # Start the workers first so that they search while this process does
+        futures = []
+        if self._workers > 0:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self._workers)
+            search_player, search_other_player = self._detach(player), self._detach(other_player)
+            futures = [self._pool.submit(search_root, search_player, search_other_player, num_simulations,
+                                         use_damage_model=self._use_damage_model, rng=rng,
+                                         batch_size=self._batch_size, open_loop=self._open_loop,
+                                         time_budget=self._get_time_left(start), node_budget=self._node_budget,
+                                         **self._search_options)
+                       for rng in self._rng.spawn(self._workers)]
+
+        # Continue the previous search if the battle reached one of its simulated outcomes
+        tree = self._tree if self._tree is not None and self._tree.advance(player, other_player) else None
+        if self._verbose:
+            print("%s is formulating a move..." % player.get_name())
+        tree = make_tree(player, other_player, num_simulations, predictor=self._predictor, use_damage_model=self._use_damage_model, verbose=False, rng=self._rng, tree=tree, batch_size=self._batch_size, open_loop=self._open_loop, time_budget=self._get_time_left(start), node_budget=self._node_budget, **self._search_options)
+        simulations = tree.get_last_search().simulations
+        if num_simulations is not None and tree.get_last_search().stopped_early:
+            self._banked_simulations = min(self._num_simulations, num_simulations - simulations)
+        else:
+            self._banked_simulations = 0
+        for future in futures:
+            simulations += merge_root_statistics(tree, future.result())
+
+        # Too few simulations say little about the moves, so play the greedy move instead
+        fallback = simulations < self._min_simulations
+        model = tree.get_next_action() if not fallback else DamageModel(self._rng)
+        self._tree = tree if self._reuse_tree and not fallback else None
+        self._last_tree = tree
+        self._decisions.append(DecisionStatistics(simulations, tree.get_num_nodes(), time.perf_counter() - start,
+                                                  fallback))
+        if self._verbose:
+            print("Done after %d simulations in %.3fs%s" % (simulations, self._decisions[-1].elapsed,
+                                                            " (falling back to DamageModel)" if fallback else ""))
+        model.take_turn(player, other_player, attack, use_item, switch_pokemon_at_idx)
+
+    def get_last_tree(self) -> Optional[MonteCarloTree]:
+        """
+        :return: The tree searched for the last turn, with the root statistics of the workers merged in, or None before
+        the first turn.
+        """
+        return self._last_tree
+
+    def get_predictor(self) -> Predictor:
+        return self._predictor
+
+    def save_checkpoint(self, path: str) -> None:
+        """
+        Saves the predictor's network to a .npz checkpoint, which a new model can start from. The predictor must have
+        learned already.
+        :param path: The path of the checkpoint.
+        """
+        self._predictor.save(path)
 
     def force_switch_pokemon(self, party: Party):
         return RandomModel().force_switch_pokemon(party)
+
+    def close(self):
+        """
+        Shuts down the worker processes, if any, and the predictor's training thread. The worker processes are started
+        again if the model takes another turn.
+        """
+        self._predictor.close()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _get_time_left(self, start: float) -> Optional[float]:
+        """
+        :param start: The time the turn started at, from time.perf_counter.
+        :return: The number of seconds left in the time budget, or None if there is no time budget.
+        """
+        if self._time_budget is None:
+            return None
+        return max(0.0, self._time_budget - (time.perf_counter() - start))
+
+    @staticmethod
+    def _detach(player: Player) -> Player:
+        """
+        Copies a player without its model, so that it can be sent to a worker process.
+        :param player: The player.
+        :return: A copy of the player with no model.
+        """
+        player = player.copy()
+        player.set_model(None)
+        return player
+
+    def __getstate__(self):
+        # Worker processes and search trees stay with the original model
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_tree'] = None
+        state['_last_tree'] = None
+        return state
@@ -1,31 +1,60 @@
+import threading
+from collections import OrderedDict
 from typing import *
 import numpy as np
 
-from sklearn.neural_network import MLPRegressor
-
 from pokemon_ai.ai.models import RandomModel
-from pokemon_ai.classes import Player, Pokemon, Move, Item
+from pokemon_ai.battle import player_hash
+from pokemon_ai.classes import Player, Move, Item
 from pokemon_ai.utils import POKEMON_MOVE_LIMIT, POKEMON_PARTY_LIMIT
-from pokemon_ai.utils import to_probs, chance, chances
+from pokemon_ai.utils import to_probs, RNG, get_rng
 
+from .compiled_predictor import CompiledPredictor
+from .features import INPUT_SIZE, OUTPUT_SIZE, encode_policy, encode_state
 from .models import MonteCarloActionType
+from .replay_buffer import ReplayBuffer
 
-# Very small value used in place of zero to avoid neural net training issues
-EPSILON = 1e-16
+# Defaults of the replay buffer and of the minibatches trained from it
+REPLAY_BUFFER_SIZE = 10000
+MINIBATCH_SIZE = 32
 
-# Input and output sizes of the network
-INPUT_SIZE = 60  # (1 HP, 4 Moves) x 6 Pokemon x 2 Players
-OUTPUT_SIZE = 31  # 6 switches + 4 Moves x 6 Pokemon + 1 outcome value
+# The number of network outputs cached by default
+CACHE_SIZE = 4096
 
 
 class Predictor:
 
-    def __init__(self, hidden_layer_sizes: Tuple[int] = (INPUT_SIZE * 4, INPUT_SIZE * 2), batch_size: Union[int, str] = 'auto', verbose = True):
+    def __init__(self, hidden_layer_sizes: Tuple[int] = (INPUT_SIZE * 4, INPUT_SIZE * 2), batch_size: Union[int, str] = 'auto', verbose = True, rng: RNG = None,
+                 buffer_size: int = REPLAY_BUFFER_SIZE, minibatch_size: int = MINIBATCH_SIZE, train_every: int = 1,
+                 background=False, cache_size: int = CACHE_SIZE):
         """
-        Create an MLP model for training.
+        Create an MLP model for training. Training examples go to a replay buffer, and the model learns from minibatches
+        sampled from it with one partial_fit step each, so that training never starts over. Predictions are made by a
+        CompiledPredictor snapshot of the network, taken again whenever the network has learned. sklearn is only
+        imported once the network first learns.
+        :param rng: The RNG to sample predicted moves and minibatches with. Defaults to the process-wide RNG.
+        :param buffer_size: The number of training examples kept at most. The oldest ones are dropped first.
+        :param minibatch_size: The number of examples in a minibatch.
+        :param train_every: The number of examples added between two minibatches.
+        :param background: Train on a background thread instead of in train_model, which then only adds the example.
+        Call close to stop the thread.
+        :param cache_size: The number of network outputs kept in an LRU cache keyed by the Zobrist hashes of both
+        players, or 0 for no cache. The cache is cleared whenever the network learns.
         """
+        self._rng = rng or get_rng()
         self._is_trained = False
-        self._model = MLPRegressor(
+        self._buffer = ReplayBuffer(buffer_size, INPUT_SIZE, OUTPUT_SIZE, self._rng)
+        self._minibatch_size = minibatch_size
+        self._train_every = train_every
+        self._pending = 0
+        self._background = background
+        self._cache: 'OrderedDict[Tuple[int, int], np.ndarray]' = OrderedDict()
+        self._cache_size = cache_size
+        self._compiled: Optional[CompiledPredictor] = None
+        self._learn = True
+        self._start_training_thread()
+        self._model = None
+        self._model_options = dict(
             hidden_layer_sizes=hidden_layer_sizes,
             activation='relu',
             solver='adam',
@@ -50,15 +79,193 @@ class Predictor:
             n_iter_no_change=10
         )
 
+    @staticmethod
+    def load(path: str, learn=False, **kwargs) -> 'Predictor':
+        """
+        Creates a trained predictor from a checkpoint saved by save, without importing sklearn unless it learns.
+        :param path: The path of the .npz checkpoint.
+        :param learn: Keep training the network from the checkpoint's weights. Otherwise train_model does nothing.
+        :param kwargs: The other arguments of Predictor.
+        :return: The predictor.
+        """
+        predictor = Predictor(**kwargs)
+        predictor._compiled = CompiledPredictor.load(path)
+        predictor._is_trained = True
+        predictor._learn = learn
+        return predictor
+
+    def save(self, path: str) -> None:
+        """
+        Saves a checkpoint of the trained network, see compile.
+        :param path: The path of the .npz file.
+        """
+        self.compile().save(path)
+
+    def compile(self) -> CompiledPredictor:
+        """
+        :return: A snapshot of the trained network, which later training does not change.
+        """
+        assert self._is_trained
+        with self._lock:
+            if self._compiled is None:
+                self._compiled = CompiledPredictor(self._model.coefs_, self._model.intercepts_)
+            return self._compiled
+
     def train_model(self, node: Any, player: Player, other_player: Player) -> None:
         """
-        Trains a sequential model given a list of inputs and outputs.
+        Adds a training example to the replay buffer, and trains on a minibatch every train_every examples.
         :param node: The node where the decision must be made.
         :param player: The player.
         :param other_player: The opposing player.
         """
-        self._is_trained = True
-        self._model.fit([self._make_input_vector(player, other_player)], [self._make_actual_output_list(player, node)])
+        if not self._learn:
+            return
+        with self._lock:
+            input_vector, target = self._buffer.allocate()
+            encode_state(player, other_player, input_vector)
+            encode_policy(player, node, target)
+            self._pending += 1
+        if self._background:
+            self._wake.set()
+        else:
+            self.partial_fit()
+
+    def partial_fit(self) -> int:
+        """
+        Trains on one minibatch for every train_every examples added since the last one.
+        :return: The number of minibatches trained on.
+        """
+        num_minibatches = 0
+        while True:
+            with self._lock:
+                if self._pending < self._train_every:
+                    return num_minibatches
+                self._pending -= self._train_every
+                self.fit_minibatch(*self._buffer.sample(self._minibatch_size))
+            num_minibatches += 1
+
+    def fit_minibatch(self, inputs: np.ndarray, targets: np.ndarray) -> float:
+        """
+        Trains the network on one minibatch with a single partial_fit step.
+        :param inputs: An (N, INPUT_SIZE) array of input vectors.
+        :param targets: An (N, OUTPUT_SIZE) array of target vectors.
+        :return: The loss of the network on the minibatch.
+        """
+        with self._lock:
+            model = self._get_model(inputs, targets)
+            model.partial_fit(inputs, targets)
+            self._is_trained = True
+            self._compiled = None
+            self._cache.clear()
+            return model.loss_
+
+    def _get_model(self, inputs: np.ndarray, targets: np.ndarray) -> Any:
+        """
+        Creates the MLPRegressor the first time the network learns. A network loaded from a checkpoint keeps learning
+        from the checkpoint's weights: a partial_fit step on one example builds the layers, which then take the
+        checkpoint's weights.
+        :param inputs: The input vectors of the first minibatch.
+        :param targets: The targets of the first minibatch, which size the output layer.
+        :return: The MLPRegressor.
+        """
+        if self._model is None:
+            from sklearn.neural_network import MLPRegressor
+            self._model = MLPRegressor(**self._model_options)
+            if self._compiled is not None:
+                coefs, intercepts = self._compiled.get_weights()
+                self._model.partial_fit(inputs[:1], targets[:1])
+                self._model.coefs_ = [np.array(weights, dtype=np.float64) for weights in coefs]
+                self._model.intercepts_ = [np.array(weights, dtype=np.float64) for weights in intercepts]
+        return self._model
+
+    def get_buffer(self) -> ReplayBuffer:
+        return self._buffer
+
+    def close(self) -> None:
+        """
+        Stops the background training thread, if any, after it trains on the examples it was woken up for.
+        """
+        if self._thread is not None:
+            self._stopped = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+
+    def _start_training_thread(self) -> None:
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        if self._background:
+            self._thread = threading.Thread(target=self._train_loop, daemon=True)
+            self._thread.start()
+
+    def _train_loop(self) -> None:
+        while not self._stopped:
+            self._wake.wait()
+            self._wake.clear()
+            self.partial_fit()
+
+    def __getstate__(self):
+        # Threads and locks stay with the original predictor, and copies start their own
+        state = self.__dict__.copy()
+        for name in ['_lock', '_wake', '_thread']:
+            del state[name]
+        state['_cache'] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._start_training_thread()
+
+    def is_trained(self) -> bool:
+        return self._is_trained
+
+    def is_learning(self) -> bool:
+        return self._learn
+
+    def predict_batch(self, inputs: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the network on many input vectors at once, with the CompiledPredictor snapshot of the network.
+        :param inputs: An (N, INPUT_SIZE) array of input vectors, see features.encode_state.
+        :return: An (N, OUTPUT_SIZE) array of outputs.
+        """
+        with self._lock:
+            compiled = self.compile()
+            if len(inputs) == 1:
+                return compiled.predict(inputs[0])[np.newaxis]
+            return compiled.predict_batch(inputs)
+
+    def predict_outputs(self, players: Sequence[Tuple[Player, Player]], keys: Sequence[Tuple[int, int]] = None) -> np.ndarray:
+        """
+        Evaluates the network on the states of many pairs of players, with a single forward pass for those not cached.
+        :param players: (player, other player) pairs.
+        :param keys: The player_hash of both players of every pair, if already known.
+        :return: An (N, OUTPUT_SIZE) array of outputs.
+        """
+        if keys is None:
+            keys = [(player_hash(player), player_hash(other_player)) for player, other_player in players]
+        outputs = np.empty((len(keys), OUTPUT_SIZE))
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                output = self._cache.get(key)
+                if output is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    outputs[i] = output
+            if len(missing) > 0:
+                inputs = np.empty((len(missing), INPUT_SIZE))
+                for row, i in zip(inputs, missing):
+                    encode_state(*players[i], row)
+                outputs[missing] = self.predict_batch(inputs)
+            if self._cache_size > 0:
+                for i in missing:
+                    self._cache[keys[i]] = outputs[i]
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return outputs
 
     def predict_move(self, player: Player, other_player: Player) -> Tuple[RandomModel, MonteCarloActionType, int, List[float], List[float]]:
         """
@@ -67,12 +274,27 @@ class Predictor:
         :param other_player: The opposing player.
         :return: A tuple containing the <move model, move type, move index, move probabilities, switch-out probabilities>.
         """
-        if not self._is_trained:
-            return RandomModel(), MonteCarloActionType.ATTACK, 0, POKEMON_MOVE_LIMIT*[round(1/POKEMON_MOVE_LIMIT)], POKEMON_PARTY_LIMIT* [round(1/POKEMON_PARTY_LIMIT)]
+        return self.predict_moves([(player, other_player)])[0]
 
-        input_matrix = self._make_input_vector(player, other_player)
-        output = self._model.predict([input_matrix])[0]
+    def predict_moves(self, players: Sequence[Tuple[Player, Player]]) -> List[Tuple[RandomModel, MonteCarloActionType, int, List[float], List[float]]]:
+        """
+        Predicts the moves of many players at once, see predict_move.
+        :param players: (player, other player) pairs.
+        :return: A list with a tuple of predict_move for each pair.
+        """
+        if not self._is_trained:
+            return [(RandomModel(self._rng), MonteCarloActionType.ATTACK, 0, POKEMON_MOVE_LIMIT*[round(1/POKEMON_MOVE_LIMIT)], POKEMON_PARTY_LIMIT* [round(1/POKEMON_PARTY_LIMIT)])
+                    for _ in players]
+        outputs = self.predict_outputs(players)
+        return [self.sample_move(player, output) for (player, _), output in zip(players, outputs)]
 
+    def sample_move(self, player: Player, output: np.ndarray) -> Tuple[RandomModel, MonteCarloActionType, int, List[float], List[float]]:
+        """
+        Samples a move from the output of the network.
+        :param player: The player.
+        :param output: The output of the network for the player's state.
+        :return: A tuple like that of predict_move.
+        """
         # Get the index of the 4 current Pokemon moves from the output
         current_pokemon_id = player.get_party().get_starting().get_id()
         current_pokemon_idx = -1
@@ -88,20 +310,25 @@ class Predictor:
             move_probs = output[start_idx:start_idx + POKEMON_MOVE_LIMIT]
         switch_probs = output[:POKEMON_PARTY_LIMIT]
 
+        # Only non-fainted Pokemon other than the starting one can be switched to, by their index in the party
+        party = player.get_party().get_as_list()
+        switch_targets = [party.index(pokemon) for pokemon in player.get_party().get_sorted_list()]
+        switch_options = [idx for idx, target in enumerate(switch_targets) if target > 0 and not party[target].is_fainted()]
+
         # Create the model
-        model = RandomModel()
+        model = RandomModel(self._rng)
 
         # Get probability of attacking and switching
-        all_moves = list(np.concatenate((move_probs, switch_probs), axis=0))
+        all_moves = list(np.concatenate((move_probs, [switch_probs[idx] for idx in switch_options]), axis=0))
         all_moves_probs = to_probs(all_moves)
-        prob_attack = sum(all_moves_probs[:len(move_probs)])
-        move_type = chance(prob_attack, MonteCarloActionType.ATTACK, MonteCarloActionType.SWITCH)
+        prob_attack = sum(all_moves_probs[:len(move_probs)]) if switch_options else 1
+        move_type = self._rng.chance(prob_attack, MonteCarloActionType.ATTACK, MonteCarloActionType.SWITCH)
         move_idx = 0
 
         # Randomly select a move given the move weights
         if move_type == MonteCarloActionType.ATTACK:
             # Get a random move
-            move_idx = chances(move_probs, list(range(len(player.get_party().get_starting().get_move_bank().get_as_list()))))
+            move_idx = self._rng.chances(move_probs, list(range(len(player.get_party().get_starting().get_move_bank().get_as_list()))))
             attack = player.get_party().get_starting().get_move_bank().get_move(move_idx)
 
             # Create a turn function
@@ -112,19 +339,45 @@ class Predictor:
             # Create the model
             model.take_turn = take_turn
         else:
-            # Get a random switch index
-            move_idx = chances(switch_probs, [i for i, _ in enumerate(switch_probs)])
+            # Get a random switch index, among the Pokemon sorted by ID
+            move_idx = self._rng.chances(all_moves_probs[len(move_probs):], switch_options)
+            party_idx = switch_targets[move_idx]
 
             # Create a turn function
             def take_turn(_: Player, __: Player, ___: Callable[[Move], None], ____: Callable[[Item], None],
                           switch_pokemon: Callable[[int], None]):
-                switch_pokemon(move_idx)
+                switch_pokemon(party_idx)
 
             # Create the model
             model.take_turn = take_turn
 
         return model, move_type, move_idx, move_probs, switch_probs
 
+    def sample_actions(self, outputs: np.ndarray, slots: np.ndarray, num_moves: np.ndarray,
+                       switch_targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Samples a move or a switch from the outputs of the network for many states at once, like sample_move, but only
+        among the moves the starting Pokemon has and the Pokemon the player can switch to.
+        :param outputs: An (N, OUTPUT_SIZE) array of outputs.
+        :param slots: An (N,) array with the index of each player's starting Pokemon among its Pokemon sorted by ID.
+        :param num_moves: An (N,) array with the number of moves of each starting Pokemon.
+        :param switch_targets: An (N, POKEMON_PARTY_LIMIT) mask of the Pokemon each player can switch to, sorted by ID.
+        :return: A tuple of an (N,) mask of the states where the player attacks, and an (N,) array with the index of
+        the move, or the index among the Pokemon sorted by ID of the Pokemon to switch to.
+        """
+        # Shift the outputs of the moves and switches so that none is negative, as to_probs does
+        columns = POKEMON_PARTY_LIMIT + slots[:, np.newaxis] * POKEMON_MOVE_LIMIT + np.arange(POKEMON_MOVE_LIMIT)
+        values = np.concatenate((np.take_along_axis(outputs, columns, 1), outputs[:, :POKEMON_PARTY_LIMIT]), axis=1)
+        values = values - np.minimum(values.min(1), 0)[:, np.newaxis]
+        move_values = np.where(np.arange(POKEMON_MOVE_LIMIT) < num_moves[:, np.newaxis], values[:, :POKEMON_MOVE_LIMIT], 0)
+        switch_values = np.where(switch_targets, values[:, POKEMON_MOVE_LIMIT:], 0)
+
+        generator = self._rng.get_generator()
+        move_total, switch_total = move_values.sum(1), switch_values.sum(1)
+        attack = generator.random(len(outputs)) * (move_total + switch_total) < move_total
+        attack |= (move_total + switch_total) <= 0
+        return attack, np.where(attack, _sample_rows(move_values, generator), _sample_rows(switch_values, generator))
+
     @staticmethod
     def _calculate_loss(game_output: np.ndarray, output: np.ndarray):
         """
@@ -149,113 +402,34 @@ class Predictor:
     @staticmethod
     def _make_input_vector(player: Player, other_player: Player) -> np.ndarray:
         """
-        Creates an input vector for the dense net.
+        Creates an input vector for the dense net, see features.encode_state.
         :param player: The focused player.
         :param other_player: The other player.
         :return: A 60-len numpy array with [HP ratio, Move 1 PP ratio, ... Move 4 PP ratio] at each row for max 12 Pokemon,
         flattened.
         """
-        # Store each player's Pokemon lists
-        player_pokemon = player.get_party().get_sorted_list()
-        other_player_pokemon = other_player.get_party().get_sorted_list()
-
-        mat = []
-
-        def fill_rows(pokemon_list: List[Pokemon]):
-            """
-            Fills a list of rows with Pokemon stats.
-            :param pokemon_list: A list of Pokemon.
-            """
-            for pkmn in pokemon_list:
-                row = []
-
-                # Add HP component
-                hp_comp = pkmn.get_hp() / pkmn.get_base_hp()
-                row.append(hp_comp)
-
-                # Add move components
-                move_list = pkmn.get_move_bank().get_as_list()
-                for move in move_list:
-                    move_comp = move.get_pp() / move.get_base_pp()
-                    row.append(move_comp)
-                # Fill remaining moves with 0
-                for _ in range(POKEMON_MOVE_LIMIT - len(move_list)):
-                    row.append(EPSILON)
-
-                # Add row to matrix
-                mat.append(row)
-
-        def fill_empty(num: int):
-            for _ in range(num):
-                mat.append([EPSILON, EPSILON, EPSILON, EPSILON, EPSILON])
-
-        # Fill rows
-        fill_rows(player_pokemon)
-        fill_empty(POKEMON_PARTY_LIMIT - len(player_pokemon))
-        fill_rows(other_player_pokemon)
-        fill_empty(POKEMON_PARTY_LIMIT - len(other_player_pokemon))
-
-        return np.array(mat).flatten()
+        return encode_state(player, other_player)
 
     @staticmethod
     def _make_actual_output_list(player: Player, node: Any) -> np.ndarray:
         """
-        Creates a list of actual output values from a player object and a single node.
+        Creates a list of actual output values from a player object and a single node, see features.encode_policy.
         :param player: A Player that owns the action in the node.
         :param node: A MonteCarloNode.
         :return: A list of output values of length OUTPUT_SIZE (31).
         """
+        return encode_policy(player, node)
 
-        # Get list of Pokemon
-        player_pokemon = player.get_party().get_as_list()
-
-        # Calculate switch probabilities
-        switch_probs = [EPSILON] * len(player_pokemon)
-        for child in node.children:
-            if child.action_type == 0:  # SWITCH
-                pkmn_id = child.action_descriptor
-                switch_idx = 0
-                for i, pkmn in enumerate(player_pokemon):
-                    if pkmn.get_id() == pkmn_id:
-                        switch_idx = i
-                switch_probs[switch_idx] = child.outcome / node.outcome
-        # Create a tuple of switch probability / Pokemon values
-        pokemon_switch_tuple: List[Tuple[float, Pokemon]] = []
-        for i, switch_prob in enumerate(switch_probs):
-            pokemon_switch_tuple.append((switch_prob, player_pokemon[i]))
-        # Sort the tuple by Pokemon ID to retain order
-        pokemon_switch_tuple.sort(key=lambda v: v[1].get_id())
-        # Remake switch_probs in order
-        switch_probs = [tup[0] for tup in pokemon_switch_tuple]
-        # Add extra probs in case of short party
-        for _ in range(POKEMON_PARTY_LIMIT - len(player_pokemon)):
-            switch_probs.append(EPSILON)
-
-        # Add attack moves of every Pokemon
-        pkmn_id_to_move_prob_map = {}
-        for child in node.children:
-            if child.action_type == 0:  # ATTACK
-                pkmn_id = child.detokenize_child()
-                move_idx = child.action_descriptor
-                if pkmn_id not in pkmn_id_to_move_prob_map:
-                    pkmn_id_to_move_prob_map[pkmn_id] = [EPSILON] * POKEMON_MOVE_LIMIT
-                pkmn_id_to_move_prob_map[pkmn_id][move_idx] = child.outcome / node.outcome
-        # Create a list of moves for all Pokemon and then traverse the sorted Pokemon list, adding the prob of each move
-        # one by one.
-        move_probs = []
-        for pkmn in player.get_party().get_sorted_list():
-            pkmn_id = pkmn.get_id()
-            move_probs_for_pkmn = []
-            if pkmn_id in pkmn_id_to_move_prob_map:
-                for move_prob in pkmn_id_to_move_prob_map[pkmn_id]:
-                    move_probs_for_pkmn.append(move_prob)
-            while len(move_probs_for_pkmn) < 4:
-                move_probs_for_pkmn.append(EPSILON)
-            move_probs += move_probs_for_pkmn
-        while len(move_probs) < POKEMON_PARTY_LIMIT * POKEMON_MOVE_LIMIT:
-            move_probs += [EPSILON] * POKEMON_MOVE_LIMIT
-
-        outcome_list = [node.outcome]
-
-        mat = switch_probs + move_probs + outcome_list
-        return np.array(mat)
+
+
+def _sample_rows(weights: np.ndarray, generator: np.random.Generator) -> np.ndarray:
+    """
+    Samples a column from every row of an array of non-negative weights, with probabilities proportional to them.
+    :param weights: An (N, K) array of weights.
+    :param generator: The generator to draw from.
+    :return: An (N,) array of column indices. Rows without any weight give the first column.
+    """
+    cumulative = np.cumsum(weights, axis=1)
+    draws = generator.random(len(weights)) * cumulative[:, -1]
+    picks = np.minimum((cumulative <= draws[:, np.newaxis]).sum(1), weights.shape[1] - 1)
+    return np.where(cumulative[:, -1] > 0, picks, 0)
@@ -1,10 +1,19 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
 
+import numpy as np
+
 from pokemon_ai.battle import Battle
 from pokemon_ai.classes import Player
 from pokemon_ai.data import get_party
 from pokemon_ai.ai.models import RandomModel
+from pokemon_ai.utils import RNG
 
+from .compiled_predictor import CompiledPredictor
+from .models import MonteCarloActionType
 from .predictor import Predictor
 from .mcts import make_tree
 
@@ -45,7 +54,7 @@ class PredictorTestSuite(unittest.TestCase):
         self.assertEqual(31, len(output_vector))
 
     def test_train(self):
-        model = Predictor()
+        model = Predictor(verbose=False, rng=RNG(0))
 
         # Create player objects
         party1 = get_party('venusaur', 'squirtle')
@@ -54,16 +63,133 @@ class PredictorTestSuite(unittest.TestCase):
         player2 = Player('test2', party2, model=RandomModel())
 
         # Construct a game tree
-        tree = make_tree(player1, player2, 100, False)
+        tree = make_tree(player1, player2, 100, rng=RNG(0))
 
-        # Train the model
-        model.train_model(tree.root, player1, player2)
+        # Train the model until it learns the root's mean outcome
+        for _ in range(300):
+            model.train_model(tree.root, player1, player2)
+        outcome = model.predict_outputs([(player1, player2)])[0, -1]
+        self.assertAlmostEqual(outcome, tree.root.outcome / tree.root.visits, delta=0.05)
 
         # Predict the output
-        model, move_probs, switch_probs = model.predict_move(player1, player2)
+        _, move_type, move_idx, move_probs, switch_probs = model.predict_move(player1, player2)
+        moves = player1.get_party().get_starting().get_move_bank().get_as_list()
+        self.assertEqual(len(move_probs), 4)
+        self.assertEqual(len(switch_probs), 6)
+        if move_type == MonteCarloActionType.ATTACK:
+            self.assertTrue(0 <= move_idx < len(moves))
+        else:
+            # Squirtle, the only Pokemon to switch to, is second by ID
+            self.assertEqual(move_idx, 1)
+
+    def test_partial_fit(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+        tree = make_tree(player1, player2, 20, rng=RNG(0))
+
+        # Minibatches are only trained on every few examples
+        model = Predictor(verbose=False, rng=RNG(0), buffer_size=8, minibatch_size=4, train_every=3)
+        for _ in range(2):
+            model.train_model(tree.root, player1, player2)
+        self.assertFalse(model._is_trained)
+        for _ in range(10):
+            model.train_model(tree.root, player1, player2)
+        self.assertTrue(model._is_trained)
+        self.assertEqual(len(model.get_buffer()), 8)
+        # The first minibatch held the 3 examples there were, and the others 4 each
+        self.assertEqual(model._model.t_, 3 + 3 * 4)
+
+        # A background thread trains on everything it was woken up for before closing
+        model = Predictor(verbose=False, rng=RNG(0), train_every=2, background=True)
+        for _ in range(6):
+            model.train_model(tree.root, player1, player2)
+        model.close()
+        self.assertTrue(model._is_trained)
+        self.assertEqual(model.partial_fit(), 0)
+
+    def test_predict_batch(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+        tree = make_tree(player1, player2, 20, rng=RNG(0))
+        model = Predictor(verbose=False, rng=RNG(0), cache_size=2)
+        model.train_model(tree.root, player1, player2)
 
-        print('Venusaur against Charmander:')
-        print(["%s (prob. %.4f)" % (move.get_name(), prob) for move, prob in zip(player1.get_party().get_starting().get_move_bank().get_as_list(), move_probs)])
+        # The float32 forward pass matches MLPRegressor, for every row of the batch
+        inputs = np.array([Predictor._make_input_vector(player1, player2), Predictor._make_input_vector(player2, player1)])
+        np.testing.assert_allclose(model.predict_batch(inputs), model._model.predict(inputs), rtol=1e-4, atol=1e-6)
+
+        # Repeated states come from the cache, which keeps the most recently used outputs
+        outputs = model.predict_outputs([(player1, player2), (player2, player1), (player1, player2)])
+        np.testing.assert_allclose(outputs, model._model.predict(inputs[[0, 1, 0]]), rtol=1e-4, atol=1e-6)
+        self.assertEqual(len(model._cache), 2)
+        player1.get_party().get_starting().take_damage(1)
+        model.predict_outputs([(player1, player2)])
+        self.assertEqual(len(model._cache), 2)
+
+        # Learning changes the outputs, so the cache starts over
+        model.train_model(tree.root, player1, player2)
+        self.assertEqual(len(model._cache), 0)
+
+    def test_sample_actions(self):
+        model = Predictor(verbose=False, rng=RNG(0))
+        outputs = np.zeros((3, 31))
+
+        # The second move of the first Pokemon, the third move of the second one, and a switch to the fifth Pokemon
+        outputs[0, 6 + 1] = 1
+        outputs[1, 6 + 4 + 2] = 1
+        outputs[2, 4] = 1
+        targets = np.ones((3, 6), dtype=bool)
+        attack, idx = model.sample_actions(outputs, np.array([0, 1, 0]), np.array([4, 4, 4]), targets)
+        np.testing.assert_array_equal(attack, [True, True, False])
+        np.testing.assert_array_equal(idx, [1, 2, 4])
+
+        # A Pokemon that cannot be switched to is never picked
+        targets[2, 4] = False
+        attack, idx = model.sample_actions(outputs, np.array([0, 1, 0]), np.array([4, 4, 4]), targets)
+        self.assertTrue(attack[2] or idx[2] != 4)
+
+        # Only the moves the Pokemon has are sampled, and negative outputs are shifted like to_probs does
+        outputs = np.full((100, 31), -1.0)
+        outputs[:, 5] = 2
+        outputs[:, 6:10] = [0, 0, 0, 5]
+        attack, idx = model.sample_actions(outputs, np.zeros(100, dtype=int), np.full(100, 3), np.ones((100, 6), bool))
+        self.assertTrue(np.all(idx[attack] < 3))
+        self.assertTrue(np.all(idx[~attack] == 5))
+        self.assertTrue(0 < attack.sum() < 100)
+
+    def test_checkpoint(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+        tree = make_tree(player1, player2, 20, rng=RNG(0))
+        model = Predictor(verbose=False, rng=RNG(0))
+        model.train_model(tree.root, player1, player2)
+        outputs = model.predict_outputs([(player1, player2)])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'predictor.npz')
+            model.save(path)
+
+            # A frozen checkpoint predicts like the network it was saved from
+            loaded = Predictor.load(path, verbose=False)
+            np.testing.assert_array_equal(loaded.predict_outputs([(player1, player2)]), outputs)
+            loaded.train_model(tree.root, player1, player2)
+            self.assertIsNone(loaded._model)
+
+            # Learning continues from the checkpoint's weights
+            loaded = Predictor.load(path, learn=True, verbose=False)
+            loaded.train_model(tree.root, player1, player2)
+            model.train_model(tree.root, player1, player2)
+            self.assertFalse(np.allclose(loaded.predict_outputs([(player1, player2)]), outputs))
+            # A step of the optimizer moves each weight by about the learning rate
+            coefs, intercepts = CompiledPredictor.load(path).get_weights()
+            for weights, learned in zip(coefs + intercepts, loaded._model.coefs_ + loaded._model.intercepts_):
+                self.assertTrue(np.allclose(learned, weights, atol=0.01))
+
+            # Booting a model from the checkpoint needs no sklearn
+            script = "import sys; from pokemon_ai.ai.models.porygon_model import PorygonModel; " \
+                     "PorygonModel(checkpoint=sys.argv[1]); print('sklearn' in sys.modules)"
+            result = subprocess.run([sys.executable, '-c', script, path], capture_output=True, text=True, check=True)
+            self.assertEqual(result.stdout.strip(), 'False')
 
 
 if __name__ == '__main__':
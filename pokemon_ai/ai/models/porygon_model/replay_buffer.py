@@ -0,0 +1,65 @@
+from typing import *
+
+import numpy as np
+
+from pokemon_ai.utils import RNG, get_rng
+
+
+class ReplayBuffer:
+    """
+    A bounded buffer of (input, target) training pairs. Once full, every new pair overwrites the oldest one.
+    """
+
+    def __init__(self, capacity: int, input_size: int, output_size: int, rng: RNG = None):
+        """
+        Initializes a ReplayBuffer.
+        :param capacity: The number of pairs kept at most.
+        :param input_size: The length of an input vector.
+        :param output_size: The length of a target vector.
+        :param rng: The RNG minibatches are sampled with. Defaults to the process-wide RNG.
+        """
+        assert capacity > 0
+        self._inputs = np.zeros((capacity, input_size))
+        self._targets = np.zeros((capacity, output_size))
+        self._size = 0
+        self._next = 0
+        self._rng = rng or get_rng()
+
+    def __len__(self):
+        return self._size
+
+    def get_capacity(self) -> int:
+        return len(self._inputs)
+
+    def add(self, input_vector: np.ndarray, target: np.ndarray) -> None:
+        """
+        Adds a pair, overwriting the oldest one if the buffer is full.
+        :param input_vector: The input vector.
+        :param target: The target vector.
+        """
+        inputs, targets = self.allocate()
+        inputs[:] = input_vector
+        targets[:] = target
+
+    def allocate(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Claims the slot of a new pair, overwriting the oldest one if the buffer is full, for the caller to write into.
+        :return: A tuple of views of the input vector and the target vector of the slot.
+        """
+        idx = self._next
+        self._next = (self._next + 1) % len(self._inputs)
+        self._size = min(self._size + 1, len(self._inputs))
+        return self._inputs[idx], self._targets[idx]
+
+    def sample(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Samples a minibatch of pairs without replacement.
+        :param n: The number of pairs. All of them are returned if the buffer holds fewer.
+        :return: A tuple of an (n, input size) array of inputs and an (n, output size) array of targets.
+        """
+        idx = self._rng.get_generator().choice(self._size, min(n, self._size), replace=False)
+        return self._inputs[idx], self._targets[idx]
+
+    def clear(self) -> None:
+        self._size = 0
+        self._next = 0
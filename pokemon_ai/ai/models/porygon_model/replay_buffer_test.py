@@ -0,0 +1,27 @@
+import unittest
+
+import numpy as np
+
+from pokemon_ai.utils import RNG
+
+from .replay_buffer import ReplayBuffer
+
+
+class ReplayBufferTestSuite(unittest.TestCase):
+
+    def test_add_and_sample(self):
+        buffer = ReplayBuffer(4, 2, 1, RNG(0))
+        for i in range(6):
+            buffer.add(np.array([i, i]), np.array([-i]))
+        self.assertEqual(len(buffer), 4)
+
+        # The two oldest pairs were overwritten, and pairs stay together
+        inputs, targets = buffer.sample(10)
+        self.assertEqual(inputs.shape, (4, 2))
+        self.assertEqual(sorted(inputs[:, 0].tolist()), [2, 3, 4, 5])
+        self.assertTrue((inputs[:, 1] == -targets[:, 0]).all())
+        self.assertEqual(len(buffer.sample(3)[0]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
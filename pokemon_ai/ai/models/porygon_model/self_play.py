@@ -0,0 +1,232 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import *
+
+import numpy as np
+
+from pokemon_ai.ai import ModelInterface
+from pokemon_ai.battle import Battle
+from pokemon_ai.classes import Bag, Item, Move, Party, Player
+from pokemon_ai.data import get_random_party
+from pokemon_ai.utils import POKEMON_PARTY_LIMIT, RNG, get_rng
+
+from .features import INPUT_SIZE, POLICY_SIZE, encode_policy, encode_state
+from .porygon_model import PorygonModel
+from ..random_model import RandomModel
+
+# The number of positions in a shard, and the name of the manifest listing the shards of a dataset
+SHARD_SIZE = 65536
+MANIFEST_NAME = 'manifest.json'
+
+# The number of games queued per worker process, so that finished games are written while the others play
+GAMES_IN_FLIGHT = 4
+
+
+##
+# Datasets
+##
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    """
+    Reads the manifest of a self-play dataset.
+    :param directory: The directory of the dataset.
+    :return: A dictionary with the input size, the policy size, the number of positions ('size') and the list of
+    shards, each a dictionary with the shard's file name and number of positions. An empty dataset if there is none.
+    """
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'input_size': INPUT_SIZE, 'policy_size': POLICY_SIZE, 'size': 0, 'shards': []}
+    with open(path) as file:
+        return json.load(file)
+
+
+def open_shard(directory: str, shard: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Memory-maps the arrays of a shard. Compressed shards cannot be mapped, so the first time a shard is opened its
+    arrays are unpacked one at a time into .npy files in a directory named after it.
+    :param directory: The directory of the dataset.
+    :param shard: The shard's entry in the manifest.
+    :return: A tuple of the read-only inputs, policies and outcomes of the shard.
+    """
+    unpacked = os.path.join(directory, os.path.splitext(shard['file'])[0])
+    names = ['inputs', 'policies', 'outcomes']
+    if not all([os.path.exists(os.path.join(unpacked, name + '.npy')) for name in names]):
+        os.makedirs(unpacked, exist_ok=True)
+        with np.load(os.path.join(directory, shard['file'])) as arrays:
+            for name in names:
+                # Write under another name first, so that an interrupted unpacking is never mistaken for a finished one
+                path = os.path.join(unpacked, name + '.npy')
+                np.save(path + '.tmp.npy', arrays[name])
+                os.replace(path + '.tmp.npy', path)
+    return tuple([np.load(os.path.join(unpacked, name + '.npy'), mmap_mode='r') for name in names])
+
+
+class ShardWriter:
+    """
+    Streams positions into fixed-size compressed .npz shards, each holding the float32 arrays 'inputs' (N, INPUT_SIZE),
+    'policies' (N, POLICY_SIZE) and 'outcomes' (N,). The manifest is rewritten after every shard, so a dataset stays
+    readable if its generation is interrupted, and a writer opened on an existing dataset adds shards to it.
+    """
+
+    def __init__(self, directory: str, shard_size: int = SHARD_SIZE):
+        """
+        Initializes a ShardWriter.
+        :param directory: The directory of the dataset, created if missing.
+        :param shard_size: The number of positions in every shard but the last one.
+        """
+        assert shard_size > 0
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._manifest = read_manifest(directory)
+        self._inputs = np.empty((shard_size, INPUT_SIZE), dtype=np.float32)
+        self._policies = np.empty((shard_size, POLICY_SIZE), dtype=np.float32)
+        self._outcomes = np.empty(shard_size, dtype=np.float32)
+        self._size = 0
+
+    def __len__(self):
+        return self._manifest['size'] + self._size
+
+    def get_num_shards(self) -> int:
+        return len(self._manifest['shards'])
+
+    def add(self, inputs: np.ndarray, policies: np.ndarray, outcomes: np.ndarray) -> None:
+        """
+        Adds positions, writing every shard they fill.
+        :param inputs: An (N, INPUT_SIZE) array of input vectors.
+        :param policies: An (N, POLICY_SIZE) array of search policies.
+        :param outcomes: An (N,) array of final outcomes.
+        """
+        start = 0
+        while start < len(inputs):
+            n = min(len(inputs) - start, len(self._inputs) - self._size)
+            self._inputs[self._size:self._size + n] = inputs[start:start + n]
+            self._policies[self._size:self._size + n] = policies[start:start + n]
+            self._outcomes[self._size:self._size + n] = outcomes[start:start + n]
+            self._size += n
+            start += n
+            if self._size == len(self._inputs):
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the positions added since the last shard into a shard of their own, if any, and the manifest.
+        """
+        if self._size == 0:
+            return
+        name = 'shard-%05d.npz' % len(self._manifest['shards'])
+        np.savez_compressed(os.path.join(self._directory, name), inputs=self._inputs[:self._size],
+                            policies=self._policies[:self._size], outcomes=self._outcomes[:self._size])
+        self._manifest['shards'].append({'file': name, 'size': self._size})
+        self._manifest['size'] += self._size
+        self._size = 0
+
+        # Replace the manifest at once, so that it always lists complete shards
+        path = os.path.join(self._directory, MANIFEST_NAME)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self._manifest, file, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Writes the last shard.
+        :return: The manifest, see read_manifest.
+        """
+        self.flush()
+        return self._manifest
+
+
+##
+# Self-Play
+##
+
+class _RecordingModel(ModelInterface):
+    """
+    Plays with a PorygonModel and records the state and the search policy of every turn it takes.
+    """
+
+    def __init__(self, model: PorygonModel):
+        self.model = model
+        self.inputs: List[np.ndarray] = []
+        self.policies: List[np.ndarray] = []
+
+    def take_turn(self, player: Player, other_player: Player, attack: Callable[[Move], None], use_item: Callable[[Item], None], switch_pokemon_at_idx: Callable[[int], None]) -> None:
+        input_vector = encode_state(player, other_player)
+        self.model.take_turn(player, other_player, attack, use_item, switch_pokemon_at_idx)
+        tree = self.model.get_last_tree()
+        if tree is not None and len(tree.root.children) > 0:
+            self.inputs.append(input_vector)
+            self.policies.append(encode_policy(player, tree.root, visits=True)[:POLICY_SIZE])
+
+    def force_switch_pokemon(self, party: Party) -> int:
+        return self.model.force_switch_pokemon(party)
+
+
+def play_game(rng: RNG, party_size: int = POKEMON_PARTY_LIMIT, self_play=True,
+              **model_options) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Plays a battle between random parties and records every decision of the PorygonModels in it.
+    :param rng: The RNG of the parties, the battle and the models.
+    :param party_size: The number of Pokemon in each party.
+    :param self_play: Both players are PorygonModels, otherwise the second player is a RandomModel.
+    :param model_options: The arguments of the PorygonModels, such as num_simulations.
+    :return: A tuple of the (N, INPUT_SIZE) input vectors, the (N, POLICY_SIZE) search policies and the (N,) final
+    outcomes of the decisions, 1 for the player who won the battle and 0 for the other.
+    """
+    models = [_RecordingModel(PorygonModel(rng=rng, **model_options))]
+    models.append(_RecordingModel(PorygonModel(rng=rng, **model_options)) if self_play else RandomModel(rng))
+    players = [Player('Player %d' % (side + 1), get_random_party(party_size, rng), Bag(), model, player_id=side + 1)
+               for side, model in enumerate(models)]
+    winner = Battle(players[0], players[1], 0, rng=rng).play()
+
+    inputs, policies, outcomes = [], [], []
+    for player, model in zip(players, models):
+        if isinstance(model, _RecordingModel):
+            model.model.close()
+            inputs += model.inputs
+            policies += model.policies
+            outcomes += [1.0 if player is winner else 0.0] * len(model.inputs)
+    return (np.array(inputs, dtype=np.float32).reshape(-1, INPUT_SIZE),
+            np.array(policies, dtype=np.float32).reshape(-1, POLICY_SIZE), np.array(outcomes, dtype=np.float32))
+
+
+def generate(directory: str, num_games: int, workers: int = 0, shard_size: int = SHARD_SIZE, rng: RNG = None,
+             verbose=False, **game_options) -> Dict[str, Any]:
+    """
+    Plays self-play games across a process pool and streams their decisions into a sharded dataset as the games
+    finish. Only a few games per worker are queued at a time, so memory stays bounded however many games are played.
+    :param directory: The directory of the dataset. Shards are added to any dataset already there.
+    :param num_games: The number of games to play.
+    :param workers: The number of worker processes, or 0 to play in this process.
+    :param shard_size: The number of positions in a shard, see ShardWriter.
+    :param rng: The RNG the games' RNGs are spawned from. Defaults to the process-wide RNG.
+    :param verbose: Announce every shard written.
+    :param game_options: The other arguments of play_game, such as self_play and num_simulations.
+    :return: The manifest of the dataset, see read_manifest.
+    """
+    writer = ShardWriter(directory, shard_size)
+    rng = rng or get_rng()
+    rngs = (rng.spawn(1)[0] for _ in range(num_games))
+
+    def write(result: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> None:
+        num_shards = writer.get_num_shards()
+        writer.add(*result)
+        if verbose and writer.get_num_shards() > num_shards:
+            print("Wrote shard %d, %d positions so far" % (writer.get_num_shards(), len(writer)))
+
+    if workers == 0:
+        for game_rng in rngs:
+            write(play_game(game_rng, **game_options))
+        return writer.close()
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = set()
+        for game_rng in rngs:
+            futures.add(pool.submit(play_game, game_rng, **game_options))
+            if len(futures) >= workers * GAMES_IN_FLIGHT:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future.result())
+        for future in futures:
+            write(future.result())
+    return writer.close()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pokemon_ai.utils import RNG
+
+from .features import INPUT_SIZE, POLICY_SIZE
+from .self_play import ShardWriter, generate, play_game, read_manifest
+
+
+class SelfPlayTestSuite(unittest.TestCase):
+
+    def test_shard_writer(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # Positions fill fixed-size shards, and the last one holds the rest
+            writer = ShardWriter(directory, shard_size=4)
+            inputs = np.arange(7 * INPUT_SIZE, dtype=np.float32).reshape(7, INPUT_SIZE)
+            writer.add(inputs, np.zeros((7, POLICY_SIZE)), np.arange(7))
+            self.assertEqual(read_manifest(directory)['size'], 4)
+            manifest = writer.close()
+            self.assertEqual([shard['size'] for shard in manifest['shards']], [4, 3])
+            self.assertEqual(read_manifest(directory), manifest)
+            with np.load(os.path.join(directory, manifest['shards'][1]['file'])) as shard:
+                np.testing.assert_array_equal(shard['inputs'], inputs[4:])
+                np.testing.assert_array_equal(shard['outcomes'], [4, 5, 6])
+
+            # A new writer adds shards to the dataset
+            writer = ShardWriter(directory, shard_size=4)
+            writer.add(inputs[:2], np.zeros((2, POLICY_SIZE)), np.zeros(2))
+            self.assertEqual(len(writer), 9)
+            self.assertEqual(len(writer.close()['shards']), 3)
+
+    def test_play_game(self):
+        # Every decision of the searching player is recorded, with the visit shares of its actions
+        inputs, policies, outcomes = play_game(RNG(0), party_size=2, self_play=False, num_simulations=10)
+        self.assertTrue(len(inputs) > 0)
+        self.assertEqual(inputs.shape, (len(outcomes), INPUT_SIZE))
+        np.testing.assert_allclose(policies.sum(axis=1), 1, atol=1e-5)
+        self.assertTrue(np.all(outcomes == outcomes[0]))
+
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = generate(directory, 2, rng=RNG(0), party_size=2, num_simulations=10)
+            self.assertEqual(manifest['size'], sum([shard['size'] for shard in manifest['shards']]))
+            self.assertTrue(manifest['size'] > len(inputs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import os
+import time
+from typing import *
+
+import numpy as np
+
+from pokemon_ai.utils import RNG, get_rng
+
+from .features import INPUT_SIZE, OUTPUT_SIZE
+from .predictor import Predictor, MINIBATCH_SIZE
+from .self_play import read_manifest, open_shard
+
+# The number of rows read from a memory-mapped shard at a time
+CHUNK_SIZE = 1024
+
+# The number of positions the shuffle buffer holds, which bounds how far apart shuffled positions can come from
+SHUFFLE_BUFFER_SIZE = 65536
+
+# The share of every shard held out for validation
+VALIDATION_FRACTION = 0.05
+
+
+class EpochStatistics(NamedTuple):
+    """
+    What one epoch of offline training did.
+    """
+    epoch: int
+    minibatches: int
+    train_loss: float
+    validation_loss: float
+    elapsed: float
+
+
+##
+# Pipeline
+##
+
+def read_chunks(directory: str, validation=False, validation_fraction: float = VALIDATION_FRACTION,
+                rng: RNG = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Streams the positions of a dataset from its memory-mapped shards, a chunk at a time.
+    :param directory: The directory of the dataset, see self_play.generate.
+    :param validation: Read the validation positions, the last validation_fraction of every shard, instead of the
+    training positions.
+    :param validation_fraction: The share of every shard held out for validation.
+    :param rng: Shuffles the order of the shards and of the chunks in each shard, or None to read them in order.
+    :return: An iterator of (inputs, targets) chunks, targets being the policies followed by the outcomes.
+    """
+    shards = read_manifest(directory)['shards']
+    order = rng.get_generator().permutation(len(shards)) if rng is not None else range(len(shards))
+    for shard_idx in order:
+        inputs, policies, outcomes = open_shard(directory, shards[shard_idx])
+        split = len(inputs) - int(round(len(inputs) * validation_fraction))
+        start, end = (split, len(inputs)) if validation else (0, split)
+        chunks = np.arange(start, end, CHUNK_SIZE)
+        if rng is not None:
+            chunks = rng.get_generator().permutation(chunks)
+        for chunk_start in chunks:
+            chunk_end = min(chunk_start + CHUNK_SIZE, end)
+            targets = np.empty((chunk_end - chunk_start, OUTPUT_SIZE))
+            targets[:, :-1] = policies[chunk_start:chunk_end]
+            targets[:, -1] = outcomes[chunk_start:chunk_end]
+            yield np.asarray(inputs[chunk_start:chunk_end], dtype=np.float64), targets
+
+
+def shuffle_batches(chunks: Iterable[Tuple[np.ndarray, np.ndarray]], batch_size: int, rng: RNG,
+                    buffer_size: int = SHUFFLE_BUFFER_SIZE) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Shuffles a stream of chunks through a bounded buffer and cuts it into minibatches. Once the buffer is full, every
+    minibatch is drawn at random from it and its place is taken by the next positions of the stream.
+    :param chunks: An iterable of (inputs, targets) chunks.
+    :param batch_size: The number of positions in a minibatch. The last minibatch may hold fewer.
+    :param rng: The RNG the minibatches are drawn with.
+    :param buffer_size: The number of positions the buffer holds at most.
+    :return: An iterator of (inputs, targets) minibatches.
+    """
+    buffer_size = max(buffer_size, batch_size)
+    generator = rng.get_generator()
+    buffer_inputs = np.empty((buffer_size, INPUT_SIZE))
+    buffer_targets = np.empty((buffer_size, OUTPUT_SIZE))
+    size = 0
+    for inputs, targets in chunks:
+        start = 0
+        while start < len(inputs):
+            n = min(len(inputs) - start, buffer_size - size)
+            buffer_inputs[size:size + n] = inputs[start:start + n]
+            buffer_targets[size:size + n] = targets[start:start + n]
+            size += n
+            start += n
+            if size == buffer_size:
+                idx = generator.choice(size, batch_size, replace=False)
+                yield buffer_inputs[idx], buffer_targets[idx]
+
+                # Fill the holes left below the new size with the positions left above it
+                size -= batch_size
+                holes = idx[idx < size]
+                tail = np.setdiff1d(np.arange(size, size + batch_size), idx)
+                buffer_inputs[holes] = buffer_inputs[tail]
+                buffer_targets[holes] = buffer_targets[tail]
+
+    # Drain what is left
+    idx = generator.permutation(size)
+    for start in range(0, size, batch_size):
+        yield buffer_inputs[idx[start:start + batch_size]], buffer_targets[idx[start:start + batch_size]]
+
+
+##
+# Training
+##
+
+def evaluate(predictor: Predictor, chunks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> float:
+    """
+    Computes the mean squared error of the predictor over a stream of chunks.
+    :param predictor: A trained predictor.
+    :param chunks: An iterable of (inputs, targets) chunks.
+    :return: The mean squared error per output, or NaN if there are no positions.
+    """
+    total = 0.0
+    count = 0
+    for inputs, targets in chunks:
+        total += float(np.square(predictor.predict_batch(inputs) - targets).sum())
+        count += targets.size
+    return total / count if count > 0 else float('nan')
+
+
+def train(directory: str, predictor: Predictor = None, epochs: int = 1, minibatch_size: int = MINIBATCH_SIZE,
+          shuffle_buffer_size: int = SHUFFLE_BUFFER_SIZE, validation_fraction: float = VALIDATION_FRACTION,
+          checkpoint_path: str = None, checkpoint_every: int = 1000, rng: RNG = None,
+          verbose=False) -> Tuple[Predictor, List[EpochStatistics]]:
+    """
+    Trains a predictor offline on a self-play dataset. The shards are memory-mapped and streamed through a bounded
+    shuffle buffer, so the dataset is never loaded into memory at once.
+    :param directory: The directory of the dataset, see self_play.generate.
+    :param predictor: The predictor to keep training, such as one loaded from a checkpoint with learn=True, or None
+    for a new one.
+    :param epochs: The number of passes over the training positions.
+    :param minibatch_size: The number of positions in a minibatch, each trained on with one partial_fit step.
+    :param shuffle_buffer_size: The number of positions the shuffle buffer holds, see shuffle_batches.
+    :param validation_fraction: The share of every shard held out for validation, scored after every epoch.
+    :param checkpoint_path: The .npz file the predictor is saved to every checkpoint_every minibatches and after every
+    epoch, or None to save nothing.
+    :param checkpoint_every: The number of minibatches between two checkpoints.
+    :param rng: The RNG the positions are shuffled with. Defaults to the process-wide RNG.
+    :param verbose: Announce the losses of every epoch.
+    :return: A tuple of the predictor and the statistics of every epoch.
+    """
+    rng = rng or get_rng()
+    predictor = predictor or Predictor(verbose=False, rng=rng)
+    statistics = []
+    minibatches = 0
+
+    def save_checkpoint() -> None:
+        if checkpoint_path is not None and predictor.is_trained():
+            # Replace the checkpoint at once, so that an interrupted save never leaves a broken one
+            predictor.save(checkpoint_path + '.tmp.npz')
+            os.replace(checkpoint_path + '.tmp.npz', checkpoint_path)
+
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        epoch_minibatches = 0
+        loss = 0.0
+        chunks = read_chunks(directory, validation_fraction=validation_fraction, rng=rng)
+        for inputs, targets in shuffle_batches(chunks, minibatch_size, rng, shuffle_buffer_size):
+            loss += predictor.fit_minibatch(inputs, targets)
+            epoch_minibatches += 1
+            minibatches += 1
+            if minibatches % checkpoint_every == 0:
+                save_checkpoint()
+        save_checkpoint()
+
+        validation_loss = float('nan')
+        if predictor.is_trained():
+            validation_loss = evaluate(predictor, read_chunks(directory, True, validation_fraction))
+        statistics.append(EpochStatistics(epoch, epoch_minibatches, loss / max(epoch_minibatches, 1), validation_loss,
+                                          time.perf_counter() - start))
+        if verbose:
+            print("Epoch %d: %d minibatches, training loss %.5f, validation loss %.5f in %.2fs" % statistics[-1])
+    return predictor, statistics
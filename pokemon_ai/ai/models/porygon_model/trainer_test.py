@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pokemon_ai.utils import RNG
+
+from .features import INPUT_SIZE, OUTPUT_SIZE, POLICY_SIZE
+from .predictor import Predictor
+from .self_play import ShardWriter
+from .trainer import read_chunks, shuffle_batches, train
+
+
+def _write_dataset(directory: str, size: int, shard_size: int) -> None:
+    generator = np.random.default_rng(0)
+    inputs = generator.random((size, INPUT_SIZE))
+    inputs[:, 0] = np.arange(size)
+    writer = ShardWriter(directory, shard_size)
+    writer.add(inputs, generator.random((size, POLICY_SIZE)), inputs[:, 1] > 0.5)
+    writer.close()
+
+
+class TrainerTestSuite(unittest.TestCase):
+
+    def test_shuffle_batches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            _write_dataset(directory, 250, 100)
+
+            # Every training position comes out once, in minibatches drawn from a bounded buffer
+            chunks = list(read_chunks(directory, validation_fraction=0.1, rng=RNG(0)))
+            batches = list(shuffle_batches(chunks, 16, RNG(0), buffer_size=40))
+            ids = np.concatenate([inputs[:, 0] for inputs, _ in batches])
+            self.assertEqual(sorted(ids.tolist()), sorted(np.concatenate([inputs[:, 0] for inputs, _ in chunks]).tolist()))
+            self.assertEqual(len(ids), 90 + 90 + 45)
+            self.assertNotEqual(ids.tolist(), sorted(ids.tolist()))
+            for inputs, targets in batches:
+                np.testing.assert_array_equal(targets[:, -1], inputs[:, 1] > 0.5)
+
+            # The validation positions are the end of every shard
+            validation = np.concatenate([inputs[:, 0] for inputs, _ in read_chunks(directory, True, 0.1)])
+            self.assertEqual(validation.tolist(), list(range(90, 100)) + list(range(190, 200)) + list(range(245, 250)))
+
+    def test_train(self):
+        with tempfile.TemporaryDirectory() as directory:
+            _write_dataset(directory, 250, 100)
+            checkpoint = os.path.join(directory, 'checkpoint.npz')
+            predictor, statistics = train(directory, epochs=2, minibatch_size=32, shuffle_buffer_size=64,
+                                          validation_fraction=0.1, checkpoint_path=checkpoint, checkpoint_every=3,
+                                          rng=RNG(0))
+            self.assertEqual([epoch.minibatches for epoch in statistics], [8, 8])
+            self.assertTrue(all([np.isfinite(epoch.validation_loss) for epoch in statistics]))
+
+            # The checkpoint holds the final network
+            loaded = Predictor.load(checkpoint, verbose=False)
+            inputs = np.random.default_rng(1).random((3, INPUT_SIZE))
+            np.testing.assert_array_equal(loaded.predict_batch(inputs), predictor.predict_batch(inputs))
+            self.assertEqual(loaded.predict_batch(inputs).shape, (3, OUTPUT_SIZE))
+
+
+if __name__ == '__main__':
+    unittest.main()
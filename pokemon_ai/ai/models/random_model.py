@@ -1,9 +1,8 @@
-from random import shuffle, randint
-from copy import deepcopy
 from typing import Callable
 
 from .. import ModelInterface
 from pokemon_ai.classes import Player, Move, Item, Party
+from pokemon_ai.utils import RNG, get_rng
 
 
 class RandomModel(ModelInterface):
@@ -11,6 +10,13 @@ class RandomModel(ModelInterface):
     A model that picks random moves.
     """
 
+    def __init__(self, rng: RNG = None):
+        """
+        Initializes a RandomModel.
+        :param rng: The RNG to pick moves with. Defaults to the process-wide RNG.
+        """
+        self._rng = rng or get_rng()
+
     def take_turn(self, player: Player, other_player: Player, attack: Callable[[Move], None],
                   use_item: Callable[[Item], None],
                   switch_pokemon_at_idx: Callable[[int], None]) -> None:
@@ -19,10 +25,10 @@ class RandomModel(ModelInterface):
         num_available_moves = sum([int(move.is_available()) for move in pokemon.get_move_bank().get_as_list()])
         num_available_pokemon = sum([int(not pokemon.is_fainted()) for pokemon in player.get_party().get_as_list()]) - 1
 
-        if num_available_moves + num_available_pokemon > 0 and randint(1, num_available_moves + num_available_pokemon) <= num_available_moves:
+        if num_available_moves + num_available_pokemon > 0 and self._rng.random_int(1, num_available_moves + num_available_pokemon) <= num_available_moves:
             # Perform a move
-            move_list = deepcopy(pokemon.get_move_bank().get_as_list())
-            shuffle(move_list)
+            move_list = list(pokemon.get_move_bank().get_as_list())
+            self._rng.shuffle(move_list)
             for move in move_list:
                 if move.is_available():
                     attack(move)
@@ -33,8 +39,7 @@ class RandomModel(ModelInterface):
             switch_pokemon_at_idx(idx)
 
     def force_switch_pokemon(self, party: Party):
-        party_list = deepcopy(party.get_as_list())
-        for i, pokemon in enumerate(party_list):
+        for i, pokemon in enumerate(party.get_as_list()):
             if pokemon.get_hp() != 0 and pokemon.get_id() != party.get_starting().get_id():
                 return i
         return 0
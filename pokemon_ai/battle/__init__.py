@@ -1 +1,5 @@
 from .battle import Battle
+from .battle_state import BattleState
+from .battle_batch import BattleBatch
+from .events import BattleEvent, BattleEventType, EventSink, NullSink, ConsoleSink, ListSink
+from .zobrist import ZobristTracker, player_hash
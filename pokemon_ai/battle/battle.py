@@ -1,19 +1,33 @@
-from pokemon_ai.classes import Status, status_names, Pokemon, Player, PokemonType, Move, Effectiveness, Item, Criticality
-from pokemon_ai.utils import print_battle_screen, clear_battle_screen, prompt_multi, okay, calculate_damage, chance, \
-    is_effective
+from typing import *
+
+from pokemon_ai.classes import Status, Pokemon, Party, Player, PokemonType, Move, Effectiveness, Item, Criticality
+from pokemon_ai.utils import print_battle_screen, clear_battle_screen, prompt_multi, calculate_damage, RNG, \
+    get_rng, is_effective
+
+from .events import BattleEvent, BattleEventType, ConsoleSink, EventSink
+from .zobrist import ZobristTracker
 
 
 class Battle:
     _PLAYER_1_ID = 1
     _PLAYER_2_ID = 2
 
-    def __init__(self, player1: Player, player2: Player, verbose: int = 1, use_hints=False, use_revealing=True):
+    def __init__(self, player1: Player, player2: Player, verbose: int = 1, use_hints=False, use_revealing=True, undoable=False, sinks: List[EventSink] = None,
+                 rng: RNG = None, track_hashes=False, hashes: Tuple[int, int] = None):
         """
         Initializes a battle.
         :param player1: The first player.
         :param player2: The second player.
         :param verbose: 0 for no logs. 1 for basic information only. 2 for all information.
         :param use_hints: Show hints regarding moves' supereffectivenesses in the battle screen.
+        :param use_revealing: Hide all Pokemon and moves until they are seen in battle.
+        :param undoable: Record every change the battle makes so that turns can be undone with undo_turn.
+        :param sinks: The sinks battle events are emitted to. Defaults to a ConsoleSink unless verbose is 0.
+        :param rng: The RNG the battle draws from. Pass a seeded RNG to make the battle reproducible (given seeded
+        models). Defaults to the process-wide RNG.
+        :param track_hashes: Keep the Zobrist hash of both players (see zobrist.player_hash) up to date as the battle
+        changes them, to be read with get_hashes.
+        :param hashes: The current hashes of both players, if already known. Implies track_hashes.
         """
         self.attack_queue = []
         self.player1 = player1
@@ -23,22 +37,40 @@ class Battle:
         self.ended = False
         self.use_hints = use_hints
         self.turn_count = 1
+        self._rng = rng or get_rng()
+        if sinks is None:
+            sinks = [ConsoleSink(verbose)] if verbose > 0 else []
+        self._sinks = [sink for sink in sinks if sink.enabled]
+
+        # The undo journal is a list of frames, one per turn, each holding the state of the battle before the turn
+        # and (object, snapshot) pairs for every object changed during it. The first frame covers initialization.
+        self._journal: List[Tuple[tuple, list]] = [] if undoable else None
+        self._zobrist: Optional[ZobristTracker] = None
+        self._begin_frame()
+        for player in [player1, player2]:
+            for pkmn in player.get_party().get_as_list():
+                self._record(pkmn)
         self._reveal_all(use_revealing, player1, player2)
 
+        # Revealing does not change the hashes, so tracking starts after it
+        if track_hashes or hashes is not None:
+            self._zobrist = ZobristTracker([player1, player2], hashes)
+
     def play_turn(self) -> Player:
         """
         Plays one turn in the battle.
         :return: The winning player or None.
         """
+        self._begin_frame()
         if not self.started:
             self._battle_start(self.player1, self.player2)
 
-        if self.verbose == 1:
-            print("\nTURN", self.turn_count)
-            pokemon = self.player1.get_party().get_starting()
-            other_pokemon = self.player2.get_party().get_starting()
-            print(pokemon.get_name(), " - ", pokemon.get_hp())
-            print(other_pokemon.get_name(), " - ", other_pokemon.get_hp())
+        if self._sinks:
+            players = (self.player1, self.player2)
+            self._emit(BattleEventType.TURN, players)
+            for player in players:
+                pokemon = player.get_party().get_starting()
+                self._emit(BattleEventType.HP, players, player=player, pokemon=pokemon, hp=pokemon.get_hp())
 
         # Start two turns
         for player, opponent in [[self.player1, self.player2], [self.player2, self.player1]]:
@@ -53,7 +85,7 @@ class Battle:
         winner = self._check_win()
         if winner is not None:
             # Winner!
-            self._alert(winner.get_name() + ' won!', self.player1, self.player2)
+            self._emit(BattleEventType.WIN, (self.player1, self.player2), player=winner)
             return winner
 
         # End both players' turns and continue
@@ -87,21 +119,82 @@ class Battle:
         return None
 
     ##
-    # Alert
+    # Undo Functions
     ##
 
-    def _alert(self, message: str, *players: Player):
+    def get_hashes(self) -> Tuple[int, int]:
         """
-        Alert a message that non-AI users have to respond "OK" to.
-        :param message: The message to write.
-        :param players: The list of players to write the message to.
+        Gets the current Zobrist hashes of both players. Requires the battle to track hashes.
+        :return: A tuple of the hashes of player1 and player2.
         """
-        if self.verbose == 2:
-            for player in players:
-                if not player.is_ai():
-                    okay(message)
-        elif self.verbose == 1:
-            print(message)
+        assert self._zobrist is not None, "The battle does not track hashes."
+        return self._zobrist.get_hashes()
+
+    def undo_turn(self) -> bool:
+        """
+        Reverts every change made by the last turn played. Requires the battle to be undoable.
+        :return: True if a turn was undone, False if no turns have been played.
+        """
+        assert self._journal is not None, "The battle is not undoable."
+        if len(self._journal) <= 1:
+            return False
+        self._undo_frame()
+        return True
+
+    def undo_all(self) -> None:
+        """
+        Reverts every change made by the battle, including hiding Pokemon on initialization.
+        """
+        assert self._journal is not None, "The battle is not undoable."
+        while len(self._journal) > 0:
+            self._undo_frame()
+
+    def _begin_frame(self) -> None:
+        if self._journal is not None:
+            battle_state = (self.started, self.ended, self.turn_count, list(self.attack_queue),
+                            self.player1.get_id(), self.player2.get_id(),
+                            self._zobrist.get_hashes() if self._zobrist is not None else None)
+            self._journal.append((battle_state, []))
+
+    def _undo_frame(self) -> None:
+        battle_state, changes = self._journal.pop()
+        for obj, snapshot in reversed(changes):
+            if isinstance(obj, Party):
+                obj.get_as_list()[:] = snapshot
+            else:
+                obj.restore(snapshot)
+        self.started, self.ended, self.turn_count, self.attack_queue, player1_id, player2_id, hashes = battle_state
+        self.player1.set_id(player1_id)
+        self.player2.set_id(player2_id)
+        if self._zobrist is not None and hashes is not None:
+            self._zobrist.set_hashes(hashes)
+
+    def _record(self, obj: Union[Pokemon, Move, Party, Any]) -> None:
+        """
+        Records the state of an object in the undo journal before the battle changes it, and removes it from the
+        tracked hashes until they are read again. Only the party order is recorded for parties.
+        :param obj: A Pokemon, Move, Party or Bag.
+        """
+        if self._zobrist is not None:
+            self._zobrist.touch(obj)
+        if self._journal is not None:
+            self._journal[-1][1].append((obj, list(obj.get_as_list()) if isinstance(obj, Party) else obj.snapshot()))
+
+    ##
+    # Events
+    ##
+
+    def _emit(self, event_type: BattleEventType, recipients: Tuple[Player, ...], **data: Any):
+        """
+        Emits an event to the battle's sinks. Does nothing, not even create the event, if there are no enabled sinks.
+        :param event_type: The type of the event.
+        :param recipients: The players the event is shown to.
+        :param data: The event's fields.
+        """
+        if self._sinks:
+            event = BattleEvent(event_type, self.turn_count, recipients, data)
+            for sink in self._sinks:
+                sink.emit(event)
 
     ##
     # Battle Functions
@@ -120,13 +213,12 @@ class Battle:
         player2._id = self._PLAYER_2_ID
 
         # Reveal starting Pokemon
+        self._record(player1.get_party().get_starting())
+        self._record(player2.get_party().get_starting())
         player1.get_party().get_starting().reveal()
         player2.get_party().get_starting().reveal()
 
-        if self.verbose >= 1:
-            # Clear the terminal window
-            #clear(get_terminal_dimensions()[1])
-            print("")
+        self._emit(BattleEventType.START, (player1, player2))
 
     ##
     # Turn Functions
@@ -159,7 +251,7 @@ class Battle:
                     self._turn_check_pokemon(player)
                 else:
                     clear_battle_screen()
-                    self._alert(player.get_name() + ' forfeits...', player)
+                    self._emit(BattleEventType.FORFEIT, (player,), player=player)
                     exit(0)
         else:
             # AI player should make move decision based on provided objects.
@@ -181,27 +273,28 @@ class Battle:
             total_damage = min(max(1, (damage - defense)), pokemon.get_hp())
             pokemon.take_damage(total_damage)
             if pokemon.is_fainted():
-                self._alert(pokemon.get_name() + ' fainted!', player)
+                self._emit(BattleEventType.FAINT, (player,), pokemon=pokemon)
                 return not self._turn_switch_pokemon(player, False)
             return False
 
         if pokemon.get_other_status() in [Status.POISON, Status.BAD_POISON, Status.BURN]:
-            self._alert(pokemon.get_name() + ' is ' + status_names[pokemon.get_other_status()] + '.', player)
+            self._record(pokemon)
+            self._emit(BattleEventType.STATUS_ACTIVE, (player,), pokemon=pokemon, status=pokemon.get_other_status())
 
             # Increment the number of turns with the other status
             pokemon.inc_other_status_turn()
 
             if pokemon.get_other_status() is Status.POISON:
                 damage = int(pokemon.get_base_hp() / 16)
-                self._alert(pokemon.get_name() + ' took ' + str(damage) + ' damage from poison.', player)
+                self._emit(BattleEventType.STATUS_DAMAGE, (player,), pokemon=pokemon, status=pokemon.get_other_status(), damage=damage)
                 return self_inflict(damage)
             if pokemon.get_other_status() is Status.BAD_POISON:
                 damage = int(pokemon.get_base_hp() * pokemon.get_other_status_turns() / 16)
-                self._alert(pokemon.get_name() + ' took ' + str(damage) + ' damage from poison.', player)
+                self._emit(BattleEventType.STATUS_DAMAGE, (player,), pokemon=pokemon, status=pokemon.get_other_status(), damage=damage)
                 return self_inflict(damage)
             elif pokemon.get_other_status() is Status.BURN:
                 damage = int(pokemon.get_base_hp() / 8)
-                self._alert(pokemon.get_name() + ' took ' + str(damage) + ' damage from its burn.', player)
+                self._emit(BattleEventType.STATUS_DAMAGE, (player,), pokemon=pokemon, status=pokemon.get_other_status(), damage=damage)
                 return self_inflict(damage)
 
         return False
@@ -250,7 +343,7 @@ class Battle:
                     return False
                 move = pokemon.get_move_bank().get_move(move_idx - 1)
                 if not move.is_available():
-                    self._alert("There's no PP left for this move!", player)
+                    self._emit(BattleEventType.NO_PP, (player,), move=move)
         elif ai_move is not None:
             # ai_move contains the same move on another copy of the player's Pokemon, so we have to retrieve the
             # same move in the current in-game Pokemon
@@ -259,6 +352,9 @@ class Battle:
                 if temp_move.get_name() == ai_move_name:
                     move = temp_move
                     break
+            if move is None:
+                # The model picked a move of a Pokemon that is no longer in battle
+                return False
         else:
             return False
 
@@ -289,7 +385,9 @@ class Battle:
         item = player.get_bag().get_as_list()[item_idx]
 
         # Use the item and remove it from the player's bag
-        self._alert("%s used a %s." % (player.get_name(), item.get_name()), self.player1, self.player2)
+        self._emit(BattleEventType.ITEM, (self.player1, self.player2), player=player, item=item)
+        self._record(pokemon)
+        self._record(player.get_bag())
         item.use(player, pokemon)
         player.get_bag().get_as_list().remove(item_idx)
 
@@ -307,7 +405,7 @@ class Battle:
         other_player = self.player2 if player.get_id() == self._PLAYER_1_ID else self.player1
 
         current_pokemon = player.get_party().get_starting()
-        can_switch_pokemon = not all([pokemon.is_fainted() for pokemon in player.get_party().get_as_list()])
+        can_switch_pokemon = any([not pokemon.is_fainted() for pokemon in player.get_party().get_as_list()[1:]])
         if not can_switch_pokemon:
             return False
         if not player.is_ai():
@@ -328,32 +426,34 @@ class Battle:
                 switched_pokemon = player.get_party().get_at_index(idx)
 
                 if switched_pokemon.is_fainted():
-                    self._alert(switched_pokemon.get_name() + ' has fainted.', player)
+                    self._emit(BattleEventType.INVALID_SWITCH, (player,), pokemon=switched_pokemon, fainted=True)
                 elif idx == 0:
-                    self._alert(switched_pokemon.get_name() + ' is currently in battle.', player)
+                    self._emit(BattleEventType.INVALID_SWITCH, (player,), pokemon=switched_pokemon, fainted=False)
                 else:
+                    self._record(player.get_party())
+                    self._record(current_pokemon)
+                    self._record(switched_pokemon)
                     if current_pokemon.get_status() == Status.CONFUSION:
                         current_pokemon.set_status(None)
                     switched_pokemon.reveal()
-                    self._alert('Switched ' + current_pokemon.get_name() + ' with ' + switched_pokemon.get_name() + '.',
-                                player)
-                    self._alert(
-                        player.get_name() + ' switched ' + current_pokemon.get_name() + ' with ' + switched_pokemon.get_name() + '.',
-                        other_player)
+                    self._emit(BattleEventType.SWITCH, (player, other_player), player=player, other_player=other_player,
+                               pokemon=current_pokemon, switched_pokemon=switched_pokemon)
                     player.get_party().make_starting(idx)
                     return True
         elif player.is_ai():
-            while ai_pokemon_idx is None or ai_pokemon_idx == 0 or ai_pokemon_idx >= len(player.get_party().get_as_list()):
+            party_list = player.get_party().get_as_list()
+            while ai_pokemon_idx is None or not 0 < ai_pokemon_idx < len(party_list) or party_list[ai_pokemon_idx].is_fainted():
                 ai_pokemon_idx = player.get_model().force_switch_pokemon(player.get_party())
             switched_pokemon = player.get_party().get_at_index(ai_pokemon_idx)
+            self._record(player.get_party())
+            self._record(current_pokemon)
+            self._record(switched_pokemon)
             player.get_party().make_starting(ai_pokemon_idx)
             if current_pokemon.get_status() == Status.CONFUSION:
                 current_pokemon.set_status(None)
             switched_pokemon.reveal()
-            self._alert('Switched ' + current_pokemon.get_name() + ' with ' + switched_pokemon.get_name() + '.', player)
-            self._alert(
-                player.get_name() + ' switched ' + current_pokemon.get_name() + ' with ' + switched_pokemon.get_name() + '.',
-                other_player)
+            self._emit(BattleEventType.SWITCH, (player, other_player), player=player, other_player=other_player,
+                       pokemon=current_pokemon, switched_pokemon=switched_pokemon)
             return True
         else:
             return False
@@ -361,7 +461,7 @@ class Battle:
     def _turn_check_pokemon(self, player: Player):
         other_player = self.player2 if player.get_id() == self._PLAYER_1_ID else self.player1
         clear_battle_screen()
-        print(str(other_player.get_party()))
+        self._emit(BattleEventType.PARTY, (player,), player=other_player)
 
     def _turn_perform_attacks(self, player_a: Player, player_b: Player):
         """
@@ -392,6 +492,8 @@ class Battle:
             return False
 
         on_pokemon = on_player.get_party().get_starting()
+        self._record(pokemon)
+        self._record(on_pokemon)
 
         def confusion():
             base_damage = 40
@@ -399,23 +501,14 @@ class Battle:
             defense = int(pokemon.get_stats().get_defense() / base_damage * 1 / 10)
             total_damage = max(1, damage - defense)
             pokemon.take_damage(total_damage)
-            self._alert(pokemon.get_name() + ' hurt itself in its confusion.', player, on_player)
+            self._emit(BattleEventType.CONFUSION_DAMAGE, (player, on_player), pokemon=pokemon, damage=total_damage)
             if pokemon.is_fainted():
-                self._alert(pokemon.get_name() + ' fainted!', player)
+                self._emit(BattleEventType.FAINT, (player,), pokemon=pokemon)
                 return not self._turn_switch_pokemon(player, False)
             return False
 
-        def paralysis():
-            self._alert(pokemon.get_name() + ' is unable to move.', player, on_player)
-
-        def infatuation():
-            self._alert(pokemon.get_name() + ' is infatuated and is unable to move.', player, on_player)
-
-        def freeze():
-            self._alert(pokemon.get_name() + ' is frozen solid.', player, on_player)
-
-        def sleep():
-            self._alert(pokemon.get_name() + ' is fast asleep.', player, on_player)
+        def immobilized(status: Status):
+            self._emit(BattleEventType.IMMOBILIZED, (player, on_player), pokemon=pokemon, status=status)
 
         def try_attack():
             # Decrease the PP on the move
@@ -424,29 +517,26 @@ class Battle:
 
             # Checks to see if the attack hit
             change_of_hit = pokemon.get_stats().get_accuracy() / 100 * on_pokemon.get_stats().get_evasiveness() / 100
-            did_hit = chance(change_of_hit, True, False)
+            did_hit = self._rng.chance(change_of_hit, True, False)
 
             if not did_hit:
-                self._alert(pokemon.get_name() + '\'s attack missed.', player, on_player)
+                self._emit(BattleEventType.MISS, (player, on_player), pokemon=pokemon, move=move)
                 return False
 
-            self._alert(player.get_name() + "'s " + pokemon.get_name() + ' used ' + move.get_name() + '!', player, on_player)
+            self._emit(BattleEventType.ATTACK, (player, on_player), player=player, pokemon=pokemon, move=move)
 
             if move.is_damaging():
                 # Calculate damage
-                damage, effectiveness, critical = calculate_damage(move, pokemon, on_pokemon)
+                damage, effectiveness, critical = calculate_damage(move, pokemon, on_pokemon, self._rng)
 
                 # Describe the effectiveness
                 if critical == Criticality.CRITICAL and effectiveness != Effectiveness.NO_EFFECT:
-                    self._alert('A critical hit!', player, on_player)
-                if effectiveness == Effectiveness.NO_EFFECT:
-                    self._alert('It has no effect on ' + on_pokemon.get_name() + '.', player, on_player)
-                if effectiveness == Effectiveness.SUPER_EFFECTIVE:
-                    self._alert('It\'s super effective!', player, on_player)
-                if effectiveness == Effectiveness.NOT_EFFECTIVE:
-                    self._alert('It\'s not very effective...', player, on_player)
+                    self._emit(BattleEventType.CRITICAL, (player, on_player), pokemon=pokemon, move=move)
+                if effectiveness != Effectiveness.NORMAL:
+                    self._emit(BattleEventType.EFFECTIVENESS, (player, on_player), pokemon=on_pokemon, move=move,
+                               effectiveness=effectiveness)
 
-                self._alert(on_pokemon.get_name() + ' took ' + str(damage) + ' damage.', player, on_player)
+                self._emit(BattleEventType.DAMAGE, (player, on_player), pokemon=on_pokemon, move=move, damage=damage)
 
                 # Lower the opposing Pokemon's HP
                 on_pokemon._hp = max(0, on_pokemon.get_hp() - damage)
@@ -457,18 +547,18 @@ class Battle:
                     # Unlike status turns, other status turns increase in length because they don't end
                     on_pokemon.set_other_status(move.get_status_inflict())
                 else:
-                    on_pokemon.set_status(move.get_status_inflict())
-                self._alert(on_pokemon.get_name() + ' was ' + status_names[move.get_status_inflict()], player,
-                            on_player)
+                    on_pokemon.set_status(move.get_status_inflict(), rng=self._rng)
+                self._emit(BattleEventType.STATUS, (player, on_player), pokemon=on_pokemon,
+                           status=move.get_status_inflict())
 
             # Heal the pokemon
             if move.get_base_heal() > 0:
                 on_pokemon.heal(move.get_base_heal())
-                self._alert(pokemon.get_name() + ' gained ' + str(move.get_base_heal()) + ' HP.', player)
+                self._emit(BattleEventType.HEAL, (player,), pokemon=pokemon, hp=move.get_base_heal())
 
             # Check if the Pokemon fainted
             if on_pokemon.is_fainted():
-                self._alert(on_pokemon.get_name() + ' fainted!', player, on_player)
+                self._emit(BattleEventType.FAINT, (player, on_player), pokemon=on_pokemon)
                 return not self._turn_switch_pokemon(on_player, False)
 
             return False
@@ -480,17 +570,15 @@ class Battle:
             pokemon._status_turns = max(0, pokemon.get_status_turns() - 1)
             if pokemon.get_status_turns() == 0:
                 pokemon._status = None
-            self._alert(pokemon.get_name() + ' is ' + status_names[status] + '.', player, on_player)
+            self._emit(BattleEventType.STATUS_ACTIVE, (player, on_player), pokemon=pokemon, status=status)
             if status is Status.CONFUSION:
-                chance(1 / 3, lambda: confusion(), try_attack)
+                self._rng.chance(1 / 3, confusion, try_attack)
             elif status is Status.PARALYSIS:
-                chance(0.25, lambda: paralysis(), try_attack)
+                self._rng.chance(0.25, lambda: immobilized(status), try_attack)
             elif status is Status.INFATUATION:
-                chance(0.5, lambda: infatuation(), try_attack)
-            elif status is Status.FREEZE:
-                freeze()
-            elif status is Status.SLEEP:
-                sleep()
+                self._rng.chance(0.5, lambda: immobilized(status), try_attack)
+            elif status in [Status.FREEZE, Status.SLEEP]:
+                immobilized(status)
         elif pokemon.get_status() is None:
             # No status effect, attempt to attack
             return try_attack()
@@ -519,8 +607,8 @@ class Battle:
             elif op_speed < self_speed:
                 self.attack_queue.insert(0, attack_triple)
             else:
-                chance(0.5, lambda: self.attack_queue.append(attack_triple),
-                       lambda: self.attack_queue.insert(0, attack_triple))
+                self._rng.chance(0.5, lambda: self.attack_queue.append(attack_triple),
+                                 lambda: self.attack_queue.insert(0, attack_triple))
 
     ##
     # Progress Functions
@@ -0,0 +1,516 @@
+from typing import *
+import numpy as np
+
+from pokemon_ai.classes import Status
+from pokemon_ai.utils import POKEMON_MOVE_LIMIT, POKEMON_PARTY_LIMIT, RNG, EFFECTIVENESS_MATRIX
+
+from .battle_state import BattleState, NO_STATUS, NO_ACTION, SWITCH_OFFSET, _LAYOUT, _BUFFER_SIZE, _StaticTables
+
+_OTHER_STATUSES = np.array([Status.POISON.value, Status.BAD_POISON.value, Status.BURN.value])
+_HURTING_STATUSES = np.array([Status.POISON.value, Status.BAD_POISON.value, Status.BURN.value, Status.CONFUSION.value])
+
+# Static table fields that are stacked along the battle axis
+_TABLE_FIELDS = ('size', 'num_moves', 'type', 'level', 'base_hp', 'attack', 'defense', 'special_attack',
+                 'special_defense', 'speed', 'accuracy', 'evasiveness', 'move_damage', 'move_base_pp', 'move_type',
+                 'move_special', 'move_heal', 'move_status')
+
+
+class BattleBatch:
+    """
+    N independent battles advanced in lockstep, one turn at a time.
+
+    Uses the same layout as BattleState with a leading battle axis, and performs every rule of Battle.play_turn
+    (switches, speed ordering, accuracy, damage, statuses, fainting and forced switches) as masked array operations
+    over the battles that are still running.
+    """
+
+    def __init__(self, tables: List[_StaticTables], buffer: np.ndarray, seed: Union[int, RNG] = None):
+        """
+        Initializes a BattleBatch. Use BattleBatch.from_state or BattleBatch.from_states to create one.
+        :param tables: The static tables of each battle.
+        :param buffer: An (N, buffer size) array of BattleState buffers.
+        :param seed: The seed of the batch's random generator, or an RNG whose generator the batch draws from.
+        """
+        n = len(tables)
+        self._n = n
+        self._source_tables = tables
+        self._buffer = buffer
+        self._rng = seed.get_generator() if isinstance(seed, RNG) else np.random.default_rng(seed)
+
+        offset = 0
+        for name, shape in _LAYOUT:
+            size = int(np.prod(shape))
+            setattr(self, name, self._buffer[:, offset:offset + size].reshape((n,) + shape))
+            offset += size
+
+        # Battles created from states where a side has already lost are over from the start
+        wiped = ~(self._hp > 0).any(2)
+        self._winner = np.where(wiped[:, 1], 0, np.where(wiped[:, 0], 1, -1)).astype(np.int32)
+
+        # Share the tables when every battle is the same, otherwise stack them
+        unique = all(t is tables[0] for t in tables)
+        for field in _TABLE_FIELDS:
+            if unique:
+                value = getattr(tables[0], field)
+                setattr(self, '_' + field, np.broadcast_to(value, (n,) + value.shape))
+            else:
+                setattr(self, '_' + field, np.stack([getattr(t, field) for t in tables]))
+
+    @classmethod
+    def from_state(cls, state: BattleState, n: int, seed: Union[int, RNG] = None):
+        """
+        Creates a batch of n copies of one battle.
+        :param state: The battle to copy.
+        :param n: The number of battles.
+        :param seed: The seed of the batch's random generator, or an RNG whose generator the batch draws from.
+        :return: A new BattleBatch.
+        """
+        return cls([state._tables] * n, np.tile(state.get_buffer(), (n, 1)), seed)
+
+    @classmethod
+    def from_states(cls, states: List[BattleState], seed: Union[int, RNG] = None):
+        """
+        Creates a batch from a list of battles, which may have different parties.
+        :param states: The battles.
+        :param seed: The seed of the batch's random generator, or an RNG whose generator the batch draws from.
+        :return: A new BattleBatch.
+        """
+        return cls([state._tables for state in states], np.stack([state.get_buffer() for state in states]), seed)
+
+    ##
+    #   Getter Functions
+    ##
+
+    def __len__(self):
+        return self._n
+
+    def get_state(self, idx: int) -> BattleState:
+        """
+        Copies one battle out of the batch.
+        :param idx: The index of the battle.
+        :return: A BattleState.
+        """
+        return BattleState(self._source_tables[idx], self._buffer[idx].copy())
+
+    def get_winners(self) -> np.ndarray:
+        """
+        :return: An (N,) array with the winning side of each battle, or -1 if it is still running.
+        """
+        return self._winner
+
+    def get_turn_counts(self) -> np.ndarray:
+        return self._info[:, 1]
+
+    def is_done(self) -> bool:
+        return bool((self._winner >= 0).all())
+
+    def get_starting_slots(self, side: int) -> np.ndarray:
+        """
+        :return: An (N,) array of the slot of the side's starting Pokemon in every battle.
+        """
+        return self._order[:, side, 0]
+
+    def get_party_indices(self, side: int, slots: np.ndarray) -> np.ndarray:
+        """
+        :param side: The side.
+        :param slots: An (N,) array of slots of the side's Pokemon.
+        :return: An (N,) array of the index in the side's party of the Pokemon at each slot.
+        """
+        return (self._order[:, side] == slots[:, None]).argmax(1)
+
+    def get_switch_targets(self, side: int) -> np.ndarray:
+        """
+        :return: An (N, POKEMON_PARTY_LIMIT) mask, by slot, of the Pokemon the side can switch to: the non-fainted ones
+        other than the starting Pokemon.
+        """
+        targets = self._hp[:, side] > 0
+        targets[np.arange(self._n), self._order[:, side, 0]] = False
+        return targets
+
+    def get_num_moves(self, side: int) -> np.ndarray:
+        """
+        :return: An (N, POKEMON_PARTY_LIMIT) array of the number of moves of the side's Pokemon, by slot.
+        """
+        return self._num_moves[:, side]
+
+    def get_hp_ratios(self, side: int) -> np.ndarray:
+        """
+        :return: An (N, POKEMON_PARTY_LIMIT) array of the HP ratio of the side's Pokemon, by slot, and NaN for missing
+        Pokemon.
+        """
+        present = np.arange(POKEMON_PARTY_LIMIT) < self._size[:, side][:, None]
+        return np.where(present, self._hp[:, side] / np.maximum(self._base_hp[:, side], 1), np.nan)
+
+    def get_pp_ratios(self, side: int) -> np.ndarray:
+        """
+        :return: An (N, POKEMON_PARTY_LIMIT, POKEMON_MOVE_LIMIT) array of the PP ratio of the side's moves, by slot, and
+        NaN for missing moves.
+        """
+        present = np.arange(POKEMON_MOVE_LIMIT) < self._num_moves[:, side][:, :, None]
+        return np.where(present, self._pp[:, side] / np.maximum(self._move_base_pp[:, side], 1), np.nan)
+
+    def outcomes(self, side: int = 0) -> np.ndarray:
+        """
+        Calculates outcome_func_v1 for the side in every battle.
+        :param side: The side to calculate the outcome for.
+        :return: An (N,) array of outcome values.
+        """
+        other = 1 - side
+        size, other_size = self._size[:, side], self._size[:, other]
+        base_hp, other_base_hp = self._base_hp[:, side].sum(1), self._base_hp[:, other].sum(1)
+        hp_taken = base_hp - self._hp[:, side].sum(1)
+        hp_dealt = other_base_hp - self._hp[:, other].sum(1)
+        slots = np.arange(POKEMON_PARTY_LIMIT)
+        fainted = ((self._hp[:, side] == 0) & (slots < size[:, None])).sum(1)
+        other_fainted = ((self._hp[:, other] == 0) & (slots < other_size[:, None])).sum(1)
+        outcome = np.where(fainted == size, 0.2, 0.8)
+        hp_perc_diff = hp_dealt / other_base_hp - hp_taken / base_hp
+        pokemon_fainted_perc_diff = other_fainted / other_size - (fainted / size) ** 2
+        return outcome + (hp_perc_diff + pokemon_fainted_perc_diff) / 10
+
+    def can_damage(self, side: int) -> np.ndarray:
+        """
+        Checks in every battle whether the side can still lower the HP of the other side's Pokemon, as
+        calculations.can_damage does.
+        :param side: The side.
+        :return: An (N,) mask of the battles where it can.
+        """
+        other = 1 - side
+        slots = np.arange(POKEMON_PARTY_LIMIT)
+        targets = (self._hp[:, other] > 0) & (slots < self._size[:, other][:, None])
+        hurt = targets & (np.isin(self._other_status[:, other], _HURTING_STATUSES) |
+                          np.isin(self._status[:, other], _HURTING_STATUSES))
+
+        alive = (self._hp[:, side] > 0) & (slots < self._size[:, side][:, None])
+        available = alive[:, :, None] & (self._pp[:, side] > 0) & \
+            (np.arange(POKEMON_MOVE_LIMIT) < self._num_moves[:, side][:, :, None])
+        effective = EFFECTIVENESS_MATRIX[self._move_type[:, side][:, :, :, None], self._type[:, other][:, None, None, :]]
+        damaging = (self._move_damage[:, side] > 0) & ((effective > 0) & targets[:, None, None, :]).any(3)
+        inflicting = np.isin(self._move_status[:, side], _HURTING_STATUSES)
+        return hurt.any(1) | (available & (damaging | inflicting)).any((1, 2))
+
+    def adjudicate(self) -> np.ndarray:
+        """
+        Ends the running battles whose result is decided because only one side can still damage the other: the other
+        side's Pokemon all faint and the side wins.
+        :return: An (N,) mask of the running battles where neither side can damage the other, which cannot end.
+        """
+        running = self._winner < 0
+        can_damage = [self.can_damage(0), self.can_damage(1)]
+        for side in [0, 1]:
+            won = running & can_damage[side] & ~can_damage[1 - side]
+            self._hp[won, 1 - side] = 0
+            self._winner[won] = side
+        return running & ~can_damage[0] & ~can_damage[1]
+
+    ##
+    #   Policy Functions
+    ##
+
+    def random_actions(self, side: int) -> np.ndarray:
+        """
+        Picks an action in every battle the same way RandomModel does.
+        :param side: The side to pick actions for.
+        :return: An (N,) array of actions.
+        """
+        rows = np.arange(self._n)
+        sides = np.full(self._n, side)
+        available = self._available_moves(rows, sides)
+        num_moves = available.sum(1)
+        num_switches = (self._hp[:, side] > 0).sum(1) - 1
+        total = num_moves + num_switches
+        pick = self._rng.integers(1, np.maximum(total, 1) + 1)
+        attack = (total > 0) & (pick <= num_moves)
+        move = np.where(available, self._rng.random(available.shape), -1).argmax(1)
+        switch_idx = self._forced_switch_index(rows, sides)
+        return np.where(attack, move, np.where(switch_idx > 0, SWITCH_OFFSET + switch_idx, NO_ACTION))
+
+    def damage_actions(self, side: int) -> np.ndarray:
+        """
+        Picks the move with the highest deterministic damage in every battle, as DamageModel does. Battles where no
+        move is left fall back to random_actions, as DamageModel falls back to a RandomModel.
+        :param side: The side to pick actions for.
+        :return: An (N,) array of actions.
+        """
+        rows = np.arange(self._n)
+        sides = np.full(self._n, side)
+        slot = self._order[rows, side, 0]
+        on_slot = self._order[rows, 1 - side, 0]
+        available = self._available_moves(rows, sides)
+        damage = np.stack([self._damage(rows, sides, slot, np.full(self._n, m), on_slot, critical=1, random=1.0,
+                                        stab=False)
+                           for m in range(POKEMON_MOVE_LIMIT)], axis=1)
+        damage = np.where(available, damage, -1)
+        actions = damage.argmax(1)
+        stuck = ~available.any(1)
+        if stuck.any():
+            actions = np.where(stuck, self.random_actions(side), actions)
+        return actions
+
+    def is_legal(self, side: int, actions: np.ndarray) -> np.ndarray:
+        """
+        Checks in every battle whether the side can take an action: a move of the starting Pokemon with PP left, or a
+        switch to a non-fainted Pokemon other than the starting one.
+        :param side: The side.
+        :param actions: An (N,) array of actions.
+        :return: An (N,) mask of the battles where the action is legal.
+        """
+        rows = np.arange(self._n)
+        sides = np.full(self._n, side)
+        available = self._available_moves(rows, sides)
+        attack = (actions >= 0) & (actions < SWITCH_OFFSET)
+        attack &= available[rows, np.clip(actions, 0, POKEMON_MOVE_LIMIT - 1)]
+        idx = actions - SWITCH_OFFSET
+        switch = (idx > 0) & (idx < self._size[:, side])
+        slot = self._order[rows, side, np.clip(idx, 0, POKEMON_PARTY_LIMIT - 1)]
+        switch &= self._hp[rows, side, np.maximum(slot, 0)] > 0
+        return attack | switch
+
+    ##
+    #   Simulation Functions
+    ##
+
+    def play_turn(self, actions: np.ndarray, other_actions: np.ndarray, mask: np.ndarray = None) -> np.ndarray:
+        """
+        Plays one turn in every battle that is still running, with the same rules as Battle.play_turn.
+        :param actions: An (N,) array of side 0's actions.
+        :param other_actions: An (N,) array of side 1's actions.
+        :param mask: An (N,) boolean array of the battles to play the turn in, or None for all of them.
+        :return: An (N,) array with the winning side of each battle, or -1 if it is still running.
+        """
+        running = self._winner < 0
+        if mask is not None:
+            running &= mask
+        rows = np.flatnonzero(running)
+        if len(rows) == 0:
+            return self._winner
+
+        # Reveal the starting Pokemon of battles that have not started
+        starting = rows[self._info[rows, 0] == 0]
+        self._info[starting, 0] = 1
+        for side in [0, 1]:
+            self._revealed[starting, side, self._order[starting, side, 0]] = 1
+
+        # Switches happen immediately
+        for side, side_actions in [(0, actions), (1, other_actions)]:
+            switching = rows[side_actions[rows] >= SWITCH_OFFSET]
+            self._switch(switching, np.full(len(switching), side), side_actions[switching] - SWITCH_OFFSET)
+
+        # Attacks are ordered by the speed of the attacking Pokemon, with ties broken by a coin flip
+        attacking = [(actions[rows] >= 0) & (actions[rows] < SWITCH_OFFSET),
+                     (other_actions[rows] >= 0) & (other_actions[rows] < SWITCH_OFFSET)]
+        slots = [self._order[rows, 0, 0], self._order[rows, 1, 0]]
+        moves = [actions[rows], other_actions[rows]]
+        speed, other_speed = self._speed[rows, 0, slots[0]], self._speed[rows, 1, slots[1]]
+        coin = self._rng.random(len(rows)) <= 0.5
+        first = np.where(speed > other_speed, 0, np.where(speed < other_speed, 1, np.where(coin, 0, 1)))
+        first = np.where(attacking[0] & attacking[1], first, np.where(attacking[0], 0, 1))
+        second = 1 - first
+
+        def attack(mask: np.ndarray, sides: np.ndarray) -> np.ndarray:
+            slot = np.where(sides == 0, slots[0], slots[1])[mask]
+            move = np.where(sides == 0, moves[0], moves[1])[mask]
+            wins = np.zeros(len(rows), dtype=bool)
+            wins[mask] = self._perform_attack(rows[mask], sides[mask], slot, move)
+            return wins
+
+        first_attacks = attacking[0] | attacking[1]
+        won = attack(first_attacks, first)
+        second_attacks = attacking[0] & attacking[1] & ~won
+        attack(second_attacks, second)
+
+        # Check for a winner
+        wiped = [~(self._hp[rows, 0] > 0).any(1), ~(self._hp[rows, 1] > 0).any(1)]
+        self._winner[rows] = np.where(wiped[1], 0, np.where(wiped[0], 1, -1))
+
+        # End the turn of battles that are still running
+        rows = rows[self._winner[rows] < 0]
+        self._turn_end(rows, 0)
+        self._turn_end(rows, 1)
+        self._info[rows, 1] += 1
+
+        return self._winner
+
+    def play(self, policy: Callable[[Any, int], np.ndarray] = None,
+             other_policy: Callable[[Any, int], np.ndarray] = None, max_turns: int = None) -> np.ndarray:
+        """
+        Plays every battle until it has a winner.
+        :param policy: A function taking (batch, side) and returning side 0's actions. Defaults to random_actions.
+        :param other_policy: A function taking (batch, side) and returning side 1's actions. Defaults to
+        random_actions.
+        :param max_turns: Stop after this many turns even if some battles have no winner.
+        :return: An (N,) array with the winning side of each battle, or -1 if it is still running.
+        """
+        policy = policy or BattleBatch.random_actions
+        other_policy = other_policy or BattleBatch.random_actions
+        turns = 0
+        while not self.is_done() and (max_turns is None or turns < max_turns):
+            self.play_turn(policy(self, 0), other_policy(self, 1))
+            turns += 1
+        return self._winner
+
+    def _available_moves(self, rows: np.ndarray, sides: np.ndarray) -> np.ndarray:
+        """
+        :return: A (len(rows), POKEMON_MOVE_LIMIT) mask of the starting Pokemon's moves with PP left.
+        """
+        slot = self._order[rows, sides, 0]
+        return (self._pp[rows, sides, slot] > 0) & \
+            (np.arange(POKEMON_MOVE_LIMIT) < self._num_moves[rows, sides, slot][:, None])
+
+    def _forced_switch_index(self, rows: np.ndarray, sides: np.ndarray) -> np.ndarray:
+        """
+        :return: The index of the first non-fainted Pokemon after the starting one in each battle, or 0.
+        """
+        order = self._order[rows, sides]
+        alive = np.take_along_axis(self._hp[rows, sides], np.maximum(order, 0), axis=1) > 0
+        alive &= np.arange(POKEMON_PARTY_LIMIT) < self._size[rows, sides][:, None]
+        alive[:, 0] = False
+        return np.where(alive.any(1), alive.argmax(1), 0)
+
+    def _switch(self, rows: np.ndarray, sides: np.ndarray, idx: np.ndarray = None) -> np.ndarray:
+        """
+        Switches in the Pokemon at the party index in each battle, forcing a switch where the index is not valid.
+        :return: A mask of the battles where the side switched Pokemon.
+        """
+        if len(rows) == 0:
+            return np.zeros(0, dtype=bool)
+        size = self._size[rows, sides]
+        wiped = ~(self._hp[rows, sides] > 0).any(1)
+        forced = self._forced_switch_index(rows, sides)
+        idx = forced if idx is None else np.where((idx <= 0) | (idx >= size), forced, idx)
+        switched = ~wiped & (idx > 0)
+        rows, sides, idx = rows[switched], sides[switched], idx[switched]
+
+        order = self._order[rows, sides]
+        positions = np.arange(POKEMON_PARTY_LIMIT)
+        source = np.where(positions == 0, idx[:, None], np.where(positions <= idx[:, None], positions - 1, positions))
+        new_order = np.take_along_axis(order, source, axis=1)
+        current, slot = order[:, 0], new_order[:, 0]
+        self._order[rows, sides] = new_order
+        confused = self._status[rows, sides, current] == Status.CONFUSION.value
+        self._status[rows[confused], sides[confused], current[confused]] = NO_STATUS
+        self._revealed[rows, sides, slot] = 1
+        return switched
+
+    def _perform_attack(self, rows: np.ndarray, sides: np.ndarray, slots: np.ndarray, moves: np.ndarray) -> np.ndarray:
+        """
+        Performs the move of the Pokemon in each slot against the other side's starting Pokemon.
+        :return: A mask of the battles the attacking side wins.
+        """
+        alive = self._hp[rows, sides, slots] > 0
+        status = self._status[rows, sides, slots]
+        no_status = alive & (status == NO_STATUS)
+        has_status = alive & (status != NO_STATUS) & ~np.isin(status, _OTHER_STATUSES)
+
+        # Statuses wear off as the Pokemon tries to attack
+        s_rows, s_sides, s_slots = rows[has_status], sides[has_status], slots[has_status]
+        turns = np.maximum(0, self._status_turns[s_rows, s_sides, s_slots] - 1)
+        self._status_turns[s_rows, s_sides, s_slots] = turns
+        self._status[s_rows[turns == 0], s_sides[turns == 0], s_slots[turns == 0]] = NO_STATUS
+
+        u = self._rng.random(len(rows))
+        confused = has_status & (status == Status.CONFUSION.value)
+        hurt = confused & (u <= 1 / 3)
+        attempts = no_status | (confused & ~hurt) | \
+            (has_status & (status == Status.PARALYSIS.value) & (u > 0.25)) | \
+            (has_status & (status == Status.INFATUATION.value) & (u > 0.5))
+
+        # Confused Pokemon hurt themselves
+        h_rows, h_sides, h_slots = rows[hurt], sides[hurt], slots[hurt]
+        base_damage = 40
+        damage = self._attack[h_rows, h_sides, h_slots] // base_damage
+        defense = np.trunc(self._defense[h_rows, h_sides, h_slots] / base_damage * 1 / 10).astype(np.int32)
+        hp = np.maximum(0, self._hp[h_rows, h_sides, h_slots] - np.maximum(1, damage - defense))
+        self._hp[h_rows, h_sides, h_slots] = hp
+        self._switch(h_rows[hp == 0], h_sides[hp == 0])
+
+        wins = np.zeros(len(rows), dtype=bool)
+        wins[attempts] = self._try_attack(rows[attempts], sides[attempts], slots[attempts], moves[attempts])
+        return wins & no_status
+
+    def _try_attack(self, rows: np.ndarray, sides: np.ndarray, slots: np.ndarray, moves: np.ndarray) -> np.ndarray:
+        on_sides = 1 - sides
+        on_slots = self._order[rows, on_sides, 0]
+
+        self._pp[rows, sides, slots, moves] = np.maximum(0, self._pp[rows, sides, slots, moves] - 1)
+        self._move_revealed[rows, sides, slots, moves] = 1
+
+        chance_of_hit = self._accuracy[rows, sides, slots] / 100 * self._evasiveness[rows, on_sides, on_slots] / 100
+        hit = chance_of_hit >= self._rng.random(len(rows))
+        rows, sides, slots, moves, on_sides, on_slots = \
+            rows[hit], sides[hit], slots[hit], moves[hit], on_sides[hit], on_slots[hit]
+
+        # Damage
+        damaging = self._move_damage[rows, sides, slots, moves] > 0
+        critical = np.where(self._rng.random(len(rows)) <= .0625, 2, 1)
+        random = self._rng.integers(85, 101, len(rows)) / 100
+        damage = self._damage(rows, sides, slots, moves, on_slots, critical, random)
+        hp = self._hp[rows, on_sides, on_slots]
+        self._hp[rows, on_sides, on_slots] = np.where(damaging, np.maximum(0, hp - damage), hp)
+
+        # Statuses
+        status = self._move_status[rows, sides, slots, moves]
+        other = np.isin(status, _OTHER_STATUSES)
+        regular = (status != NO_STATUS) & ~other
+        self._other_status[rows[other], on_sides[other], on_slots[other]] = status[other]
+        self._other_status_turns[rows[other], on_sides[other], on_slots[other]] = 0
+        self._status[rows[regular], on_sides[regular], on_slots[regular]] = status[regular]
+        self._status_turns[rows[regular], on_sides[regular], on_slots[regular]] = \
+            self._rng.integers(1, 8, int(regular.sum()))
+
+        # Healing
+        heal = self._move_heal[rows, sides, slots, moves]
+        healed = np.minimum(self._base_hp[rows, on_sides, on_slots], self._hp[rows, on_sides, on_slots] + heal)
+        self._hp[rows, on_sides, on_slots] = np.where(heal > 0, healed, self._hp[rows, on_sides, on_slots])
+
+        # Fainting
+        fainted = self._hp[rows, on_sides, on_slots] == 0
+        switched = self._switch(rows[fainted], on_sides[fainted])
+        wins = np.zeros(len(hit), dtype=bool)
+        wins[np.flatnonzero(hit)[fainted]] = ~switched
+        return wins
+
+    def _damage(self, rows: np.ndarray, sides: np.ndarray, slots: np.ndarray, moves: np.ndarray,
+                on_slots: np.ndarray, critical: Union[np.ndarray, int], random: Union[np.ndarray, float],
+                stab: bool = True) -> np.ndarray:
+        """
+        Calculates damage exactly as calculate_damage does, or as calculate_damage_deterministic does without STAB.
+        """
+        on_sides = 1 - sides
+        move_type = self._move_type[rows, sides, slots, moves]
+        effectiveness = EFFECTIVENESS_MATRIX[move_type, self._type[rows, on_sides, on_slots]]
+        modifier = critical * random * effectiveness
+        special = self._move_special[rows, sides, slots, moves]
+        attack = np.where(special, self._special_attack[rows, sides, slots], self._attack[rows, sides, slots])
+        defense = np.where(special, self._special_defense[rows, on_sides, on_slots],
+                           self._defense[rows, on_sides, on_slots])
+        if stab:
+            attack = attack * np.where(move_type == self._type[rows, sides, slots], 1.5, 1)
+        level = self._level[rows, sides, slots]
+        base_damage = self._move_damage[rows, sides, slots, moves]
+        damage = np.maximum(0, np.trunc(((((((2 * level) / 5) + 2) * base_damage * (attack / defense)) / 50) + 2) *
+                                        modifier)).astype(np.int32)
+        return np.minimum(damage, self._hp[rows, on_sides, on_slots])
+
+    def _turn_end(self, rows: np.ndarray, side: int) -> None:
+        """
+        Inflicts damage from poison and burns on the side's starting Pokemon, as Battle._turn_end does.
+        """
+        sides = np.full(len(rows), side)
+        slots = self._order[rows, side, 0]
+        other_status = self._other_status[rows, side, slots]
+        hurt = np.isin(other_status, _OTHER_STATUSES)
+        rows, sides, slots, other_status = rows[hurt], sides[hurt], slots[hurt], other_status[hurt]
+
+        turns = self._other_status_turns[rows, sides, slots] + 1
+        self._other_status_turns[rows, sides, slots] = turns
+        base_hp = self._base_hp[rows, sides, slots]
+        base_damage = np.where(other_status == Status.POISON.value, base_hp // 16,
+                               np.where(other_status == Status.BAD_POISON.value, base_hp * turns // 16, base_hp // 8))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            damage = self._attack[rows, sides, slots] // base_damage
+            defense = np.trunc(self._defense[rows, sides, slots] / base_damage * 1 / 10).astype(np.int32)
+        hp = self._hp[rows, sides, slots]
+        hp = hp - np.minimum(np.maximum(1, damage - defense), hp)
+        self._hp[rows, sides, slots] = hp
+        self._switch(rows[hp == 0], sides[hp == 0])
@@ -0,0 +1,102 @@
+import unittest
+
+import numpy as np
+
+from pokemon_ai.classes import Player
+from pokemon_ai.data import get_party, get_random_party
+from pokemon_ai.utils import RNG, can_damage
+
+from .battle_state import BattleState, NO_ACTION, SWITCH_OFFSET
+from .battle_batch import BattleBatch
+
+
+class BattleBatchTestSuite(unittest.TestCase):
+
+    def test_play(self):
+        state = BattleState.from_players(Player('test', get_party('venusaur', 'squirtle')),
+                                         Player('test2', get_party('charmander', 'blastoise', 'pikachu')))
+        batch = BattleBatch.from_state(state, 100, seed=0)
+        winners = batch.play(BattleBatch.damage_actions, BattleBatch.random_actions)
+
+        self.assertTrue(batch.is_done())
+        for idx, winner in enumerate(winners):
+            self.assertTrue(batch.get_state(idx).is_wiped_out(1 - winner))
+            self.assertFalse(batch.get_state(idx).is_wiped_out(winner))
+
+    def test_damage_actions_fallback(self):
+        # A starting Pokemon without PP switches out, as DamageModel falls back to a RandomModel
+        player = Player('test', get_party('venusaur', 'squirtle'))
+        for move in player.get_party().get_starting().get_move_bank().get_as_list():
+            move.restore((0, False))
+        state = BattleState.from_players(player, Player('test2', get_party('charmander')))
+        batch = BattleBatch.from_state(state, 10, seed=0)
+        self.assertTrue((batch.damage_actions(0) == SWITCH_OFFSET + 1).all())
+        self.assertTrue((batch.damage_actions(1) < SWITCH_OFFSET).all())
+
+    def test_is_legal(self):
+        rng = RNG(0)
+        states = []
+        for _ in range(20):
+            players = [Player('test', get_random_party(3, rng)), Player('test2', get_random_party(3, rng))]
+            states.append(BattleState.from_players(*players, rng=rng))
+            states[-1].play(max_turns=4)
+        batch = BattleBatch.from_states(states, seed=0)
+
+        # Every action BattleState lists is legal, and nothing else is
+        for action in [NO_ACTION] + list(range(SWITCH_OFFSET + 3)) + [SWITCH_OFFSET + 5]:
+            legal = batch.is_legal(0, np.full(len(states), action))
+            for state, is_legal in zip(states, legal):
+                self.assertEqual(is_legal, action in state.get_actions(0))
+
+        # The switch targets are, by slot, the Pokemon of the legal switches
+        targets = batch.get_switch_targets(0)
+        for slot in range(6):
+            slots = np.full(len(states), slot)
+            legal = batch.is_legal(0, SWITCH_OFFSET + batch.get_party_indices(0, slots))
+            np.testing.assert_array_equal(legal, targets[:, slot])
+
+    def test_matches_battle_state(self):
+        state = BattleState.from_players(Player('test', get_party('arbok', 'jynx')),
+                                         Player('test2', get_party('butterfree', 'parasect')))
+        batch = BattleBatch.from_states([state.copy() for _ in range(2000)], seed=0)
+        batch_win_rate = (batch.play() == 0).mean()
+
+        wins = 0
+        for _ in range(2000):
+            wins += state.copy().play() == 0
+        self.assertAlmostEqual(batch_win_rate, wins / 2000, delta=0.05)
+
+    def test_adjudicate(self):
+        # Drain the PP of most moves, so that some sides can no longer damage the other
+        rng = RNG(0)
+        states = []
+        for _ in range(200):
+            players = [Player('test', get_random_party(2, rng)), Player('test2', get_random_party(2, rng))]
+            for player in players:
+                for pokemon in player.get_party().get_as_list():
+                    for move in pokemon.get_move_bank().get_as_list():
+                        if rng.random() < 0.8:
+                            move.restore((0, False))
+            states.append(BattleState.from_players(*players))
+        batch = BattleBatch.from_states(states, seed=0)
+
+        can = [batch.can_damage(0), batch.can_damage(1)]
+        for idx, state in enumerate(states):
+            player, other_player = state.to_players()
+            self.assertEqual(can[0][idx], can_damage(player, other_player))
+            self.assertEqual(can[1][idx], can_damage(other_player, player))
+        self.assertTrue(0 < can[0].sum() < len(states))
+
+        # Only one side can damage the other in the decided battles, which that side wins
+        stalled = batch.adjudicate()
+        winners = batch.get_winners()
+        self.assertTrue(((winners == 0) == (can[0] & ~can[1])).all())
+        self.assertTrue(((winners == 1) == (can[1] & ~can[0])).all())
+        self.assertTrue((stalled == (~can[0] & ~can[1])).all())
+        for idx in range(len(states)):
+            if winners[idx] >= 0:
+                self.assertTrue(batch.get_state(idx).is_wiped_out(1 - winners[idx]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,543 @@
+from typing import *
+import numpy as np
+
+from pokemon_ai.classes import Bag, Move, MoveBank, Party, Player, Pokemon, PokemonType, Stats, Status
+from pokemon_ai.utils import POKEMON_MOVE_LIMIT, POKEMON_PARTY_LIMIT, RNG, get_rng, EFFECTIVENESS_TABLE
+
+# Value stored in the status buffers in place of None
+NO_STATUS = -1
+
+# Actions are plain integers: [0, POKEMON_MOVE_LIMIT) attacks with the move at that index of the starting Pokemon and
+# SWITCH_OFFSET + i switches in the Pokemon at index i of the party.
+SWITCH_OFFSET = POKEMON_MOVE_LIMIT
+NO_ACTION = -1
+
+# Statuses that are stored as the "other" status and hurt the Pokemon at the end of each turn
+_OTHER_STATUSES = (Status.POISON.value, Status.BAD_POISON.value, Status.BURN.value)
+
+# Layout of the mutable fields inside a BattleState buffer, as (name, shape)
+_P, _M = POKEMON_PARTY_LIMIT, POKEMON_MOVE_LIMIT
+_LAYOUT = (
+    ('_info', (2,)),  # started flag, turn count
+    ('_hp', (2, _P)),
+    ('_status', (2, _P)),
+    ('_status_turns', (2, _P)),
+    ('_other_status', (2, _P)),
+    ('_other_status_turns', (2, _P)),
+    ('_revealed', (2, _P)),
+    ('_order', (2, _P)),
+    ('_pp', (2, _P, _M)),
+    ('_move_revealed', (2, _P, _M)),
+)
+_BUFFER_SIZE = sum(int(np.prod(shape)) for _, shape in _LAYOUT)
+
+# Offset of each field inside a flat buffer, for converting from and to players through plain lists, which is much
+# faster than indexing the arrays one element at a time
+_OFFSETS, _SIZES = {}, {}
+_offset = 0
+for _name, _shape in _LAYOUT:
+    _OFFSETS[_name], _SIZES[_name] = _offset, int(np.prod(_shape))
+    _offset += _SIZES[_name]
+_HP, _STATUS, _STATUS_TURNS = _OFFSETS['_hp'], _OFFSETS['_status'], _OFFSETS['_status_turns']
+_OTHER_STATUS, _OTHER_STATUS_TURNS = _OFFSETS['_other_status'], _OFFSETS['_other_status_turns']
+_REVEALED, _ORDER, _PP, _MOVE_REVEALED = _OFFSETS['_revealed'], _OFFSETS['_order'], _OFFSETS['_pp'], \
+    _OFFSETS['_move_revealed']
+
+
+class _StaticTables:
+    """
+    The parts of a battle that never change during a simulation, shared by every copy of a BattleState.
+    """
+
+    def __init__(self, player: Player, other_player: Player):
+        shape, move_shape = (2, _P), (2, _P, _M)
+        self.player_names = [player.get_name(), other_player.get_name()]
+        self.player_ids = [player.get_id(), other_player.get_id()]
+        self.size = np.zeros(2, dtype=np.int32)
+        self.num_moves = np.zeros(shape, dtype=np.int32)
+        self.pokemon_ids: List[List[int]] = [[], []]
+        self.pokemon_names: List[List[str]] = [[], []]
+        self.move_names: List[List[List[str]]] = [[], []]
+        self.type = np.zeros(shape, dtype=np.int32)
+        self.level = np.zeros(shape, dtype=np.int32)
+        self.base_hp = np.zeros(shape, dtype=np.int32)
+        self.attack = np.ones(shape, dtype=np.int32)
+        self.defense = np.ones(shape, dtype=np.int32)
+        self.special_attack = np.ones(shape, dtype=np.int32)
+        self.special_defense = np.ones(shape, dtype=np.int32)
+        self.speed = np.zeros(shape, dtype=np.int32)
+        self.accuracy = np.zeros(shape, dtype=np.int32)
+        self.evasiveness = np.zeros(shape, dtype=np.int32)
+        self.move_damage = np.zeros(move_shape, dtype=np.int32)
+        self.move_base_pp = np.zeros(move_shape, dtype=np.int32)
+        self.move_type = np.zeros(move_shape, dtype=np.int32)
+        self.move_special = np.zeros(move_shape, dtype=bool)
+        self.move_heal = np.zeros(move_shape, dtype=np.int32)
+        self.move_status = np.full(move_shape, NO_STATUS, dtype=np.int32)
+
+        for side, p in enumerate([player, other_player]):
+            pokemon_list = p.get_party().get_sorted_list()
+            assert len(pokemon_list) <= _P
+            self.size[side] = len(pokemon_list)
+            for slot, pokemon in enumerate(pokemon_list):
+                stats = pokemon.get_stats()
+                moves = pokemon.get_move_bank().get_as_list()
+                assert len(moves) <= _M
+                self.pokemon_ids[side].append(pokemon.get_id())
+                self.pokemon_names[side].append(pokemon.get_name())
+                self.move_names[side].append([move.get_name() for move in moves])
+                self.num_moves[side, slot] = len(moves)
+                self.type[side, slot] = pokemon.get_type().value
+                self.level[side, slot] = pokemon.get_level()
+                self.base_hp[side, slot] = pokemon.get_base_hp()
+                self.attack[side, slot] = stats.get_attack()
+                self.defense[side, slot] = stats.get_defense()
+                self.special_attack[side, slot] = stats.get_special_attack()
+                self.special_defense[side, slot] = stats.get_special_defense()
+                self.speed[side, slot] = stats.get_speed()
+                self.accuracy[side, slot] = stats.get_accuracy()
+                self.evasiveness[side, slot] = stats.get_evasiveness()
+                for m, move in enumerate(moves):
+                    self.move_damage[side, slot, m] = move.get_base_damage()
+                    self.move_base_pp[side, slot, m] = move.get_base_pp()
+                    self.move_type[side, slot, m] = move.get_type().value
+                    self.move_special[side, slot, m] = move.is_special()
+                    self.move_heal[side, slot, m] = move.get_base_heal()
+                    if move.get_status_inflict() is not None:
+                        self.move_status[side, slot, m] = move.get_status_inflict().value
+
+
+class BattleState:
+    """
+    A compact, array-backed battle between two players used for fast simulation.
+
+    All mutable fields (HP, PP, statuses, party order, revealed flags) live in one fixed-size int32 buffer, bounded by
+    POKEMON_PARTY_LIMIT and POKEMON_MOVE_LIMIT, so copying a state is a single buffer copy. Pokemon are stored by slot,
+    their index in the party sorted by ID, and the party order is kept as a list of slots. Side 0 is the first player.
+    """
+
+    def __init__(self, tables: _StaticTables, buffer: np.ndarray = None, rng: RNG = None):
+        """
+        Initializes a BattleState. Use BattleState.from_players to create one from two players.
+        :param tables: The static tables describing both parties.
+        :param buffer: The mutable state buffer. A blank buffer is allocated if None.
+        :param rng: The RNG turns are played with. Defaults to the process-wide RNG.
+        """
+        self._tables = tables
+        self._rng = rng or get_rng()
+        self._buffer = buffer if buffer is not None else np.zeros(_BUFFER_SIZE, dtype=np.int32)
+        for name, shape in _LAYOUT:
+            offset = _OFFSETS[name]
+            setattr(self, name, self._buffer[offset:offset + _SIZES[name]].reshape(shape))
+
+    ##
+    #   Conversion Functions
+    ##
+
+    @classmethod
+    def from_players(cls, player: Player, other_player: Player, started: bool = False, turn_count: int = 1,
+                     rng: RNG = None, like: 'BattleState' = None):
+        """
+        Creates a BattleState from two players.
+        :param player: The first player (side 0).
+        :param other_player: The second player (side 1).
+        :param started: Has the battle already started? If not, the starting Pokemon are revealed on the first turn.
+        :param turn_count: The current turn number.
+        :param rng: The RNG turns are played with. Defaults to the process-wide RNG.
+        :param like: A state created from the same two parties, whose static tables are shared instead of rebuilt.
+        BattleBatches of states sharing their tables broadcast them instead of stacking them.
+        :return: A new BattleState.
+        """
+        tables = like._tables if like is not None else _StaticTables(player, other_player)
+        values = [0] * _BUFFER_SIZE
+        values[_OFFSETS['_info']:_OFFSETS['_info'] + 2] = int(started), turn_count
+        for offset in [_ORDER, _STATUS, _OTHER_STATUS]:
+            values[offset:offset + 2 * _P] = [-1] * (2 * _P)
+        for side, p in enumerate([player, other_player]):
+            slot_of = {pokemon_id: slot for slot, pokemon_id in enumerate(tables.pokemon_ids[side])}
+            for idx, pokemon in enumerate(p.get_party().get_as_list()):
+                slot = slot_of[pokemon.get_id()]
+                values[_ORDER + side * _P + idx] = slot
+                cls._write_pokemon(values, side, slot, pokemon)
+        return cls(tables, np.array(values, dtype=np.int32), rng=rng)
+
+    def to_players(self, model: Any = None, other_model: Any = None) -> Tuple[Player, Player]:
+        """
+        Creates two new players with fresh Pokemon and moves matching this state.
+        :param model: The model to give the first player.
+        :param other_model: The model to give the second player.
+        :return: A tuple containing both players.
+        """
+        t = self._tables
+        players = []
+        for side, p_model in enumerate([model, other_model]):
+            pokemon_list = []
+            for slot in range(t.size[side]):
+                moves = [Move(t.move_names[side][slot][m], int(t.move_damage[side, slot, m]),
+                              int(t.move_base_pp[side, slot, m]), PokemonType(int(t.move_type[side, slot, m])),
+                              bool(t.move_special[side, slot, m]), int(t.move_heal[side, slot, m]),
+                              self._to_status(t.move_status[side, slot, m]))
+                         for m in range(t.num_moves[side, slot])]
+                stats = Stats(int(t.attack[side, slot]), int(t.defense[side, slot]), int(t.special_attack[side, slot]),
+                              int(t.special_defense[side, slot]), int(t.speed[side, slot]),
+                              int(t.accuracy[side, slot]), int(t.evasiveness[side, slot]))
+                pokemon_list.append(Pokemon(PokemonType(int(t.type[side, slot])), t.pokemon_names[side][slot],
+                                            int(t.level[side, slot]), stats, MoveBank(moves),
+                                            int(t.base_hp[side, slot])))
+            party = Party(pokemon_list)
+            for slot, pokemon in enumerate(pokemon_list):
+                pokemon.set_id(t.pokemon_ids[side][slot])
+            players.append(Player(t.player_names[side], party, Bag([]), p_model, t.player_ids[side]))
+        self.apply_to(*players)
+        return players[0], players[1]
+
+    def apply_to(self, player: Player, other_player: Player) -> None:
+        """
+        Writes this state into two existing players, which must hold the parties the state was created from.
+        :param player: The first player (side 0).
+        :param other_player: The second player (side 1).
+        """
+        values = self._buffer.tolist()
+        for side, p in enumerate([player, other_player]):
+            party = p.get_party()
+            by_slot = party.get_sorted_list()
+            order = _ORDER + side * _P
+            party.get_as_list()[:] = [by_slot[slot] for slot in values[order:order + self._tables.size[side]]]
+            for slot, pokemon in enumerate(by_slot):
+                self._read_pokemon(values, side, slot, pokemon)
+
+    @classmethod
+    def _write_pokemon(cls, values: List[int], side: int, slot: int, pokemon: Pokemon) -> None:
+        i = side * _P + slot
+        values[_HP + i] = pokemon.get_hp()
+        values[_STATUS + i] = cls._from_status(pokemon.get_status())
+        values[_STATUS_TURNS + i] = pokemon.get_status_turns()
+        values[_OTHER_STATUS + i] = cls._from_status(pokemon.get_other_status())
+        values[_OTHER_STATUS_TURNS + i] = pokemon.get_other_status_turns()
+        values[_REVEALED + i] = int(pokemon.is_revealed())
+        for m, move in enumerate(pokemon.get_move_bank().get_as_list()):
+            values[_PP + i * _M + m] = move.get_pp()
+            values[_MOVE_REVEALED + i * _M + m] = int(move.is_revealed())
+
+    @classmethod
+    def _read_pokemon(cls, values: List[int], side: int, slot: int, pokemon: Pokemon) -> None:
+        i = side * _P + slot
+        pokemon._hp = values[_HP + i]
+        pokemon._status = cls._to_status(values[_STATUS + i])
+        pokemon._status_turns = values[_STATUS_TURNS + i]
+        pokemon._other_status = cls._to_status(values[_OTHER_STATUS + i])
+        pokemon._other_status_turns = values[_OTHER_STATUS_TURNS + i]
+        pokemon.reveal() if values[_REVEALED + i] else pokemon.hide()
+        for m, move in enumerate(pokemon.get_move_bank().get_as_list()):
+            move._pp = values[_PP + i * _M + m]
+            move.reveal() if values[_MOVE_REVEALED + i * _M + m] else move.hide()
+
+    @staticmethod
+    def _from_status(status: Optional[Status]) -> int:
+        return NO_STATUS if status is None else status.value
+
+    @staticmethod
+    def _to_status(value: int) -> Optional[Status]:
+        return None if value == NO_STATUS else Status(int(value))
+
+    ##
+    #   Getter Functions
+    ##
+
+    def copy(self, rng: RNG = None):
+        """
+        Copies the state. The static tables are shared, so this is a single buffer copy.
+        :param rng: The RNG of the copy. Shares this state's RNG if None.
+        :return: A new BattleState.
+        """
+        return BattleState(self._tables, self._buffer.copy(), rng or self._rng)
+
+    def get_buffer(self) -> np.ndarray:
+        return self._buffer
+
+    def get_turn_count(self) -> int:
+        return int(self._info[1])
+
+    def get_party_size(self, side: int) -> int:
+        return int(self._tables.size[side])
+
+    def get_starting_slot(self, side: int) -> int:
+        return int(self._order[side, 0])
+
+    def get_slot_at_index(self, side: int, idx: int) -> int:
+        return int(self._order[side, idx])
+
+    def get_hp(self, side: int, slot: int) -> int:
+        return int(self._hp[side, slot])
+
+    def get_pp(self, side: int, slot: int, move_idx: int) -> int:
+        return int(self._pp[side, slot, move_idx])
+
+    def is_fainted(self, side: int, slot: int) -> bool:
+        return self._hp[side, slot] == 0
+
+    def is_wiped_out(self, side: int) -> bool:
+        """
+        :return: True if every Pokemon on the side has fainted.
+        """
+        return not self._hp[side, :self._tables.size[side]].any()
+
+    def get_actions(self, side: int) -> List[int]:
+        """
+        Gets the actions the side can take: every move of the starting Pokemon with PP left and every switch to a
+        non-fainted Pokemon.
+        :param side: The side to get actions for.
+        :return: A list of action integers.
+        """
+        slot = self._order[side, 0]
+        actions = [m for m in range(self._tables.num_moves[side, slot]) if self._pp[side, slot, m] > 0]
+        actions += [SWITCH_OFFSET + idx for idx in range(1, self._tables.size[side])
+                    if self._hp[side, self._order[side, idx]] > 0]
+        return actions
+
+    def random_action(self, side: int) -> int:
+        """
+        Picks an action the same way RandomModel does.
+        :param side: The side to pick an action for.
+        :return: An action integer.
+        """
+        slot = self._order[side, 0]
+        moves = [m for m in range(self._tables.num_moves[side, slot]) if self._pp[side, slot, m] > 0]
+        num_switches = int(np.count_nonzero(self._hp[side, :self._tables.size[side]])) - 1
+        if len(moves) + num_switches > 0 and self._rng.random_int(1, len(moves) + num_switches) <= len(moves):
+            return moves[self._rng.random_int(0, len(moves) - 1)]
+        idx = self._forced_switch_index(side)
+        return SWITCH_OFFSET + idx if idx > 0 else NO_ACTION
+
+    def outcome(self, side: int = 0) -> float:
+        """
+        Calculates the outcome value on [0, 1] for the side, exactly as outcome_func_v1 does for players.
+        :param side: The side to calculate the outcome for.
+        :return: The outcome value.
+        """
+        t = self._tables
+        n, other_n = t.size[side], t.size[1 - side]
+        hp, other_hp = self._hp[side, :n], self._hp[1 - side, :other_n]
+        base_hp, other_base_hp = t.base_hp[side, :n], t.base_hp[1 - side, :other_n]
+        fainted, other_fainted = int(np.count_nonzero(hp == 0)), int(np.count_nonzero(other_hp == 0))
+        outcome = 0.2 if fainted == n else 0.8
+        hp_perc_diff = int((other_base_hp - other_hp).sum()) / int(other_base_hp.sum()) - \
+            int((base_hp - hp).sum()) / int(base_hp.sum())
+        pokemon_fainted_perc_diff = other_fainted / other_n - (fainted / n) ** 2
+        return outcome + (hp_perc_diff + pokemon_fainted_perc_diff) / 10
+
+    ##
+    #   Simulation Functions
+    ##
+
+    def play_turn(self, action: int, other_action: int) -> Optional[int]:
+        """
+        Plays one turn with the same rules as Battle.play_turn.
+        :param action: The action of side 0.
+        :param other_action: The action of side 1.
+        :return: The winning side or None.
+        """
+        if not self._info[0]:
+            self._info[0] = 1
+            self._revealed[0, self._order[0, 0]] = 1
+            self._revealed[1, self._order[1, 0]] = 1
+
+        # Switches happen immediately, attacks are queued by speed
+        attack_queue = []
+        for side, a in [(0, action), (1, other_action)]:
+            if a >= SWITCH_OFFSET:
+                self._switch(side, a - SWITCH_OFFSET)
+            elif a >= 0:
+                self._enqueue_attack(attack_queue, side, a)
+
+        for side, slot, move_idx in attack_queue:
+            if self._perform_attack(side, slot, move_idx):
+                break
+
+        winner = self._check_win()
+        if winner is not None:
+            return winner
+
+        self._turn_end(0)
+        self._turn_end(1)
+        self._info[1] += 1
+        return None
+
+    def play(self, policy: Callable[[Any, int], int] = None, other_policy: Callable[[Any, int], int] = None,
+             max_turns: int = None) -> Optional[int]:
+        """
+        Plays the battle until there is a winner.
+        :param policy: A function taking (state, side) and returning side 0's action. Defaults to random_action.
+        :param other_policy: A function taking (state, side) and returning side 1's action. Defaults to random_action.
+        :param max_turns: Stop after this many turns even if there is no winner.
+        :return: The winning side or None.
+        """
+        policy = policy or BattleState.random_action
+        other_policy = other_policy or BattleState.random_action
+        winner, turns = None, 0
+        while winner is None and (max_turns is None or turns < max_turns):
+            winner = self.play_turn(policy(self, 0), other_policy(self, 1))
+            turns += 1
+        return winner
+
+    def _enqueue_attack(self, attack_queue: List[Tuple[int, int, int]], side: int, move_idx: int) -> None:
+        slot = int(self._order[side, 0])
+        attack_triple = (side, slot, move_idx)
+        if len(attack_queue) == 0:
+            attack_queue.append(attack_triple)
+        else:
+            other_side, other_slot, _ = attack_queue[0]
+            op_speed = self._tables.speed[other_side, other_slot]
+            self_speed = self._tables.speed[side, slot]
+            if op_speed > self_speed or (op_speed == self_speed and self._rng.chance(0.5, True, False)):
+                attack_queue.append(attack_triple)
+            else:
+                attack_queue.insert(0, attack_triple)
+
+    def _switch(self, side: int, idx: int = None) -> bool:
+        """
+        Switches the Pokemon at the party index in, forcing a switch if the index is not valid.
+        :return: True if the side switched Pokemon, False if every Pokemon has fainted.
+        """
+        size = self._tables.size[side]
+        if self.is_wiped_out(side):
+            return False
+        if idx is None or idx <= 0 or idx >= size:
+            idx = self._forced_switch_index(side)
+            if idx <= 0:
+                return False
+        current_slot = self._order[side, 0]
+        order = self._order[side]
+        slot = order[idx]
+        order[1:idx + 1] = order[0:idx].copy()
+        order[0] = slot
+        if self._status[side, current_slot] == Status.CONFUSION.value:
+            self._status[side, current_slot] = NO_STATUS
+        self._revealed[side, slot] = 1
+        return True
+
+    def _forced_switch_index(self, side: int) -> int:
+        """
+        :return: The index of the first non-fainted Pokemon after the starting one, as RandomModel picks, or 0.
+        """
+        for idx in range(1, self._tables.size[side]):
+            if self._hp[side, self._order[side, idx]] > 0:
+                return idx
+        return 0
+
+    def _perform_attack(self, side: int, slot: int, move_idx: int) -> bool:
+        """
+        Performs the move of the Pokemon in the slot against the other side's starting Pokemon.
+        :return: True if the side wins, False otherwise.
+        """
+        if self._hp[side, slot] == 0:
+            return False
+
+        status = int(self._status[side, slot])
+        if status == NO_STATUS:
+            return self._try_attack(side, slot, move_idx)
+        if status in _OTHER_STATUSES:
+            return False
+
+        self._status_turns[side, slot] = max(0, self._status_turns[side, slot] - 1)
+        if self._status_turns[side, slot] == 0:
+            self._status[side, slot] = NO_STATUS
+        if status == Status.CONFUSION.value:
+            if self._rng.chance(1 / 3, True, False):
+                t = self._tables
+                base_damage = 40
+                damage = int(t.attack[side, slot] / base_damage)
+                defense = int(t.defense[side, slot] / base_damage * 1 / 10)
+                self._hp[side, slot] = max(0, self._hp[side, slot] - max(1, damage - defense))
+                if self._hp[side, slot] == 0:
+                    self._switch(side)
+            else:
+                self._try_attack(side, slot, move_idx)
+        elif status == Status.PARALYSIS.value:
+            self._rng.chance(0.25, None, lambda: self._try_attack(side, slot, move_idx))
+        elif status == Status.INFATUATION.value:
+            self._rng.chance(0.5, None, lambda: self._try_attack(side, slot, move_idx))
+        return False
+
+    def _try_attack(self, side: int, slot: int, move_idx: int) -> bool:
+        t = self._tables
+        on_side = 1 - side
+        on_slot = int(self._order[on_side, 0])
+
+        self._pp[side, slot, move_idx] = max(0, self._pp[side, slot, move_idx] - 1)
+        self._move_revealed[side, slot, move_idx] = 1
+
+        chance_of_hit = t.accuracy[side, slot] / 100 * t.evasiveness[on_side, on_slot] / 100
+        if not self._rng.chance(chance_of_hit, True, False):
+            return False
+
+        if t.move_damage[side, slot, move_idx] > 0:
+            self._hp[on_side, on_slot] = max(0, self._hp[on_side, on_slot] -
+                                             self._calculate_damage(side, slot, move_idx, on_side, on_slot))
+
+        status = int(t.move_status[side, slot, move_idx])
+        if status != NO_STATUS:
+            if status in _OTHER_STATUSES:
+                self._other_status[on_side, on_slot] = status
+                self._other_status_turns[on_side, on_slot] = 0
+            else:
+                self._status[on_side, on_slot] = status
+                self._status_turns[on_side, on_slot] = self._rng.random_int(1, 7)
+
+        heal = t.move_heal[side, slot, move_idx]
+        if heal > 0:
+            self._hp[on_side, on_slot] = min(t.base_hp[on_side, on_slot], self._hp[on_side, on_slot] + heal)
+
+        if self._hp[on_side, on_slot] == 0:
+            return not self._switch(on_side)
+        return False
+
+    def _calculate_damage(self, side: int, slot: int, move_idx: int, on_side: int, on_slot: int) -> int:
+        """
+        Calculates damage exactly as calculate_damage does.
+        """
+        t = self._tables
+        critical = self._rng.chance(.0625, 2, 1)
+        random = self._rng.random_pct(85, 100)
+        move_type = int(t.move_type[side, slot, move_idx])
+        effectiveness = EFFECTIVENESS_TABLE[move_type][int(t.type[on_side, on_slot])]
+        modifier = critical * random * effectiveness.value
+        if t.move_special[side, slot, move_idx]:
+            attack, defense = int(t.special_attack[side, slot]), int(t.special_defense[on_side, on_slot])
+        else:
+            attack, defense = int(t.attack[side, slot]), int(t.defense[on_side, on_slot])
+        attack *= 1.5 if move_type == t.type[side, slot] else 1
+        damage = max(0, int(((((((2 * int(t.level[side, slot])) / 5) + 2) * int(t.move_damage[side, slot, move_idx]) *
+                                (attack / defense)) / 50) + 2) * modifier))
+        return min(damage, int(self._hp[on_side, on_slot]))
+
+    def _turn_end(self, side: int) -> None:
+        """
+        Inflicts damage from poison and burns on the side's starting Pokemon, as Battle._turn_end does.
+        """
+        t = self._tables
+        slot = int(self._order[side, 0])
+        other_status = int(self._other_status[side, slot])
+        if other_status not in _OTHER_STATUSES:
+            return
+        self._other_status_turns[side, slot] += 1
+        base_hp = int(t.base_hp[side, slot])
+        if other_status == Status.POISON.value:
+            base_damage = int(base_hp / 16)
+        elif other_status == Status.BAD_POISON.value:
+            base_damage = int(base_hp * int(self._other_status_turns[side, slot]) / 16)
+        else:
+            base_damage = int(base_hp / 8)
+        damage = int(t.attack[side, slot] / base_damage)
+        defense = int(t.defense[side, slot] / base_damage * 1 / 10)
+        hp = int(self._hp[side, slot])
+        self._hp[side, slot] = hp - min(max(1, damage - defense), hp)
+        if self._hp[side, slot] == 0:
+            self._switch(side)
+
+    def _check_win(self) -> Optional[int]:
+        if self.is_wiped_out(1):
+            return 0
+        if self.is_wiped_out(0):
+            return 1
+        return None
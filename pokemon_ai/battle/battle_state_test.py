@@ -0,0 +1,45 @@
+import unittest
+
+from pokemon_ai.classes import Player
+from pokemon_ai.data import get_party
+
+from .battle_state import BattleState, SWITCH_OFFSET
+
+
+class BattleStateTestSuite(unittest.TestCase):
+
+    def test_round_trip(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle', 'pikachu'))
+        player2 = Player('test2', get_party('charmander', 'blastoise'))
+        player1.get_party().make_starting(2)
+        player2.get_party().get_starting().take_damage(10)
+        player2.get_party().get_starting().get_move_bank().get_move(1).dec_pp()
+
+        state = BattleState.from_players(player1, player2)
+        new_player1, new_player2 = state.to_players()
+
+        for old, new in [(player1, new_player1), (player2, new_player2)]:
+            self.assertEqual([str(p) for p in old.get_party().get_as_list()],
+                             [str(p) for p in new.get_party().get_as_list()])
+            self.assertEqual([p.get_id() for p in old.get_party().get_as_list()],
+                             [p.get_id() for p in new.get_party().get_as_list()])
+        self.assertTrue((BattleState.from_players(new_player1, new_player2).get_buffer() == state.get_buffer()).all())
+
+    def test_copy_is_independent(self):
+        state = BattleState.from_players(Player('test', get_party('venusaur', 'squirtle')),
+                                         Player('test2', get_party('charmander', 'blastoise')))
+        copy = state.copy()
+        copy.play_turn(SWITCH_OFFSET + 1, 0)
+        self.assertEqual(state.get_starting_slot(0), 0)
+        self.assertEqual(copy.get_starting_slot(0), 1)
+
+    def test_play(self):
+        state = BattleState.from_players(Player('test', get_party('venusaur', 'squirtle')),
+                                         Player('test2', get_party('charmander', 'blastoise')))
+        winner = state.play()
+        self.assertIn(winner, [0, 1])
+        self.assertTrue(state.is_wiped_out(1 - winner))
+
+
+if __name__ == '__main__':
+    unittest.main()
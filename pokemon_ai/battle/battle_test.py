@@ -0,0 +1,84 @@
+import contextlib
+import io
+import unittest
+
+from pokemon_ai.ai.models import RandomModel
+from pokemon_ai.classes import Player
+from pokemon_ai.data import get_party
+from pokemon_ai.utils import RNG
+
+from .battle import Battle
+from .events import BattleEventType, ConsoleSink, ListSink, NullSink
+
+
+class BattleTestSuite(unittest.TestCase):
+
+    def test_undo_turn(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle', 'arbok'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise', 'jynx'), model=RandomModel())
+        initial = (player1.snapshot(), player2.snapshot())
+
+        battle = Battle(player1, player2, 0, undoable=True)
+        states = [(player1.snapshot(), player2.snapshot(), battle.turn_count)]
+        winner = None
+        while winner is None:
+            winner = battle.play_turn()
+            states.append((player1.snapshot(), player2.snapshot(), battle.turn_count))
+
+        # Undo every turn, checking the state before each one
+        for state in reversed(states[:-1]):
+            self.assertTrue(battle.undo_turn())
+            self.assertEqual(state, (player1.snapshot(), player2.snapshot(), battle.turn_count))
+        self.assertFalse(battle.undo_turn())
+
+        battle.undo_all()
+        self.assertEqual(initial, (player1.snapshot(), player2.snapshot()))
+
+    def test_event_sinks(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+        sink = ListSink()
+        winner = Battle(player1, player2, 0, sinks=[sink]).play()
+
+        events = sink.get_events()
+        self.assertIs(events[-1].type, BattleEventType.WIN)
+        self.assertIs(events[-1].data['player'], winner)
+        self.assertTrue(any(event.type is BattleEventType.ATTACK for event in events))
+        self.assertEqual(sink.to_dicts()[-1], {'type': 'WIN', 'turn': events[-1].turn, 'player': winner.get_name()})
+
+        # Every turn starts with the HP of both starting Pokemon
+        self.assertIs(events[0].type, BattleEventType.START)
+        turns = [idx for idx, event in enumerate(events) if event.type is BattleEventType.TURN]
+        self.assertEqual(len(turns), events[-1].turn)
+        for idx in turns:
+            self.assertEqual([event.type for event in events[idx + 1:idx + 3]], [BattleEventType.HP] * 2)
+
+    def test_console_sink(self):
+        def play(sinks):
+            player1 = Player('test', get_party('venusaur'), model=RandomModel())
+            player2 = Player('test2', get_party('charmander'), model=RandomModel())
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                Battle(player1, player2, 1, sinks=sinks).play_turn()
+            return output.getvalue()
+
+        # The basic log prints the turn and the HP of the starting Pokemon, and a NullSink prints nothing
+        self.assertTrue(play([ConsoleSink(1)]).startswith('\n\nTURN 1\nVenusaur  -  '))
+        self.assertEqual(play([NullSink()]), '')
+
+    def test_seeded(self):
+        results = []
+        for _ in range(2):
+            rng = RNG(42)
+            player1 = Player('test', get_party('venusaur', 'squirtle', 'arbok'), model=RandomModel(rng))
+            player2 = Player('test2', get_party('charmander', 'blastoise', 'jynx'), model=RandomModel(rng))
+            battle = Battle(player1, player2, 0, rng=rng)
+            winner = battle.play()
+            # Pokemon IDs are time-based, so compare the Pokemon themselves
+            pokemon = [snapshot for player in [player1, player2] for _, snapshot in player.snapshot()[1]]
+            results.append((winner.get_name(), battle.turn_count, pokemon))
+        self.assertEqual(results[0], results[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
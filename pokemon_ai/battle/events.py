@@ -0,0 +1,218 @@
+from typing import *
+from enum import Enum
+
+from pokemon_ai.classes import Effectiveness, Status, status_names
+from pokemon_ai.utils import okay
+
+
+class BattleEventType(Enum):
+    """
+    The type of something that happened in a battle.
+    """
+    ATTACK = 0
+    MISS = 1
+    CRITICAL = 2
+    EFFECTIVENESS = 3
+    DAMAGE = 4
+    STATUS = 5
+    STATUS_ACTIVE = 6
+    STATUS_DAMAGE = 7
+    CONFUSION_DAMAGE = 8
+    IMMOBILIZED = 9
+    HEAL = 10
+    FAINT = 11
+    SWITCH = 12
+    INVALID_SWITCH = 13
+    NO_PP = 14
+    ITEM = 15
+    WIN = 16
+    FORFEIT = 17
+    START = 18
+    TURN = 19
+    HP = 20
+    PARTY = 21
+
+
+# Events that only the basic log shows, since the battle screen shows the same at verbose 2
+LOG_EVENTS = {BattleEventType.TURN, BattleEventType.HP}
+
+# Events written out at once, without the recipients confirming them
+DISPLAY_EVENTS = {BattleEventType.START, BattleEventType.PARTY}
+
+
+class BattleEvent:
+    """
+    A record of something that happened in a battle. Events are only created when a battle has an enabled sink.
+    """
+
+    __slots__ = ('type', 'turn', 'recipients', 'data')
+
+    def __init__(self, event_type: BattleEventType, turn: int, recipients: Tuple[Any, ...], data: Dict[str, Any]):
+        """
+        Initializes a BattleEvent.
+        :param event_type: The type of the event.
+        :param turn: The turn the event happened on.
+        :param recipients: The players the event is shown to.
+        :param data: The event's fields, such as player, pokemon, move, damage or status.
+        """
+        self.type = event_type
+        self.turn = turn
+        self.recipients = recipients
+        self.data = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Converts the event into a dictionary of plain values for analytics. Players, Pokemon, moves and items are
+        replaced by their names and enums by their names.
+        :return: A dictionary describing the event.
+        """
+        event = {'type': self.type.name, 'turn': self.turn}
+        for key, value in self.data.items():
+            if hasattr(value, 'get_name'):
+                value = value.get_name()
+            elif isinstance(value, Enum):
+                value = value.name
+            event[key] = value
+        return event
+
+    def __str__(self):
+        return ' '.join([message for message, _ in format_event(self)])
+
+
+def format_event(event: BattleEvent) -> List[Tuple[str, Tuple[Any, ...]]]:
+    """
+    Formats an event as text.
+    :param event: The event to format.
+    :return: A list of (message, recipients) tuples, usually with one message.
+    """
+    t, d = event.type, event.data
+    if t is BattleEventType.SWITCH:
+        # The switching player and the opponent see different messages
+        names = (d['pokemon'].get_name(), d['switched_pokemon'].get_name())
+        return [('Switched %s with %s.' % names, (d['player'],)),
+                ('%s switched %s with %s.' % ((d['player'].get_name(),) + names), (d['other_player'],))]
+
+    if t is BattleEventType.ATTACK:
+        message = "%s's %s used %s!" % (d['player'].get_name(), d['pokemon'].get_name(), d['move'].get_name())
+    elif t is BattleEventType.MISS:
+        message = "%s's attack missed." % d['pokemon'].get_name()
+    elif t is BattleEventType.CRITICAL:
+        message = 'A critical hit!'
+    elif t is BattleEventType.EFFECTIVENESS:
+        if d['effectiveness'] is Effectiveness.NO_EFFECT:
+            message = 'It has no effect on %s.' % d['pokemon'].get_name()
+        elif d['effectiveness'] is Effectiveness.SUPER_EFFECTIVE:
+            message = "It's super effective!"
+        else:
+            message = "It's not very effective..."
+    elif t is BattleEventType.DAMAGE:
+        message = '%s took %d damage.' % (d['pokemon'].get_name(), d['damage'])
+    elif t is BattleEventType.STATUS:
+        message = '%s was %s' % (d['pokemon'].get_name(), status_names[d['status']])
+    elif t is BattleEventType.STATUS_ACTIVE:
+        message = '%s is %s.' % (d['pokemon'].get_name(), status_names[d['status']])
+    elif t is BattleEventType.STATUS_DAMAGE:
+        source = 'its burn' if d['status'] is Status.BURN else 'poison'
+        message = '%s took %d damage from %s.' % (d['pokemon'].get_name(), d['damage'], source)
+    elif t is BattleEventType.CONFUSION_DAMAGE:
+        message = '%s hurt itself in its confusion.' % d['pokemon'].get_name()
+    elif t is BattleEventType.IMMOBILIZED:
+        message = d['pokemon'].get_name() + {
+            Status.PARALYSIS: ' is unable to move.',
+            Status.INFATUATION: ' is infatuated and is unable to move.',
+            Status.FREEZE: ' is frozen solid.',
+            Status.SLEEP: ' is fast asleep.'
+        }[d['status']]
+    elif t is BattleEventType.HEAL:
+        message = '%s gained %d HP.' % (d['pokemon'].get_name(), d['hp'])
+    elif t is BattleEventType.FAINT:
+        message = '%s fainted!' % d['pokemon'].get_name()
+    elif t is BattleEventType.INVALID_SWITCH:
+        message = d['pokemon'].get_name() + (' has fainted.' if d['fainted'] else ' is currently in battle.')
+    elif t is BattleEventType.NO_PP:
+        message = "There's no PP left for this move!"
+    elif t is BattleEventType.ITEM:
+        message = '%s used a %s.' % (d['player'].get_name(), d['item'].get_name())
+    elif t is BattleEventType.WIN:
+        message = '%s won!' % d['player'].get_name()
+    elif t is BattleEventType.START:
+        message = ''
+    elif t is BattleEventType.TURN:
+        message = '\nTURN %d' % event.turn
+    elif t is BattleEventType.HP:
+        message = '%s  -  %d' % (d['pokemon'].get_name(), d['hp'])
+    elif t is BattleEventType.PARTY:
+        message = str(d['player'].get_party())
+    else:
+        message = '%s forfeits...' % d['player'].get_name()
+    return [(message, event.recipients)]
+
+
+##
+# Sinks
+##
+
+class EventSink:
+    """
+    Receives the events of a battle.
+    """
+
+    # Battles skip creating events entirely when none of their sinks are enabled
+    enabled = True
+
+    def emit(self, event: BattleEvent) -> None:
+        """
+        Placeholder for handling an event.
+        :param event: The event.
+        """
+        pass
+
+
+class NullSink(EventSink):
+    """
+    A sink that ignores every event, so emitting costs nothing.
+    """
+    enabled = False
+
+
+class ConsoleSink(EventSink):
+    """
+    Writes events as text. Messages are only formatted here, when they are actually shown.
+    """
+
+    def __init__(self, verbose: int = 1):
+        """
+        Initializes a ConsoleSink.
+        :param verbose: 1 to print every message. 2 to have each human recipient respond "OK" to its messages, except
+        for DISPLAY_EVENTS, which are printed, and LOG_EVENTS, which are skipped.
+        """
+        self._verbose = verbose
+
+    def emit(self, event: BattleEvent) -> None:
+        if self._verbose != 1 and event.type in LOG_EVENTS:
+            return
+        for message, recipients in format_event(event):
+            if self._verbose == 2 and event.type not in DISPLAY_EVENTS:
+                for player in recipients:
+                    if not player.is_ai():
+                        okay(message)
+            elif self._verbose >= 1:
+                print(message)
+
+
+class ListSink(EventSink):
+    """
+    Collects events in a list for analysis.
+    """
+
+    def __init__(self):
+        self._events: List[BattleEvent] = []
+
+    def emit(self, event: BattleEvent) -> None:
+        self._events.append(event)
+
+    def get_events(self) -> List[BattleEvent]:
+        return self._events
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [event.to_dict() for event in self._events]
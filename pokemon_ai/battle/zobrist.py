@@ -0,0 +1,153 @@
+from typing import *
+from zlib import crc32
+
+from pokemon_ai.classes import Bag, Party, Player, Pokemon, Status
+
+# Fields hashed for each Pokemon. The PP of the move at index i is hashed as field _PP + i.
+_HP, _STATUS, _STATUS_TURNS, _OTHER_STATUS, _OTHER_STATUS_TURNS, _POSITION, _BAG, _PP = range(8)
+
+_MASK = (1 << 64) - 1
+
+# The Zobrist table, filled lazily since Pokemon IDs and HP values are unbounded. Every key is a pure function of its
+# (Pokemon ID, field, value), so the table can be cleared at any time without changing any hash.
+_TABLE_LIMIT = 1 << 20
+_table: Dict[Tuple[int, int, int], int] = {}
+
+
+def _mix(x: int) -> int:
+    """
+    Scrambles a 64-bit integer (the SplitMix64 finalizer).
+    """
+    x = (x + 0x9E3779B97F4A7C15) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+
+def _key(pokemon_id: int, field: int, value: int) -> int:
+    entry = (pokemon_id, field, value)
+    key = _table.get(entry)
+    if key is None:
+        if len(_table) >= _TABLE_LIMIT:
+            _table.clear()
+        key = _table[entry] = _mix(_mix(_mix(pokemon_id & _MASK) ^ field) ^ (value & _MASK))
+    return key
+
+
+def _status_value(status: Optional[Status]) -> int:
+    return status.value if status is not None else -1
+
+
+##
+# Hashes
+##
+
+def pokemon_hash(pokemon: Pokemon) -> int:
+    """
+    Hashes the battle state of a Pokemon: its HP, statuses, status turns and the PP of its moves.
+    :param pokemon: The Pokemon.
+    :return: A 64-bit hash.
+    """
+    pokemon_id = pokemon.get_id()
+    h = _key(pokemon_id, _HP, pokemon.get_hp()) \
+        ^ _key(pokemon_id, _STATUS, _status_value(pokemon.get_status())) \
+        ^ _key(pokemon_id, _STATUS_TURNS, pokemon.get_status_turns()) \
+        ^ _key(pokemon_id, _OTHER_STATUS, _status_value(pokemon.get_other_status())) \
+        ^ _key(pokemon_id, _OTHER_STATUS_TURNS, pokemon.get_other_status_turns())
+    for i, move in enumerate(pokemon.get_move_bank().get_as_list()):
+        h ^= _key(pokemon_id, _PP + i, move.get_pp())
+    return h
+
+
+def party_hash(party: Party) -> int:
+    """
+    Hashes the order of a party, which includes the starting Pokemon.
+    :param party: The party.
+    :return: A 64-bit hash.
+    """
+    h = 0
+    for idx, pokemon in enumerate(party.get_as_list()):
+        h ^= _key(pokemon.get_id(), _POSITION, idx)
+    return h
+
+
+def bag_hash(bag: Optional[Bag]) -> int:
+    """
+    Hashes the items in a bag.
+    :param bag: The bag, or None.
+    :return: A 64-bit hash.
+    """
+    if bag is None:
+        return 0
+    names = ','.join([item.get_name() for item in bag.snapshot()])
+    return _key(0, _BAG, crc32(names.encode()))
+
+
+def player_hash(player: Player) -> int:
+    """
+    Hashes everything a battle can change about a player: the party order, the state of every Pokemon and the bag.
+    The player's ID and the revealed flags are left out, so that equal positions reached in different battles hash
+    the same.
+    :param player: The player.
+    :return: A 64-bit hash, the XOR of party_hash, bag_hash and pokemon_hash of every Pokemon.
+    """
+    h = party_hash(player.get_party()) ^ bag_hash(player.get_bag())
+    for pokemon in player.get_party().get_as_list():
+        h ^= pokemon_hash(pokemon)
+    return h
+
+
+def _object_hash(obj: Union[Pokemon, Party, Bag]) -> int:
+    if isinstance(obj, Pokemon):
+        return pokemon_hash(obj)
+    if isinstance(obj, Party):
+        return party_hash(obj)
+    return bag_hash(obj)
+
+
+class ZobristTracker:
+    """
+    Keeps the player_hash of several players up to date as a battle changes them. The battle touches every Pokemon,
+    party or bag before changing it, which XORs out its old contribution; the new contributions of the touched objects
+    are XORed back in the next time a hash is read. Only the objects that changed are ever rehashed.
+    """
+
+    def __init__(self, players: Sequence[Player], hashes: Sequence[int] = None):
+        """
+        Initializes a ZobristTracker.
+        :param players: The players to track.
+        :param hashes: The current player_hash of each player, if already known.
+        """
+        self._hashes = list(hashes) if hashes is not None else [player_hash(player) for player in players]
+        self._owners: Dict[int, int] = {}
+        for side, player in enumerate(players):
+            for obj in player.get_party().get_as_list() + [player.get_party(), player.get_bag()]:
+                if obj is not None:
+                    self._owners[id(obj)] = side
+        self._touched: Dict[int, Union[Pokemon, Party, Bag]] = {}
+
+    def touch(self, obj: Union[Pokemon, Party, Bag, Any]) -> None:
+        """
+        Must be called before an object of a tracked player is changed. Objects of other players are ignored.
+        :param obj: A Pokemon, Party or Bag.
+        """
+        if id(obj) in self._owners and id(obj) not in self._touched:
+            self._hashes[self._owners[id(obj)]] ^= _object_hash(obj)
+            self._touched[id(obj)] = obj
+
+    def get_hashes(self) -> Tuple[int, ...]:
+        """
+        :return: The current player_hash of every tracked player, in order.
+        """
+        for obj_id, obj in self._touched.items():
+            self._hashes[self._owners[obj_id]] ^= _object_hash(obj)
+        self._touched.clear()
+        return tuple(self._hashes)
+
+    def set_hashes(self, hashes: Sequence[int]) -> None:
+        """
+        Overwrites the hashes, for when the players are restored to an earlier state. Pending changes are dropped.
+        :param hashes: The player_hash of every tracked player, in order.
+        """
+        self._hashes = list(hashes)
+        self._touched.clear()
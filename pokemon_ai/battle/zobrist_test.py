@@ -0,0 +1,48 @@
+import unittest
+
+from pokemon_ai.ai.models import RandomModel
+from pokemon_ai.classes import Player
+from pokemon_ai.data import get_party
+from pokemon_ai.utils import RNG
+
+from .battle import Battle
+from .zobrist import player_hash
+
+
+class ZobristTestSuite(unittest.TestCase):
+
+    def test_player_hash(self):
+        player = Player('test', get_party('venusaur', 'squirtle'))
+        initial = player_hash(player)
+        self.assertEqual(player_hash(player.copy()), initial)
+
+        # Every part of the battle state changes the hash, and restoring it restores the hash
+        snapshot = player.snapshot()
+        player.get_party().get_starting().take_damage(1)
+        self.assertNotEqual(player_hash(player), initial)
+        player.restore(snapshot)
+        player.get_party().make_starting(1)
+        self.assertNotEqual(player_hash(player), initial)
+        player.restore(snapshot)
+        self.assertEqual(player_hash(player), initial)
+
+    def test_tracked_hashes(self):
+        rng = RNG(0)
+        player1 = Player('test', get_party('venusaur', 'squirtle', 'arbok'), model=RandomModel(rng))
+        player2 = Player('test2', get_party('charmander', 'blastoise', 'jynx'), model=RandomModel(rng))
+
+        battle = Battle(player1, player2, 0, undoable=True, track_hashes=True, rng=rng)
+        hashes = [battle.get_hashes()]
+        winner = None
+        while winner is None:
+            winner = battle.play_turn()
+            hashes.append(battle.get_hashes())
+            self.assertEqual(hashes[-1], (player_hash(player1), player_hash(player2)))
+
+        for turn_hashes in reversed(hashes[:-1]):
+            battle.undo_turn()
+            self.assertEqual(battle.get_hashes(), turn_hashes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,3 +17,17 @@ class Bag:
 
     def get_as_list(self) -> List[Item]:
         return self._item_list
+
+    def snapshot(self) -> Tuple[Item]:
+        """
+        Captures the items in the bag.
+        :return: A tuple that can be passed to restore.
+        """
+        return tuple(self._item_list)
+
+    def restore(self, snapshot: Tuple[Item]):
+        """
+        Restores the items in the bag from a snapshot.
+        :param snapshot: A tuple returned by snapshot.
+        """
+        self._item_list[:] = snapshot
@@ -15,13 +15,21 @@ class Party:
         :param pokemon_list: A list of Pokemon in the party.
         """
         self._pokemon_list = pokemon_list
+        self._sorted_list: Optional[List[Pokemon]] = None
         self._preset_ids()
 
     def get_as_list(self) -> List[Pokemon]:
         return self._pokemon_list
 
     def get_sorted_list(self) -> List[Pokemon]:
-        return sorted(self._pokemon_list, key=lambda pkmn: pkmn.get_id())
+        """
+        Gets the Pokemon sorted by ID. Switching only reorders the party, so the order is sorted once, the first time it
+        is needed. The IDs of the Pokemon must not change after that.
+        :return: The list of Pokemon sorted by ID. It must not be changed.
+        """
+        if self._sorted_list is None:
+            self._sorted_list = sorted(self._pokemon_list, key=lambda pkmn: pkmn.get_id())
+        return self._sorted_list
 
     def _preset_ids(self):
         """
@@ -62,6 +70,24 @@ class Party:
                 return idx
         return -1
 
+    def snapshot(self) -> tuple:
+        """
+        Captures the party order and the mutable state of every Pokemon in it.
+        :return: A tuple of (Pokemon ID, Pokemon snapshot) pairs in party order that can be passed to restore.
+        """
+        return tuple([(pokemon.get_id(), pokemon.snapshot()) for pokemon in self._pokemon_list])
+
+    def restore(self, snapshot: tuple):
+        """
+        Restores the party order and the state of every Pokemon from a snapshot. Works on any copy of the party.
+        :param snapshot: A tuple returned by snapshot.
+        """
+        pokemon_by_id = {pokemon.get_id(): pokemon for pokemon in self._pokemon_list}
+        for idx, (pokemon_id, pokemon_snapshot) in enumerate(snapshot):
+            pokemon = pokemon_by_id[pokemon_id]
+            pokemon.restore(pokemon_snapshot)
+            self._pokemon_list[idx] = pokemon
+
     def get_starting(self) -> Pokemon:
         """
         Gets the starting Pokemon in the party or None if the party is empty.
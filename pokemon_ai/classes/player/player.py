@@ -51,7 +51,28 @@ class Player:
     ##
 
     def copy(self):
-        return deepcopy(self)
+        """
+        Copies the player. The model is shared with the copy rather than copied.
+        :return: A new Player.
+        """
+        return deepcopy(self, {id(self._model): self._model})
+
+    def snapshot(self) -> tuple:
+        """
+        Captures the mutable state of the player: its ID, party order, Pokemon, moves and bag. Much cheaper than copy.
+        :return: A tuple that can be passed to restore.
+        """
+        return self._id, self._party.snapshot(), self._bag.snapshot() if self._bag is not None else None
+
+    def restore(self, snapshot: tuple):
+        """
+        Restores the mutable state of the player from a snapshot taken on this player or a copy of it.
+        :param snapshot: A tuple returned by snapshot.
+        """
+        self._id, party_snapshot, bag_snapshot = snapshot
+        self._party.restore(party_snapshot)
+        if bag_snapshot is not None:
+            self._bag.restore(bag_snapshot)
 
     def set_model(self, model):
         self._model = model
@@ -0,0 +1,51 @@
+import unittest
+
+from pokemon_ai.ai.models import RandomModel
+from pokemon_ai.battle import Battle
+from pokemon_ai.data import get_party
+
+from .player import Player
+
+
+class PlayerTestSuite(unittest.TestCase):
+
+    def test_snapshot_restore(self):
+        player1 = Player('test', get_party('venusaur', 'squirtle'), model=RandomModel())
+        player2 = Player('test2', get_party('charmander', 'blastoise'), model=RandomModel())
+        snapshot1, snapshot2 = player1.snapshot(), player2.snapshot()
+        before = [str(player1.get_party()), str(player2.get_party())]
+
+        Battle(player1, player2, 0).play()
+        self.assertNotEqual(snapshot1, player1.snapshot())
+
+        player1.restore(snapshot1)
+        player2.restore(snapshot2)
+        self.assertEqual(snapshot1, player1.snapshot())
+        self.assertEqual(snapshot2, player2.snapshot())
+        self.assertEqual(before, [str(player1.get_party()), str(player2.get_party())])
+
+    def test_copy_shares_model(self):
+        player = Player('test', get_party('venusaur'), model=RandomModel())
+        copy = player.copy()
+        self.assertIs(player.get_model(), copy.get_model())
+        self.assertIsNot(player.get_party(), copy.get_party())
+        self.assertEqual(player.snapshot(), copy.snapshot())
+
+        # Copies sort their own Pokemon
+        sorted_list = player.get_party().get_sorted_list()
+        self.assertEqual([pokemon.get_id() for pokemon in copy.get_party().get_sorted_list()],
+                         [pokemon.get_id() for pokemon in sorted_list])
+        self.assertIs(copy.get_party().get_sorted_list()[0], copy.get_party().get_starting())
+
+    def test_sorted_list(self):
+        party = Player('test', get_party('venusaur', 'squirtle', 'pikachu')).get_party()
+        sorted_list = list(party.get_sorted_list())
+
+        # Switching reorders the party but not the Pokemon sorted by ID
+        party.make_starting(2)
+        self.assertEqual(party.get_sorted_list(), sorted_list)
+        self.assertIs(party.get_starting(), sorted_list[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
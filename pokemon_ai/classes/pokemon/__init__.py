@@ -1,4 +1,5 @@
 from .moves import *
 from .pokemon import Pokemon
+from .species import Species
 from .pokemontype import PokemonType
 from .stats import Stats
@@ -1,5 +1,6 @@
 from .effectiveness import Effectiveness
 from .move import Move
+from .move_spec import MoveSpec
 from .move_bank import MoveBank
 from .status import Status, status_names
 from .criticality import Criticality
@@ -1,12 +1,18 @@
+from typing import *
+
 from ..pokemontype import PokemonType
 from .status import Status
+from .move_spec import MoveSpec
 
 
 class Move:
     """
-    A move that can be performed by a Pokemon.
+    A move that can be performed by a Pokemon. The definition of the move is a shared MoveSpec, so a Move only holds
+    its PP and whether it has been revealed.
     """
 
+    __slots__ = ('_spec', '_pp', '_revealed')
+
     def __init__(self, name: str, base_damage: int, pp: int, type: PokemonType, is_special: bool, base_heal=0, status_inflict: Status = None):
         """
         Initializes a Move.
@@ -18,24 +24,34 @@ class Move:
         :param base_heal: The base amount of healing the move does to the Pokemon. Usually 0.
         :param status_inflict: The status the move inflicts onto the opposing Pokemon.
         """
-        self._name = name
-        self._base_damage = base_damage
-        self._base_heal = base_heal
+        self._spec = MoveSpec(name, base_damage, pp, type, is_special, base_heal, status_inflict)
         self._pp = pp
-        self._base_pp = pp
-        self._type = type
-        self._is_special = is_special
-        self._status_inflict = status_inflict
         self._revealed = True
 
+    @classmethod
+    def from_spec(cls, spec: MoveSpec):
+        """
+        Creates a Move with full PP from a MoveSpec.
+        :param spec: The definition of the move.
+        :return: A new Move.
+        """
+        move = cls.__new__(cls)
+        move._spec = spec
+        move._pp = spec.get_base_pp()
+        move._revealed = True
+        return move
+
+    def get_spec(self) -> MoveSpec:
+        return self._spec
+
     def get_name(self) -> str:
-        return self._name
+        return self._spec.get_name()
 
     def get_base_damage(self) -> int:
-        return self._base_damage
+        return self._spec.get_base_damage()
 
     def get_base_heal(self) -> int:
-        return self._base_heal
+        return self._spec.get_base_heal()
 
     def get_pp(self) -> int:
         return self._pp
@@ -44,29 +60,52 @@ class Move:
         return self._pp > 0
 
     def get_base_pp(self) -> int:
-        return self._base_pp
+        return self._spec.get_base_pp()
 
     def get_type(self) -> PokemonType:
-        return self._type
+        return self._spec.get_type()
 
     def is_revealed(self) -> bool:
         return self._revealed
 
     def is_special(self) -> bool:
-        return self._is_special
+        return self._spec.is_special()
 
     def is_damaging(self) -> bool:
         """
         :return: True if the move inflicts damage, False otherwise.
         """
-        return self._base_damage > 0
+        return self._spec.get_base_damage() > 0
 
     def get_status_inflict(self) -> Status:
-        return self._status_inflict
+        return self._spec.get_status_inflict()
 
     def dec_pp(self):
         self._pp = max(0, self._pp - 1)
 
+    def snapshot(self) -> Tuple[int, bool]:
+        """
+        Captures the mutable state of the move.
+        :return: A tuple that can be passed to restore.
+        """
+        return self._pp, self._revealed
+
+    def restore(self, snapshot: Tuple[int, bool]):
+        """
+        Restores the mutable state of the move from a snapshot.
+        :param snapshot: A tuple returned by snapshot.
+        """
+        self._pp, self._revealed = snapshot
+
+    def __deepcopy__(self, memo):
+        # Only the PP and revealed flag are copied; the spec is shared
+        move = Move.__new__(Move)
+        move._spec = self._spec
+        move._pp = self._pp
+        move._revealed = self._revealed
+        memo[id(self)] = move
+        return move
+
     def reveal(self):
         self._revealed = True
 
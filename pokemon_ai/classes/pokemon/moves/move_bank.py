@@ -10,6 +10,8 @@ class MoveBank:
     Bank of moves a given Pokemon has.
     """
 
+    __slots__ = ('_moves',)
+
     _CAPACITY = 4
 
     def __init__(self, moves: List[Move] = []):
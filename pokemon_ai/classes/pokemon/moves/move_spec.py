@@ -0,0 +1,73 @@
+from typing import *
+
+from ..pokemontype import PokemonType
+from .status import Status
+
+
+class MoveSpec:
+    """
+    The immutable definition of a move, shared by every Move of it. Specs are interned, so creating one with the same
+    fields twice returns the same object, and copying one returns it as is.
+    """
+
+    __slots__ = ('_name', '_base_damage', '_base_pp', '_type', '_is_special', '_base_heal', '_status_inflict')
+
+    _interned: Dict[tuple, 'MoveSpec'] = {}
+
+    def __new__(cls, name: str, base_damage: int, base_pp: int, type: PokemonType, is_special: bool, base_heal: int = 0,
+                status_inflict: Status = None):
+        """
+        Returns the interned MoveSpec with the given fields.
+        :param name: The name of the move.
+        :param base_damage: The base damage the move does, not including other calculations.
+        :param base_pp: The number of times the move can be performed.
+        :param type: The move's type.
+        :param is_special: Is the move a special attack? In other words, does it require non-physical attacking?
+        :param base_heal: The base amount of healing the move does to the Pokemon. Usually 0.
+        :param status_inflict: The status the move inflicts onto the opposing Pokemon.
+        """
+        key = (name, base_damage, base_pp, type, is_special, base_heal, status_inflict)
+        spec = cls._interned.get(key)
+        if spec is None:
+            spec = super().__new__(cls)
+            for slot, value in zip(cls.__slots__, key):
+                object.__setattr__(spec, slot, value)
+            spec = cls._interned.setdefault(key, spec)
+        return spec
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_base_damage(self) -> int:
+        return self._base_damage
+
+    def get_base_pp(self) -> int:
+        return self._base_pp
+
+    def get_type(self) -> PokemonType:
+        return self._type
+
+    def is_special(self) -> bool:
+        return self._is_special
+
+    def get_base_heal(self) -> int:
+        return self._base_heal
+
+    def get_status_inflict(self) -> Status:
+        return self._status_inflict
+
+    def __setattr__(self, key, value):
+        raise AttributeError('MoveSpec is immutable')
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # Unpickled specs are interned again
+        return MoveSpec, tuple([getattr(self, slot) for slot in MoveSpec.__slots__])
+
+    def __repr__(self):
+        return 'MoveSpec(%s)' % self._name
@@ -1,18 +1,22 @@
 from typing import *
+from copy import deepcopy
 from . import Status
 
-import random
-
 from .pokemontype import PokemonType
 from .stats import Stats
+from .species import Species
 from .moves.move_bank import MoveBank
 
 
 class Pokemon:
     """
-    All attributes related to a Pokemon.
+    All attributes related to a Pokemon. The type, name, level, base HP and stats live in a shared Species, so a
+    Pokemon only holds its moves and battle state.
     """
 
+    __slots__ = ('_species', '_move_bank', '_status', '_other_status', '_status_turns', '_other_status_turns', '_hp',
+                 '_id', '_revealed')
+
     def __init__(self, pokemon_type: PokemonType, name: str, level: int, stats: Stats, move_bank: MoveBank, hp: int, status: Status = None, other_status: Status = None, status_turns: int = 0, other_status_turns: int = 0, pokemon_id = None):
         """
         Initializes a Pokemon.
@@ -28,38 +32,58 @@ class Pokemon:
         :param other_status_turns: The number of turns remaining in the second status condition.
         :param pokemon_id: The ID of the Pokemon, usually preset by the Party object.
         """
-        self._type = pokemon_type
-        self._name = name
-        self._level = level
+        self._species = Species(pokemon_type, name, level, hp, stats)
         self._move_bank = move_bank
-        self._stats = stats
         self._status = status
         self._other_status = other_status
         self._status_turns = status_turns
         self._other_status_turns = other_status_turns
-        self._base_hp = hp
         self._hp = hp
         self._id = pokemon_id
         self._revealed = True
 
+    @classmethod
+    def from_species(cls, species: Species, move_bank: MoveBank, pokemon_id=None):
+        """
+        Creates a Pokemon at full health from a Species.
+        :param species: The kind of Pokemon.
+        :param move_bank: A bank of the Pokemon's moves.
+        :param pokemon_id: The ID of the Pokemon, usually preset by the Party object.
+        :return: A new Pokemon.
+        """
+        pokemon = cls.__new__(cls)
+        pokemon._species = species
+        pokemon._move_bank = move_bank
+        pokemon._status = None
+        pokemon._other_status = None
+        pokemon._status_turns = 0
+        pokemon._other_status_turns = 0
+        pokemon._hp = species.get_base_hp()
+        pokemon._id = pokemon_id
+        pokemon._revealed = True
+        return pokemon
+
     ##
     #   Getter Functions
     ##
 
+    def get_species(self) -> Species:
+        return self._species
+
     def get_type(self) -> PokemonType:
-        return self._type
+        return self._species.get_type()
 
     def get_name(self) -> str:
-        return self._name
+        return self._species.get_name()
 
     def get_level(self) -> int:
-        return self._level
+        return self._species.get_level()
 
     def get_move_bank(self) -> MoveBank:
         return self._move_bank
 
     def get_stats(self) -> Stats:
-        return self._stats
+        return self._species.get_stats()
 
     def get_status(self) -> Status:
         return self._status
@@ -74,7 +98,7 @@ class Pokemon:
         return self._other_status_turns
 
     def get_base_hp(self) -> int:
-        return self._base_hp
+        return self._species.get_base_hp()
 
     def get_hp(self) -> int:
         return self._hp
@@ -97,7 +121,7 @@ class Pokemon:
         self._hp = max(0, self._hp - abs(damage))
 
     def heal(self, hp: int):
-        self._hp = min(self._base_hp, self._hp + abs(hp))
+        self._hp = min(self._species.get_base_hp(), self._hp + abs(hp))
 
     def is_fainted(self) -> bool:
         """
@@ -106,15 +130,21 @@ class Pokemon:
         """
         return self._hp == 0
 
-    def set_status(self, status: Union[Status, None], status_turns: int = None):
+    def set_status(self, status: Union[Status, None], status_turns: int = None, rng=None):
         """
         Sets the status of the Pokemon.
         :param status: The status the Pokemon takes on.
-        :param status_turns: The number of turns to inflict the status.
+        :param status_turns: The number of turns to inflict the status. Random if None.
+        :param rng: The RNG (see pokemon_ai.utils.RNG) to draw random status turns from. Uses the process-wide RNG if
+        None.
         """
         self._status = status
-        if self._status is not None:
-            self._status_turns = random.randint(1, 7) if status_turns is None else status_turns
+        if self._status is not None and status_turns is not None:
+            self._status_turns = status_turns
+        elif self._status is not None:
+            # Imported here since pokemon_ai.utils imports the classes
+            from pokemon_ai.utils import get_rng
+            self._status_turns = (rng or get_rng()).random_int(1, 7)
 
     def set_other_status(self, other_status: Status, other_status_turns: int = 0):
         """
@@ -136,6 +166,39 @@ class Pokemon:
     def set_id(self, pokemon_id: int):
         self._id = pokemon_id
 
+    def snapshot(self) -> tuple:
+        """
+        Captures the mutable state of the Pokemon and its moves. The type, stats and move definitions are not copied.
+        :return: A tuple that can be passed to restore.
+        """
+        return (self._hp, self._status, self._other_status, self._status_turns, self._other_status_turns,
+                self._revealed, tuple([move.snapshot() for move in self._move_bank.get_as_list()]))
+
+    def restore(self, snapshot: tuple):
+        """
+        Restores the mutable state of the Pokemon and its moves from a snapshot.
+        :param snapshot: A tuple returned by snapshot.
+        """
+        self._hp, self._status, self._other_status, self._status_turns, self._other_status_turns, self._revealed, \
+            move_snapshots = snapshot
+        for move, move_snapshot in zip(self._move_bank.get_as_list(), move_snapshots):
+            move.restore(move_snapshot)
+
+    def __deepcopy__(self, memo):
+        # Only the battle state and moves are copied; the species is shared
+        pokemon = Pokemon.__new__(Pokemon)
+        memo[id(self)] = pokemon
+        pokemon._species = self._species
+        pokemon._move_bank = deepcopy(self._move_bank, memo)
+        pokemon._status = self._status
+        pokemon._other_status = self._other_status
+        pokemon._status_turns = self._status_turns
+        pokemon._other_status_turns = self._other_status_turns
+        pokemon._hp = self._hp
+        pokemon._id = self._id
+        pokemon._revealed = self._revealed
+        return pokemon
+
     def reveal(self):
         self._revealed = True
 
@@ -0,0 +1,52 @@
+import pickle
+import unittest
+from copy import deepcopy
+
+from .pokemon import Pokemon
+from .pokemontype import PokemonType
+from .stats import Stats
+from .moves import Move, MoveBank, Status
+from pokemon_ai.utils import set_seed
+
+
+class PokemonTestSuite(unittest.TestCase):
+
+    def test_shared_species(self):
+        def make_pokemon():
+            move = Move('Ember', 40, 25, PokemonType.FIRE, True)
+            return Pokemon(PokemonType.FIRE, 'Charmander', 100, Stats(52, 43, 60, 50, 65), MoveBank([move]), 188)
+
+        pokemon, other_pokemon = make_pokemon(), make_pokemon()
+        self.assertIs(pokemon.get_species(), other_pokemon.get_species())
+        self.assertIs(pokemon.get_move_bank().get_move(0).get_spec(), other_pokemon.get_move_bank().get_move(0).get_spec())
+
+        # Copies share the species and move specs but not the battle state
+        copied = deepcopy(pokemon)
+        copied.take_damage(10)
+        copied.get_move_bank().get_move(0).dec_pp()
+        self.assertIs(copied.get_species(), pokemon.get_species())
+        self.assertEqual(pokemon.get_hp(), 188)
+        self.assertEqual(pokemon.get_move_bank().get_move(0).get_pp(), 25)
+
+        unpickled = pickle.loads(pickle.dumps(copied))
+        self.assertIs(unpickled.get_species(), pokemon.get_species())
+        self.assertEqual(unpickled.snapshot(), copied.snapshot())
+
+    def test_status_turns_seeded(self):
+        move = Move('Ember', 40, 25, PokemonType.FIRE, True)
+        pokemon = Pokemon(PokemonType.FIRE, 'Charmander', 100, Stats(52, 43, 60, 50, 65), MoveBank([move]), 188)
+
+        # Without an RNG, the status turns come from the process-wide one
+        turns = []
+        for _ in range(2):
+            set_seed(0)
+            statuses = []
+            for _ in range(20):
+                pokemon.set_status(Status.SLEEP)
+                statuses.append(pokemon.get_status_turns())
+            turns.append(statuses)
+        self.assertEqual(turns[0], turns[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
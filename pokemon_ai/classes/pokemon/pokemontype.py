@@ -23,3 +23,8 @@ class PokemonType(Enum):
     DRAGON = 15
     DARK = 16
     FAIRY = 17
+
+
+# Copy each value into a plain attribute, which hot paths read much faster than the Enum.value property
+for _type in PokemonType:
+    _type.index = _type.value
@@ -0,0 +1,66 @@
+from typing import *
+
+from .pokemontype import PokemonType
+from .stats import Stats
+
+
+class Species:
+    """
+    The immutable definition of a kind of Pokemon: its type, name, level, base HP and stats. Species are interned and
+    shared by every Pokemon of them, so creating one with the same fields twice returns the same object, and copying
+    one returns it as is.
+    """
+
+    __slots__ = ('_type', '_name', '_level', '_base_hp', '_stats')
+
+    _interned: Dict[tuple, 'Species'] = {}
+
+    def __new__(cls, pokemon_type: PokemonType, name: str, level: int, base_hp: int, stats: Stats):
+        """
+        Returns the interned Species with the given fields.
+        :param pokemon_type: The Pokemon's type.
+        :param name: The name of the Pokemon.
+        :param level: The Pokemon's level.
+        :param base_hp: The Pokemon's full health points.
+        :param stats: An object containing the Pokemon's stat scores. It must not be changed afterwards.
+        """
+        key = (pokemon_type, name, level, base_hp, stats.get_attack(), stats.get_defense(), stats.get_special_attack(),
+               stats.get_special_defense(), stats.get_speed(), stats.get_accuracy(), stats.get_evasiveness())
+        species = cls._interned.get(key)
+        if species is None:
+            species = super().__new__(cls)
+            for slot, value in zip(cls.__slots__, (pokemon_type, name, level, base_hp, stats)):
+                object.__setattr__(species, slot, value)
+            species = cls._interned.setdefault(key, species)
+        return species
+
+    def get_type(self) -> PokemonType:
+        return self._type
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_level(self) -> int:
+        return self._level
+
+    def get_base_hp(self) -> int:
+        return self._base_hp
+
+    def get_stats(self) -> Stats:
+        return self._stats
+
+    def __setattr__(self, key, value):
+        raise AttributeError('Species is immutable')
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # Unpickled species are interned again
+        return Species, (self._type, self._name, self._level, self._base_hp, self._stats)
+
+    def __repr__(self):
+        return 'Species(%s)' % self._name
@@ -3,6 +3,8 @@ class Stats:
     A stats object for a given Pokemon.
     """
 
+    __slots__ = ('_attack', '_defense', '_special_attack', '_special_defense', '_speed', '_accuracy', '_evasiveness')
+
     def __init__(self, attack: int, defense: int, special_attack: int, special_defense: int, speed: int, accuracy: int = 100, evasiveness: int = 100):
         """
         Initializes Stats.
@@ -1 +1,2 @@
 from .get_pokemon import *
+from .pokedex import Pokedex, get_pokedex
@@ -0,0 +1,121 @@
+import csv
+import sys
+
+from typing import *
+from os.path import join, dirname
+
+from pokemon_ai.classes import Move, MoveBank, MoveSpec, Pokemon, Species, Stats, Status, PokemonType
+from pokemon_ai.utils import RNG, get_rng
+
+sys.path.append(join(dirname(__file__), '../..'))
+
+# The CSV file the Pokedex is loaded from
+POKEDEX_PATH = join(dirname(__file__), 'pokemon.csv')
+
+# The columns of each move in a row: name, damage, PP, type, category, status and heal
+_MOVE_COLUMNS = 7
+_FIRST_MOVE_COLUMN = 9
+
+_TYPE_MAP = {type.name.lower(): type for type in PokemonType}
+_STATUS_MAP = {status.name.lower(): status for status in Status}
+
+
+class _Entry(NamedTuple):
+    species: Species
+    moves: Tuple[MoveSpec, ...]
+
+
+class Pokedex:
+    """
+    Every species and move in a CSV file, parsed once and indexed by name and by Pokedex number. Pokemon and moves
+    are built from the shared Species and MoveSpecs and only get fresh battle state.
+    """
+
+    def __init__(self, path: str = POKEDEX_PATH):
+        """
+        Initializes a Pokedex by reading a CSV file. Use get_pokedex to share the default Pokedex.
+        :param path: The path to the CSV file, whose header is followed by one row per species in Pokedex order.
+        """
+        self._entries: List[_Entry] = []
+        self._entries_by_name: Dict[str, _Entry] = {}
+        self._moves_by_name: Dict[str, MoveSpec] = {}
+
+        with open(path, 'r') as csv_file:
+            rows = [row for row in csv.reader(csv_file) if len(row) != 0][1:]
+
+        for row in rows:
+            moves = []
+            for i in range(_FIRST_MOVE_COLUMN, len(row) - _MOVE_COLUMNS + 1, _MOVE_COLUMNS):
+                if row[i] != '':
+                    move = MoveSpec(row[i], int(row[i + 1]), int(row[i + 2]), _TYPE_MAP[row[i + 3]],
+                                    row[i + 4] == 'special', int(row[i + 6]),
+                                    _STATUS_MAP[row[i + 5]] if row[i + 5] != 'none' else None)
+                    moves.append(self._moves_by_name.setdefault(move.get_name().lower(), move))
+            species = Species(_TYPE_MAP[row[1]], row[0], int(row[2]), int(row[3]),
+                              Stats(int(row[4]), int(row[6]), int(row[5]), int(row[7]), int(row[8])))
+            entry = _Entry(species, tuple(moves))
+            self._entries.append(entry)
+            self._entries_by_name[species.get_name().lower()] = entry
+
+    def get_size(self) -> int:
+        return len(self._entries)
+
+    def get_names(self) -> List[str]:
+        return [entry.species.get_name() for entry in self._entries]
+
+    def has_pokemon(self, name_or_id: Union[int, str]) -> bool:
+        if isinstance(name_or_id, str):
+            return name_or_id.lower() in self._entries_by_name
+        return 1 <= name_or_id <= len(self._entries)
+
+    def get_species(self, name_or_id: Union[int, str]) -> Species:
+        return self._get_entry(name_or_id).species
+
+    def get_pokemon(self, name_or_id: Union[int, str]) -> Pokemon:
+        """
+        Creates a Pokemon.
+        :param name_or_id: The name of the species, in any case, or its Pokedex number starting at 1.
+        :return: A new Pokemon at full health.
+        """
+        entry = self._get_entry(name_or_id)
+        return Pokemon.from_species(entry.species, MoveBank([Move.from_spec(move) for move in entry.moves]))
+
+    def get_random_pokemon(self, rng: RNG = None) -> Pokemon:
+        """
+        Creates a Pokemon of a random species.
+        :param rng: The RNG to pick the species with. Defaults to the process-wide RNG.
+        :return: A new Pokemon at full health.
+        """
+        return self.get_pokemon((rng or get_rng()).random_int(1, len(self._entries)))
+
+    def get_move(self, name: str) -> Move:
+        """
+        Creates a move that some species in the Pokedex knows.
+        :param name: The name of the move, in any case.
+        :return: A new Move with full PP.
+        """
+        return Move.from_spec(self._moves_by_name[name.lower()])
+
+    def _get_entry(self, name_or_id: Union[int, str]) -> _Entry:
+        if isinstance(name_or_id, str):
+            return self._entries_by_name[name_or_id.lower()]
+        if not 1 <= name_or_id <= len(self._entries):
+            raise KeyError(name_or_id)
+        return self._entries[name_or_id - 1]
+
+
+##
+# Default Pokedex
+##
+
+_default_pokedex: Optional[Pokedex] = None
+
+
+def get_pokedex() -> Pokedex:
+    """
+    Returns the Pokedex of the bundled pokemon.csv, loading it on first use.
+    """
+    global _default_pokedex
+    if _default_pokedex is None:
+        _default_pokedex = Pokedex()
+    return _default_pokedex
@@ -0,0 +1,29 @@
+import unittest
+
+from pokemon_ai.utils import RNG
+from .pokedex import get_pokedex
+
+
+class PokedexTestSuite(unittest.TestCase):
+
+    def test_get_pokemon(self):
+        pokedex = get_pokedex()
+        self.assertEqual(pokedex.get_size(), 151)
+        self.assertEqual(pokedex.get_pokemon(1).get_name(), 'Bulbasaur')
+        self.assertEqual(pokedex.get_pokemon('VENUSAUR').get_name(), 'Venusaur')
+        self.assertRaises(KeyError, pokedex.get_pokemon, 0)
+
+        # Pokemon built from the same species share no state
+        pokemon, other_pokemon = pokedex.get_pokemon('charizard'), pokedex.get_pokemon('charizard')
+        pokemon.take_damage(10)
+        pokemon.get_move_bank().get_move(0).dec_pp()
+        self.assertEqual(other_pokemon.get_hp(), other_pokemon.get_base_hp())
+        move = other_pokemon.get_move_bank().get_move(0)
+        self.assertEqual(move.get_pp(), move.get_base_pp())
+
+        names = [pokedex.get_random_pokemon(RNG(3)).get_name() for _ in range(2)]
+        self.assertEqual(names[0], names[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
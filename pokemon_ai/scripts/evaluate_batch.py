@@ -0,0 +1,23 @@
+import sys
+import time
+from os.path import join, dirname
+sys.path.append(join(dirname(__file__), '../..'))
+
+from pokemon_ai.battle import BattleBatch, BattleState
+from pokemon_ai.classes import Bag, Player
+from pokemon_ai.data import get_party
+
+NUM_BATTLES = 10000
+
+party1 = get_party("charizard", "venusaur")
+party2 = get_party("blastoise", "tentacruel")
+
+player1 = Player("Damage", party1, Bag())
+player2 = Player("Random", party2, Bag())
+
+start = time.time()
+batch = BattleBatch.from_state(BattleState.from_players(player1, player2), NUM_BATTLES)
+winners = batch.play(BattleBatch.damage_actions, BattleBatch.random_actions)
+
+print({player1.get_name(): int((winners == 0).sum()), player2.get_name(): int((winners == 1).sum())})
+print("Played %d battles in %.2fs" % (NUM_BATTLES, time.time() - start))
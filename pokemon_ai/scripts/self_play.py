@@ -0,0 +1,16 @@
+import os
+import sys
+import time
+from os.path import join, dirname
+sys.path.append(join(dirname(__file__), '../..'))
+
+from pokemon_ai.ai.models.porygon_model.self_play import generate
+
+DIRECTORY = join(dirname(__file__), '../../data/self_play')
+NUM_GAMES = 1000
+NUM_SIMULATIONS = 50
+
+if __name__ == '__main__':
+    start = time.time()
+    manifest = generate(DIRECTORY, NUM_GAMES, workers=os.cpu_count(), num_simulations=NUM_SIMULATIONS, verbose=True)
+    print("Recorded %d positions in %d shards in %.2fs" % (manifest['size'], len(manifest['shards']), time.time() - start))
@@ -0,0 +1,12 @@
+import sys
+from os.path import join, dirname
+sys.path.append(join(dirname(__file__), '../..'))
+
+from pokemon_ai.ai.models.porygon_model.trainer import train
+
+DIRECTORY = join(dirname(__file__), '../../data/self_play')
+CHECKPOINT_PATH = join(DIRECTORY, 'checkpoint.npz')
+NUM_EPOCHS = 10
+
+if __name__ == '__main__':
+    train(DIRECTORY, epochs=NUM_EPOCHS, checkpoint_path=CHECKPOINT_PATH, verbose=True)
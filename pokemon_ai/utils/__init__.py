@@ -1,4 +1,6 @@
-from .calculations import calculate_damage, upper_confidence_bounds, is_effective, outcome_func_v1, calculate_damage_deterministic, to_probs
+from .calculations import calculate_damage, upper_confidence_bounds, predictor_upper_confidence_bounds, is_effective, outcome_func_v1, calculate_damage_deterministic, to_probs, \
+    effectiveness_multipliers, can_damage, EFFECTIVENESS_TABLE, EFFECTIVENESS_MATRIX
 from .chance import chance, chances, random_pct, random_int
+from .rng import RNG, AliasTable, get_rng, set_seed
 from .io import *
 from .config import *
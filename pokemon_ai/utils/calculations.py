@@ -3,8 +3,11 @@ from typing import *
 from os.path import join, dirname
 from math import sqrt, log
 
+import numpy as np
+
 from .chance import random_pct, chance
-from pokemon_ai.classes import Pokemon, Move, Effectiveness, PokemonType, Player, Criticality
+from .rng import RNG, get_rng
+from pokemon_ai.classes import Pokemon, Move, Effectiveness, PokemonType, Player, Criticality, Status
 
 sys.path.append(join(dirname(__file__), '../..'))
 
@@ -13,17 +16,19 @@ sys.path.append(join(dirname(__file__), '../..'))
 # Move Calculations
 ##
 
-def calculate_damage(move: Move, pokemon: Pokemon, on_pokemon: Pokemon) -> (int, Effectiveness, Criticality):
+def calculate_damage(move: Move, pokemon: Pokemon, on_pokemon: Pokemon, rng: RNG = None) -> (int, Effectiveness, Criticality):
     """
     Calculates a slightly random (due to
     critical hit, etc.) damage from the pokemon to the on_pokemon.
     :param move: The move pokemon attacks on_pokemon with.
     :param pokemon: The attacking Pokemon.
     :param on_pokemon: The defending Pokemon.
+    :param rng: The RNG to draw from. Defaults to the process-wide RNG.
     :return: A tuple containing damage dealt, the level of effectiveness of the move, and a critical hit value (2 for critical hit, 1 for regular).
     """
-    critical = chance(.0625, lambda: Criticality.CRITICAL, lambda: Criticality.NOT_CRITICAL)
-    random = random_pct(85, 100)
+    rng = rng or get_rng()
+    critical = rng.chance(.0625, Criticality.CRITICAL, Criticality.NOT_CRITICAL)
+    random = rng.random_pct(85, 100)
     effectiveness = is_effective(move.get_type(), on_pokemon.get_type())
     modifier = critical.value * random * effectiveness.value
     attack = pokemon.get_stats().get_special_attack() if move.is_special() else pokemon.get_stats().get_attack()
@@ -52,6 +57,36 @@ def calculate_damage_deterministic(move: Move, pokemon: Pokemon, on_pokemon: Pok
     return damage, effectiveness, critical
 
 
+# Statuses that lower the HP of the Pokemon that has them
+HURTING_STATUSES = [Status.POISON, Status.BAD_POISON, Status.BURN, Status.CONFUSION]
+
+
+def can_damage(player: Player, opponent: Player) -> bool:
+    """
+    Checks whether a player can still lower the HP of the opponent's Pokemon: with a damaging move that affects one of
+    them, with a move inflicting a hurting status, or through a hurting status one of them already has. A player that
+    cannot can no longer win.
+    :param player: The player.
+    :param opponent: The opposing player.
+    :return: True if the player can still damage the opponent.
+    """
+    targets = [pokemon for pokemon in opponent.get_party().get_as_list() if not pokemon.is_fainted()]
+    for pokemon in player.get_party().get_as_list():
+        if pokemon.is_fainted():
+            continue
+        for move in pokemon.get_move_bank().get_as_list():
+            if not move.is_available():
+                continue
+            if move.get_status_inflict() in HURTING_STATUSES:
+                return True
+            if move.is_damaging():
+                for target in targets:
+                    if is_effective(move.get_type(), target.get_type()) != Effectiveness.NO_EFFECT:
+                        return True
+    return any([target.get_other_status() in HURTING_STATUSES or target.get_status() in HURTING_STATUSES
+                for target in targets])
+
+
 def upper_confidence_bounds(node_wins, node_visits, parent_visits, c=sqrt(2)) -> float:
     """
     Returns the UCB stat for Monte Carlo Search Tree (MCST) exploration.
@@ -63,9 +98,46 @@ def upper_confidence_bounds(node_wins, node_visits, parent_visits, c=sqrt(2)) ->
     return (node_wins / node_visits) + c * sqrt(log(parent_visits) / node_visits)
 
 
-def is_effective(type: PokemonType, other_type: PokemonType) -> Effectiveness:
+def predictor_upper_confidence_bounds(node_wins, node_visits, parent_visits, prior, c=1.5, first_play_value=0.5) -> float:
+    """
+    Returns the PUCT stat for Monte Carlo Search Tree (MCST) exploration, which explores in proportion to a prior
+    probability of the node instead of trying every node once first.
+    :param node_wins: Number of wins for the current node.
+    :param node_visits: Number of visits for the current node.
+    :param parent_visits: Number of visits for the parent node.
+    :param prior: The prior probability of choosing the node.
+    :param c: The exploration parameter.
+    :param first_play_value: The win rate assumed for a node that was never visited.
+    """
+    value = node_wins / node_visits if node_visits > 0 else first_play_value
+    return value + c * prior * sqrt(parent_visits) / (1 + node_visits)
+
+
+def is_effective(type: Union[PokemonType, int], other_type: Union[PokemonType, int]) -> Effectiveness:
     """
     Returns the effectiveness of one type on the other type.
+    :param type: The type to check effectiveness of, or its value.
+    :param other_type: The type to compare effectiveness against, or its value.
+    :return: An Effectiveness enum describing the effectiveness of the type.
+    """
+    type = type if isinstance(type, int) else type.index
+    other_type = other_type if isinstance(other_type, int) else other_type.index
+    return EFFECTIVENESS_TABLE[type][other_type]
+
+
+def effectiveness_multipliers(types: np.ndarray, other_types: np.ndarray) -> np.ndarray:
+    """
+    Returns the effectiveness multipliers of many attacking types on many defending types at once.
+    :param types: An array of attacking PokemonType values.
+    :param other_types: An array of defending PokemonType values, broadcastable against types.
+    :return: An array of multipliers (0, 0.5, 1 or 2) with the broadcast shape of the inputs.
+    """
+    return EFFECTIVENESS_MATRIX[types, other_types]
+
+
+def _type_chart(type: PokemonType, other_type: PokemonType) -> Effectiveness:
+    """
+    The type chart, compiled into EFFECTIVENESS_TABLE at import. Use is_effective instead.
     :param type: The type to check effectiveness of.
     :param other_type: The type to compare effectiveness against.
     :return: An Effectiveness enum describing the effectiveness of the type.
@@ -272,6 +344,13 @@ def is_effective(type: PokemonType, other_type: PokemonType) -> Effectiveness:
     return Effectiveness.NORMAL
 
 
+# Effectiveness of an attacking type (row) on a defending type (column), indexed by PokemonType value
+EFFECTIVENESS_TABLE: List[List[Effectiveness]] = [[_type_chart(type, other_type) for other_type in PokemonType]
+                                                  for type in PokemonType]
+EFFECTIVENESS_MATRIX = np.array([[effectiveness.value for effectiveness in row] for row in EFFECTIVENESS_TABLE])
+EFFECTIVENESS_MATRIX.setflags(write=False)
+
+
 ##
 # Math Functions
 ##
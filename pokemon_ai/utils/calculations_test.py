@@ -0,0 +1,22 @@
+import unittest
+
+import numpy as np
+
+from pokemon_ai.classes import PokemonType
+from .calculations import is_effective, effectiveness_multipliers, _type_chart
+
+
+class CalculationsTestSuite(unittest.TestCase):
+
+    def test_is_effective(self):
+        types = np.array([type.value for type in PokemonType])
+        multipliers = effectiveness_multipliers(types[:, None], types[None, :])
+        for type in PokemonType:
+            for other_type in PokemonType:
+                self.assertIs(is_effective(type, other_type), _type_chart(type, other_type))
+                self.assertIs(is_effective(type.value, other_type.value), _type_chart(type, other_type))
+                self.assertEqual(multipliers[type.value, other_type.value], _type_chart(type, other_type).value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,57 +1,54 @@
 from typing import *
 
 import sys
-import random
 from os.path import join, dirname
 
+from .rng import RNG, get_rng
+
 sys.path.append(join(dirname(__file__), '../..'))
 
 
-def chance(percentage: float, success: any = None, failure: any = None):
+def chance(percentage: float, success: any = None, failure: any = None, rng: RNG = None):
     """
     Calculates a random value and returns success if it is within the threshold and returns failure otherwise. If success and failure are functions, they get called.
     :param percentage: The percentage of success. For instance, 0.9 would return success 90% of the time.
     :param success: The value to return on success.
     :param failure: The value to return on failure.
+    :param rng: The RNG to draw from. Defaults to the process-wide RNG.
     :return: success or failure if they are not callable, or success() or failure() otherwise.
     """
-    if percentage >= random.random():
-        return (success() if callable(success) else success) if success is not None else None
-    return (failure() if callable(failure) else failure) if failure is not None else None
+    return (rng or get_rng()).chance(percentage, success, failure)
 
 
-def chances(probabilities: List[float], results: List[any]):
+def chances(probabilities: List[float], results: List[any], rng: RNG = None):
     """
-    Uniformly selects the result based on the list of probability percentages.
-    :param probabilities: The percentage associated with each result.
+    Selects the result based on the list of probability percentages, using an alias table.
+    :param probabilities: The percentage associated with each result. Percentages are normalized to sum to 1.
     :param results: The list of results, lining up with percentages.
-    :return: success or failure if they are not callable, or success() or failure() otherwise.
+    :param rng: The RNG to draw from. Defaults to the process-wide RNG.
+    :return: The selected result.
     """
     assert len(probabilities) == len(results)
-    thresh = random.random()
-    for i, percentage in enumerate(probabilities):
-        lower = sum(probabilities[:i]) if i > 0 else 0
-        upper = lower + percentage
-        if lower <= thresh < upper:
-            return results[i]
-    return results[-1]
+    return (rng or get_rng()).chances(probabilities, results)
 
 
-def random_int(start: int, end: int):
+def random_int(start: int, end: int, rng: RNG = None):
     """
-    Returns a random integer between the start and end values, exclusive to the end value but inclusive to the start value.
+    Returns a random integer between the start and end values, inclusive to both.
     :param start: The starting integer.
-    :param end: The ending integer. Never returns this exact integer.
+    :param end: The ending integer.
+    :param rng: The RNG to draw from. Defaults to the process-wide RNG.
     :return: The random integer.
     """
-    return random.randint(start, end)
+    return (rng or get_rng()).random_int(start, end)
 
 
-def random_pct(start: int = 0, end: int = 100):
+def random_pct(start: int = 0, end: int = 100, rng: RNG = None):
     """
     Returns a random percentage value.
     :param start: The starting percentage.
     :param end: The ending percentage.
+    :param rng: The RNG to draw from. Defaults to the process-wide RNG.
     :return: The random percentage out of 1.
     """
-    return random_int(start, end) / 100
+    return (rng or get_rng()).random_pct(start, end)
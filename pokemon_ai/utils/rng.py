@@ -0,0 +1,186 @@
+from typing import *
+
+import numpy as np
+
+# The number of uniform values drawn from NumPy at a time
+RNG_BUFFER_SIZE = 4096
+
+
+class AliasTable:
+    """
+    A table for sampling from a categorical distribution in constant time (Vose's alias method).
+    """
+
+    __slots__ = ('_probabilities', '_aliases')
+
+    def __init__(self, weights: Sequence[float]):
+        """
+        Initializes an AliasTable in linear time.
+        :param weights: The weight of each category. Weights do not have to sum to 1 and negative weights count as 0. If
+        every weight is 0, the last category is always sampled.
+        """
+        n = len(weights)
+        assert n > 0
+        weights = [max(0.0, float(weight)) for weight in weights]
+        total = sum(weights)
+        if total <= 0:
+            self._probabilities = [0.0] * n
+            self._aliases = [n - 1] * n
+            return
+
+        scaled = [weight * n / total for weight in weights]
+        self._probabilities = [1.0] * n
+        self._aliases = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._probabilities[less] = scaled[less]
+            self._aliases[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+
+    def get_size(self) -> int:
+        return len(self._aliases)
+
+    def sample(self, value: float) -> int:
+        """
+        Samples a category.
+        :param value: A uniform random value in [0, 1).
+        :return: The index of the sampled category.
+        """
+        value *= len(self._aliases)
+        idx = int(value)
+        return idx if value - idx < self._probabilities[idx] else self._aliases[idx]
+
+
+class RNG:
+    """
+    A seedable random number generator. Uniform values are drawn from NumPy in bulk and handed out one by one, so each
+    draw costs a list lookup rather than a call into the random module. Give every battle or worker its own RNG (see
+    spawn) to make simulations reproducible and free of shared state.
+    """
+
+    def __init__(self, seed: Union[int, np.random.SeedSequence, None] = None, buffer_size: int = RNG_BUFFER_SIZE):
+        """
+        Initializes an RNG.
+        :param seed: The seed of the stream. A random seed is used if None.
+        :param buffer_size: The number of uniform values to pre-draw at a time.
+        """
+        self._buffer_size = buffer_size
+        self.reseed(seed)
+
+    def reseed(self, seed: Union[int, np.random.SeedSequence, None] = None) -> None:
+        """
+        Restarts the stream from a new seed, discarding any pre-drawn values.
+        :param seed: The new seed. A random seed is used if None.
+        """
+        self._seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self._generator = np.random.default_rng(self._seed_sequence)
+        self._buffer: List[float] = []
+        self._idx = 0
+
+    def get_seed(self) -> int:
+        return self._seed_sequence.entropy
+
+    def get_generator(self) -> np.random.Generator:
+        """
+        Returns the underlying NumPy generator, for vectorized code that draws whole arrays at once.
+        """
+        return self._generator
+
+    def spawn(self, n: int) -> List['RNG']:
+        """
+        Creates independent child streams, one per parallel worker or battle.
+        :param n: The number of streams.
+        :return: A list of n RNGs whose values do not overlap with each other or with this RNG.
+        """
+        return [RNG(seed_sequence, self._buffer_size) for seed_sequence in self._seed_sequence.spawn(n)]
+
+    ##
+    # Draws
+    ##
+
+    def random(self) -> float:
+        """
+        Returns a uniform random value in [0, 1).
+        """
+        if self._idx == len(self._buffer):
+            self._buffer = self._generator.random(self._buffer_size).tolist()
+            self._idx = 0
+        value = self._buffer[self._idx]
+        self._idx += 1
+        return value
+
+    def random_int(self, start: int, end: int) -> int:
+        """
+        Returns a random integer between the start and end values, both inclusive.
+        :param start: The starting integer.
+        :param end: The ending integer.
+        :return: The random integer.
+        """
+        return start + int(self.random() * (end - start + 1))
+
+    def random_pct(self, start: int = 0, end: int = 100) -> float:
+        """
+        Returns a random percentage value.
+        :param start: The starting percentage.
+        :param end: The ending percentage.
+        :return: The random percentage out of 1.
+        """
+        return self.random_int(start, end) / 100
+
+    def chance(self, percentage: float, success: Any = None, failure: Any = None) -> Any:
+        """
+        Returns success with the given probability and failure otherwise. If success and failure are functions, they
+        get called.
+        :param percentage: The percentage of success. For instance, 0.9 would return success 90% of the time.
+        :param success: The value to return on success.
+        :param failure: The value to return on failure.
+        :return: success or failure if they are not callable, or success() or failure() otherwise.
+        """
+        result = success if percentage >= self.random() else failure
+        return result() if callable(result) else result
+
+    def chances(self, probabilities: Union[Sequence[float], AliasTable], results: List[Any]) -> Any:
+        """
+        Selects a result based on the list of probability percentages.
+        :param probabilities: The percentage associated with each result, or a prebuilt AliasTable to sample in constant
+        time when the same distribution is reused.
+        :param results: The list of results, lining up with percentages.
+        :return: The selected result.
+        """
+        table = probabilities if isinstance(probabilities, AliasTable) else AliasTable(probabilities)
+        assert table.get_size() == len(results)
+        return results[table.sample(self.random())]
+
+    def shuffle(self, values: list) -> None:
+        """
+        Shuffles a list in place.
+        :param values: The list to shuffle.
+        """
+        for i in range(len(values) - 1, 0, -1):
+            j = self.random_int(0, i)
+            values[i], values[j] = values[j], values[i]
+
+
+##
+# Default Stream
+##
+
+_default_rng = RNG()
+
+
+def get_rng() -> RNG:
+    """
+    Returns the process-wide RNG, used whenever no RNG is passed in.
+    """
+    return _default_rng
+
+
+def set_seed(seed: Optional[int]) -> None:
+    """
+    Reseeds the process-wide RNG.
+    :param seed: The new seed.
+    """
+    _default_rng.reseed(seed)
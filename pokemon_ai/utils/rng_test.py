@@ -0,0 +1,28 @@
+import unittest
+
+from .rng import RNG, AliasTable
+
+
+class RNGTestSuite(unittest.TestCase):
+
+    def test_reproducible(self):
+        rng, same_rng = RNG(7), RNG(7)
+        self.assertEqual([rng.random_int(1, 7) for _ in range(10000)], [same_rng.random_int(1, 7) for _ in range(10000)])
+
+        streams = RNG(7).spawn(2)
+        self.assertNotEqual([streams[0].random() for _ in range(10)], [streams[1].random() for _ in range(10)])
+
+    def test_chances(self):
+        rng = RNG(0)
+        table = AliasTable([0.1, 0.0, 0.6, 0.3])
+        counts = [0] * 4
+        for _ in range(100000):
+            counts[rng.chances(table, [0, 1, 2, 3])] += 1
+        for count, probability in zip(counts, [0.1, 0.0, 0.6, 0.3]):
+            self.assertAlmostEqual(count / 100000, probability, delta=0.01)
+
+        self.assertEqual(rng.chances([0, 0], ['a', 'b']), 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()